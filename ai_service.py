@@ -5,71 +5,731 @@ Handles integration with various AI providers for word learning features
 
 import os
 import json
+import time
+import random
+import hashlib
+import sqlite3
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import partial
 from typing import Dict, List, Optional
 
+from content_parser import WORD_CONTENT_SCHEMA, ParsedContent, parse_sections, parse_word_content
+from metrics import registry
+from provider_router import ProviderRouter
+
+try:
+    import fcntl
+except ImportError:  # Windows：只在进程内合并请求
+    fcntl = None
+
+# AI生成的字段；缓存只保存这些字段，基础词条信息始终来自单词库
+# 同义词和释义练习由 build_distractors.py 离线生成并存入单词库，不再请求模型
+AI_CONTENT_FIELDS = (
+    'etymology', 'memory_story', 'memory_phonetic', 'memory_visual'
+)
+
+
+# 提示词里对每个字段的说明（提示词只列出本次要生成的字段）
+FIELD_DESCRIPTIONS = {
+    'etymology_parts': '词根词缀拆解，格式为 [{"part": "前缀/词根/后缀", "meaning": "含义"}]',
+    'etymology_explanation': '词根词缀组合后的含义解释',
+    'memory_story': '联想记忆法：一个有趣的小故事',
+    'memory_phonetic': '谐音记忆法：利用谐音帮助记忆',
+    'memory_visual': '视觉记忆法：形象的画面联想',
+}
+
+# /api/word/enhance 的 content_type -> 需要模型生成的字段
+# exercise 的选项由 build_distractors.py 离线生成，不调用模型
+CONTENT_TYPE_FIELDS = {
+    'all': tuple(WORD_CONTENT_SCHEMA),
+    'memory': ('memory_story', 'memory_phonetic', 'memory_visual'),
+    'etymology': ('etymology_parts', 'etymology_explanation'),
+    'exercise': (),
+}
+
+# 每个字段的输出token上限，max_tokens 按本次要生成的字段求和
+FIELD_MAX_TOKENS = {
+    'etymology_parts': 120,
+    'etymology_explanation': 120,
+    'memory_story': 180,
+    'memory_phonetic': 120,
+    'memory_visual': 120,
+}
+JSON_OVERHEAD_TOKENS = 60
+
+WORD_CONTENT_SYSTEM_PROMPT = "You are an expert GRE vocabulary tutor. Reply with one JSON object only."
+
+
+def max_completion_tokens(fields) -> int:
+    """生成这些字段时请求的 max_tokens"""
+    return JSON_OVERHEAD_TOKENS + sum(FIELD_MAX_TOKENS[field] for field in fields)
+
+
+def content_from_fields(fields: Dict) -> Dict:
+    """把校验通过的字段转换成单词数据中的AI_CONTENT_FIELDS"""
+    content = {}
+    if 'etymology_parts' in fields:
+        content['etymology'] = {
+            'parts': fields['etymology_parts'],
+            'explanation': fields.get('etymology_explanation', '')
+        }
+    for field in AI_CONTENT_FIELDS:
+        if field in fields:
+            content[field] = fields[field]
+    return content
+
+
+# 支持的provider；local 是任意OpenAI兼容的本地端点（vLLM、Ollama、llama.cpp server等）
+SUPPORTED_PROVIDERS = ('openai', 'zhipu', 'local', 'mock')
+
+# 值得重试的HTTP状态码（限流和服务端临时错误）
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# 监控指标（/metrics）
+AI_PROVIDER_SECONDS = registry.histogram(
+    'acegre_ai_provider_request_duration_seconds', 'AI provider call latency per attempt',
+    ('provider', 'content_type', 'outcome'))
+AI_TOKENS = registry.counter(
+    'acegre_ai_tokens_total', 'Tokens reported by the AI provider for word content calls',
+    ('provider', 'content_type', 'kind'))
+AI_FALLBACKS = registry.counter(
+    'acegre_ai_fallbacks_total', 'Word content served without AI output', ('reason',))
+AI_PARSE_FAILURES = registry.counter(
+    'acegre_ai_parse_failures_total', 'AI responses that could not be parsed', ('provider',))
+AI_FIELD_FAILURES = registry.counter(
+    'acegre_ai_field_failures_total', 'AI content fields missing or failing validation', ('field', 'reason'))
+AI_FIELD_REGENERATIONS = registry.counter(
+    'acegre_ai_field_regenerations_total', 'Follow-up requests for only the fields a reply lacked', ('provider',))
+AI_CHAT_TTFT = registry.histogram(
+    'acegre_ai_chat_time_to_first_token_seconds', 'Streaming chat time to first token', ('provider',))
+
+
+class AIProviderError(Exception):
+    """AI服务调用失败（未配置密钥、HTTP错误等），调用方应使用默认内容"""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class AIResponseParseError(Exception):
+    """AI响应无法解析"""
+
+
+class ContentCache:
+    """
+    AI生成内容的两级缓存
+    - 第一级：进程内 LRU，带 TTL
+    - 第二级：SQLite 磁盘存储，所有 worker 共享
+    键由单词、内容类型、provider、模型和提示词模板哈希组成
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS content_cache (
+        key TEXT PRIMARY KEY,
+        word TEXT NOT NULL,
+        provider TEXT NOT NULL,
+        model TEXT NOT NULL,
+        template_hash TEXT NOT NULL,
+        content TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_content_cache_word ON content_cache (word);
+    CREATE INDEX IF NOT EXISTS idx_content_cache_template ON content_cache (template_hash);
+    """
+
+    def __init__(self, path: str, max_entries: int = 1024, ttl: float = 3600,
+                 disk_ttl: float = 30 * 86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_ttl = disk_ttl
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def make_key(word: str, provider: str, model: str, template_hash: str, content_type: str = 'all') -> str:
+        return hashlib.sha256(f"{word}\x00{content_type}\x00{provider}\x00{model}\x00{template_hash}"
+                              .encode('utf-8')).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, content = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats['memory_hits'] += 1
+                    return content
+                del self._memory[key]
+                self.stats['expired'] += 1
+
+        row = self._connect().execute(
+            'SELECT content, created_at FROM content_cache WHERE key = ?', (key,)).fetchone()
+        if row is not None and (not self.disk_ttl or row[1] + self.disk_ttl > now):
+            content = json.loads(row[0])
+            self._remember(key, content, now)
+            with self._lock:
+                self.stats['disk_hits'] += 1
+            return content
+
+        with self._lock:
+            if row is not None:
+                self.stats['expired'] += 1
+            self.stats['misses'] += 1
+        return None
+
+    def set(self, key: str, content: Dict, word: str, provider: str, model: str, template_hash: str):
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO content_cache
+                   (key, word, provider, model, template_hash, content, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (key, word, provider, model, template_hash, json.dumps(content, ensure_ascii=False), now))
+        self._remember(key, content, now)
+
+    def _remember(self, key: str, content: Dict, now: float):
+        with self._lock:
+            self._memory[key] = (now + self.ttl, content)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate(self, word: Optional[str] = None) -> int:
+        """删除某个单词（或全部）的缓存内容，返回删除的磁盘条目数"""
+        conn = self._connect()
+        with conn:
+            if word is None:
+                deleted = conn.execute('DELETE FROM content_cache').rowcount
+            else:
+                deleted = conn.execute('DELETE FROM content_cache WHERE word = ?', (word,)).rowcount
+        # 内存中的键是哈希值，无法按单词筛选，直接清空
+        with self._lock:
+            self._memory.clear()
+        return deleted
+
+    def purge_stale_templates(self, template_hash: str) -> int:
+        """提示词模板变化后，删除用旧模板生成的内容"""
+        conn = self._connect()
+        with conn:
+            deleted = conn.execute('DELETE FROM content_cache WHERE template_hash != ?',
+                                   (template_hash,)).rowcount
+        if deleted:
+            with self._lock:
+                self._memory.clear()
+        return deleted
+
+
+class CircuitBreaker:
+    """
+    单个provider的熔断器
+    连续失败达到阈值后打开，打开期间直接拒绝请求（调用方立即使用默认内容）；
+    经过 reset_timeout 后进入半开状态，放行一个试探请求，成功则关闭
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def available(self) -> bool:
+        """allow() 是否可能放行（不占用半开状态的试探名额），供路由挑选provider"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return time.monotonic() - self._opened_at >= self.reset_timeout
+            return not self._trial_in_flight
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def abandon(self):
+        """调用被取消、结果未知（异步对冲的落败方、客户端断开）：归还半开状态的试探名额"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"AI circuit breaker opened after {self._failures} failures")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+class SingleFlight:
+    """
+    合并同一个键的并发请求：同一时间只有一个调用真正执行，其余调用等待并共享结果
+    提供 lock_dir 时，还会用文件锁在多个 worker 进程之间串行化同一个键
+    """
+
+    class _Call:
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self, lock_dir: Optional[str] = None):
+        self.lock_dir = lock_dir
+        self._calls = {}
+        self._lock = threading.Lock()
+        if lock_dir and fcntl is not None:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def do(self, key: str, fn):
+        """执行 fn()，或等待同一个键正在进行的调用并返回它的结果"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    @contextmanager
+    def process_lock(self, key: str):
+        """跨进程的独占文件锁（每个键一个锁文件）"""
+        if not self.lock_dir or fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.lock_dir, key[:32] + '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
 class AIService:
     def __init__(self):
         # API配置 - 在生产环境中应该从环境变量读取
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
         self.ai_provider = os.getenv('AI_PROVIDER', 'openai')
         self.model_name = os.getenv('OPENAI_MODEL', 'gpt-3.5-turbo')
+        # 可指向本地模拟服务器（mock_llm_server.py）或其他兼容端点
+        self.openai_base_url = os.getenv('OPENAI_BASE_URL') or None
+        self.zhipu_api_base = os.getenv('ZHIPU_API_BASE', 'https://open.bigmodel.cn/api/paas/v3/model-api')
+        self.local_base_url = os.getenv('LOCAL_LLM_BASE_URL', 'http://127.0.0.1:11434/v1')
+        self.local_model = os.getenv('LOCAL_LLM_MODEL', 'qwen2.5:7b-instruct')
+        self.local_api_key = os.getenv('LOCAL_LLM_API_KEY', 'local')
+        # AI_PROVIDERS=openai,zhipu,local 时按延迟在多个provider之间路由；未设置时只用 AI_PROVIDER
+        names = os.getenv('AI_PROVIDERS') or self.ai_provider
+        requested = [name.strip() for name in names.split(',') if name.strip() in SUPPORTED_PROVIDERS]
+        # 没有配置API密钥的provider不参与路由，否则每张卡片都会排队注定失败的后台生成并触发熔断
+        self.providers = [provider for provider in requested if self._has_credentials(provider)]
+        if len(self.providers) < len(requested):
+            missing = ', '.join(provider for provider in requested if provider not in self.providers)
+            print(f"AI providers without an API key are disabled: {missing}")
+        if os.getenv('AI_PROVIDERS') and self.providers:
+            self.ai_provider = self.providers[0]
+        # OpenAI的JSON模式（response_format=json_object）；不支持该参数的兼容端点可设为0关闭
+        self.json_mode = os.getenv('AI_JSON_MODE', '1') != '0'
+
+        # 内容缓存：提示词模板变化时，旧模板生成的内容自动失效
+        self.prompt_template_hash = self._prompt_template_hash()
+        self.content_cache = ContentCache(
+            os.getenv('AI_CACHE_FILE', 'ai_cache.db'),
+            max_entries=int(os.getenv('AI_CACHE_SIZE', '1024')),
+            ttl=float(os.getenv('AI_CACHE_TTL', '3600')),
+            disk_ttl=float(os.getenv('AI_CACHE_DISK_TTL', str(30 * 86400)))
+        )
+        purged = self.content_cache.purge_stale_templates(self.prompt_template_hash)
+        if purged:
+            print(f"AI content cache: purged {purged} entries from an old prompt template")
         
-    def generate_word_content(self, word: str, word_info: Dict) -> Dict:
+        # 同一个单词的并发生成请求只调用一次provider（进程内 + 跨worker文件锁）
+        self.single_flight = SingleFlight(os.getenv('AI_LOCK_DIR', self.content_cache.path + '.locks'))
+        
+        # 连接复用、重试和熔断配置
+        self.request_timeout = float(os.getenv('AI_REQUEST_TIMEOUT', '10'))
+        self.max_retries = int(os.getenv('AI_MAX_RETRIES', '2'))
+        self.retry_backoff = float(os.getenv('AI_RETRY_BACKOFF', '0.5'))
+        # 响应中部分字段缺失或无效时，只为这些字段追加请求的次数
+        self.field_retries = int(os.getenv('AI_FIELD_RETRIES', '1'))
+        pool_size = int(os.getenv('AI_HTTP_POOL_SIZE', '10'))
+        
+        # 长连接的HTTP会话，避免每次请求都重新进行TCP+TLS握手
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.http.mount('https://', adapter)
+        self.http.mount('http://', adapter)
+        
+        self._openai_clients = {}
+        self._client_lock = threading.Lock()
+        
+        self.breakers = {
+            provider: CircuitBreaker(
+                failure_threshold=int(os.getenv('AI_BREAKER_THRESHOLD', '5')),
+                reset_timeout=float(os.getenv('AI_BREAKER_RESET', '30'))
+            )
+            for provider in SUPPORTED_PROVIDERS
+        }
+        
+        # 按各provider的延迟和错误率选择最快的健康provider，超过对冲期限时向第二名发送备份请求
+        slo_ms = float(os.getenv('AI_LATENCY_SLO_MS', '0'))
+        self.router = ProviderRouter(
+            self.providers,
+            self.breakers,
+            slo=slo_ms / 1000 if slo_ms > 0 else None,
+            alpha=float(os.getenv('AI_ROUTER_EWMA_ALPHA', '0.2')),
+            hedge_ratio=float(os.getenv('AI_HEDGE_MAX_RATIO', '0.1'))
+        )
+        
+        registry.register_collector(self._collect_metrics)
+    
+    def _has_credentials(self, provider: str) -> bool:
+        """本地端点和模拟provider不需要密钥"""
+        if provider == 'openai':
+            return bool(self.openai_api_key)
+        if provider == 'zhipu':
+            return bool(os.getenv('ZHIPU_API_KEY'))
+        return True
+    
+    def _provider_model(self, provider: Optional[str] = None) -> str:
+        provider = provider or self.ai_provider
+        if provider == 'zhipu':
+            return 'chatglm_turbo'
+        if provider == 'mock':
+            return 'mock'
+        if provider == 'local':
+            return self.local_model
+        return self.model_name
+    
+    @property
+    def cache_provider(self) -> str:
+        """缓存键中的provider：路由时是所有provider，任何一个生成的内容都可以共用"""
+        return '+'.join(self.providers) or self.ai_provider
+    
+    @property
+    def cache_model(self) -> str:
+        return '+'.join(self._provider_model(provider) for provider in self.providers) or self._provider_model()
+    
+    def _prompt_template_hash(self) -> str:
+        """用占位符渲染所有内容类型的提示词模板并取哈希，模板文本变化时哈希随之变化"""
+        placeholder_info = {
+            'pronunciation': '{pronunciation}',
+            'definition_en': '{definition_en}',
+            'definition_zh': '{definition_zh}'
+        }
+        templates = [self._create_word_prompt('{word}', placeholder_info, fields)
+                     for fields in CONTENT_TYPE_FIELDS.values() if fields]
+        return hashlib.sha256('\x00'.join(templates).encode('utf-8')).hexdigest()[:16]
+    
+    @staticmethod
+    def normalize_content_type(content_type: Optional[str]) -> str:
+        """未知的内容类型按 all 处理"""
+        return content_type if content_type in CONTENT_TYPE_FIELDS else 'all'
+    
+    def content_cache_key(self, word: str, content_type: str = 'all') -> str:
+        return ContentCache.make_key(word, self.cache_provider, self.cache_model, self.prompt_template_hash,
+                                     content_type)
+    
+    def get_cached_content(self, word: str, word_info: Dict, content_type: str = 'all') -> Optional[Dict]:
+        """只查缓存、不调用AI；命中时返回增强后的单词数据（完整内容也可以满足部分内容类型）"""
+        content_type = self.normalize_content_type(content_type)
+        if not CONTENT_TYPE_FIELDS[content_type]:
+            return word_info.copy()
+        cached = self.content_cache.get(self.content_cache_key(word, content_type))
+        if cached is None and content_type != 'all':
+            cached = self.content_cache.get(self.content_cache_key(word))
+        if cached is None:
+            return None
+        enhanced_info = word_info.copy()
+        enhanced_info.update(cached)
+        return enhanced_info
+    
+    @property
+    def ai_enabled(self) -> bool:
+        """是否有配置了密钥的AI provider（否则只会返回默认内容）"""
+        return bool(self.providers)
+    
+    def generate_word_content(self, word: str, word_info: Dict, content_type: str = 'all') -> Dict:
         """
         使用AI生成单词学习内容
-        包括：词根词缀解析、记忆方法、同义词练习等
+        content_type 为 memory / etymology 时只生成对应字段（提示词更短、输出token更少）
         """
+        if not self.ai_enabled:
+            # 如果没有配置AI API，返回默认内容
+            AI_FALLBACKS.inc(reason='disabled')
+            return self._generate_fallback_content(word, word_info)
+        
         try:
-            if self.ai_provider == 'openai':
-                return self._generate_with_openai(word, word_info)
-            elif self.ai_provider == 'zhipu':
-                return self._generate_with_zhipu(word, word_info)
-            else:
-                # 如果没有配置AI API，返回默认内容
-                return self._generate_fallback_content(word, word_info)
+            return self.generate_ai_content(word, word_info, content_type)
         except Exception as e:
-            print(f"AI generation error: {e}")
-            return self._generate_fallback_content(word, word_info)
+            return self._content_on_error(e, word, word_info)
     
-    def _generate_with_openai(self, word: str, word_info: Dict) -> Dict:
-        """使用OpenAI API生成内容"""
-        
-        prompt = self._create_word_prompt(word, word_info)
+    def _content_on_error(self, error: Exception, word: str, word_info: Dict) -> Dict:
+        """生成失败时返回的内容（异步路径共用）：解析失败返回基础词条，其他错误返回默认内容"""
+        if isinstance(error, AIResponseParseError):
+            print(f"Response parsing error: {error}")
+            AI_FALLBACKS.inc(reason='parse_error')
+            return word_info
+        print(f"AI generation error: {error}")
+        breaker_open = all(self.breakers[provider].state == CircuitBreaker.OPEN for provider in self.providers)
+        AI_FALLBACKS.inc(reason='breaker_open' if breaker_open else 'error')
+        return self._generate_fallback_content(word, word_info)
+    
+    def generate_ai_content(self, word: str, word_info: Dict, content_type: str = 'all') -> Dict:
+        """
+        查缓存或调用AI provider生成内容
+        失败时抛出异常而不是返回默认内容，供后台任务区分成功与失败
+        """
+        content_type = self.normalize_content_type(content_type)
+        cached = self.get_cached_content(word, word_info, content_type)
+        if cached is not None:
+            return cached
         
-        try:
-            from openai import OpenAI
+        key = self.content_cache_key(word, content_type)
+        content = self.single_flight.do(key, lambda: self._generate_uncached(key, word, word_info, content_type))
+        enhanced_info = word_info.copy()
+        enhanced_info.update(content)
+        return enhanced_info
+    
+    def _generate_uncached(self, key: str, word: str, word_info: Dict, content_type: str = 'all') -> Dict:
+        """持有跨进程锁调用provider；拿到锁后先复查缓存，其他worker可能刚刚生成完"""
+        with self.single_flight.process_lock(key):
+            cached = self.content_cache.get(key)
+            if cached is not None:
+                return cached
             
-            client = OpenAI(api_key=self.openai_api_key)
+            if not self.providers:
+                raise AIProviderError(f"Unknown AI provider: {self.ai_provider}")
             
-            response = client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are an expert GRE vocabulary tutor. Generate educational content for word learning in JSON format."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1500,
-                temperature=0.7
-            )
+            def generate(provider, cancelled, fields, purpose):
+                return self._call_provider(provider, partial(self._generator(provider), fields=fields, purpose=purpose),
+                                           word, word_info, purpose, cancelled)
             
-            content = response.choices[0].message.content
-            return self._parse_ai_response(content, word, word_info)
+            # 路由到最快的健康provider，慢请求对冲到第二名
+            parsed = self.router.call(partial(generate, fields=list(CONTENT_TYPE_FIELDS[content_type]),
+                                              purpose=content_type))
+            fields = dict(parsed.fields)
+            missing = parsed.missing
             
-        except Exception as e:
-            print(f"OpenAI API error: {e}")
-            return self._generate_fallback_content(word, word_info)
+            def regenerate(provider, cancelled):
+                AI_FIELD_REGENERATIONS.inc(provider=provider)
+                return generate(provider, cancelled, missing, 'field_retry')
+            
+            # 保留有效字段，只为缺失或无效的字段追加请求，而不是整份重新生成
+            for _ in range(self.field_retries if missing else 0):
+                try:
+                    retry = self.router.call(regenerate)
+                except Exception as e:
+                    print(f"AI field regeneration error: {e}")
+                    break
+                fields.update(retry.fields)
+                missing = [field for field in missing if field not in fields]
+                if not missing:
+                    break
+            
+            # 只缓存AI真正生成的完整内容：默认内容不缓存，补生成后仍缺字段的内容也不缓存，
+            # 否则缺失的字段在缓存过期（默认30天）之前都不会再生成
+            content = content_from_fields(fields)
+            if not missing:
+                self.content_cache.set(key, content, word, self.cache_provider, self.cache_model,
+                                       self.prompt_template_hash)
+            return content
+    
+    def _generator(self, provider: str):
+        """provider对应的单词内容生成函数"""
+        if provider == 'openai':
+            return self._generate_with_openai
+        if provider == 'local':
+            return partial(self._generate_with_openai, provider='local')
+        if provider == 'zhipu':
+            return self._generate_with_zhipu
+        if provider == 'mock':
+            return self._generate_with_mock
+        raise AIProviderError(f"Unknown AI provider: {provider}")
+    
+    def _call_provider(self, provider: str, generate, word: str, word_info: Dict,
+                       content_type: str = 'all', cancelled: Optional[threading.Event] = None) -> ParsedContent:
+        """
+        通过熔断器调用provider，对临时错误做有限次数的抖动退避重试
+        熔断器打开时立即抛出异常，调用方无需等待超时即可使用默认内容
+        对冲请求已经分出胜负时（cancelled 被设置），落败的一方不再重试
+        """
+        breaker = self.breakers[provider]
+        if not breaker.allow():
+            raise AIProviderError(f"{provider} circuit breaker is open")
+        
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                result = generate(word, word_info)
+            except AIResponseParseError:
+                # provider正常响应，只是内容无法解析，不计入熔断
+                elapsed = time.perf_counter() - started
+                AI_PROVIDER_SECONDS.observe(elapsed, provider=provider, content_type=content_type,
+                                            outcome='parse_error')
+                AI_PARSE_FAILURES.inc(provider=provider)
+                self.router.record(provider, elapsed, ok=True)
+                breaker.record_success()
+                raise
+            except Exception as e:
+                elapsed = time.perf_counter() - started
+                AI_PROVIDER_SECONDS.observe(elapsed, provider=provider, content_type=content_type, outcome='error')
+                self.router.record(provider, elapsed, ok=False)
+                if attempt < self.max_retries and self._is_retryable(e) and \
+                        not (cancelled is not None and cancelled.is_set()):
+                    time.sleep(self._backoff_delay(attempt))
+                    continue
+                breaker.record_failure()
+                raise
+            elapsed = time.perf_counter() - started
+            AI_PROVIDER_SECONDS.observe(elapsed, provider=provider, content_type=content_type, outcome='ok')
+            self.router.record(provider, elapsed, ok=True)
+            breaker.record_success()
+            return result
+    
+    @staticmethod
+    def _record_usage(provider: str, content_type: str, prompt_tokens, completion_tokens):
+        """记录provider返回的token用量；在解析响应之前调用，解析失败的响应同样计入"""
+        if prompt_tokens:
+            AI_TOKENS.inc(prompt_tokens, provider=provider, content_type=content_type, kind='prompt')
+        if completion_tokens:
+            AI_TOKENS.inc(completion_tokens, provider=provider, content_type=content_type, kind='completion')
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        """指数退避加随机抖动，避免多个worker同时重试"""
+        return self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
     
-    def _generate_with_zhipu(self, word: str, word_info: Dict) -> Dict:
-        """使用智谱AI API生成内容"""
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, AIProviderError):
+            return error.retryable
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        # OpenAI SDK：连接/超时错误没有状态码，其余按HTTP状态码判断
+        status_code = getattr(error, 'status_code', None)
+        if status_code is None:
+            return type(error).__name__ in ('APIConnectionError', 'APITimeoutError')
+        return status_code in RETRYABLE_STATUS_CODES
+    
+    def _get_openai_client(self, provider: str = 'openai'):
+        """
+        每个OpenAI兼容的provider（openai、local）复用同一个客户端（内部维护连接池）；
+        重试由 _call_provider 负责
+        """
+        client = self._openai_clients.get(provider)
+        if client is None:
+            with self._client_lock:
+                client = self._openai_clients.get(provider)
+                if client is None:
+                    if provider == 'local':
+                        api_key, base_url = self.local_api_key, self.local_base_url
+                    else:
+                        api_key, base_url = self.openai_api_key, self.openai_base_url
+                    if not api_key:
+                        raise AIProviderError("OPENAI_API_KEY is not set")
+                    from openai import OpenAI
+                    client = OpenAI(api_key=api_key, base_url=base_url, timeout=self.request_timeout, max_retries=0)
+                    self._openai_clients[provider] = client
+        return client
+    
+    def _generate_with_openai(self, word: str, word_info: Dict, fields: Optional[List[str]] = None,
+                              purpose: str = 'all', provider: str = 'openai') -> ParsedContent:
+        """
+        使用OpenAI API（或 provider='local' 的OpenAI兼容端点）生成内容
+        fields 指定时只生成这些字段，JSON模式保证返回一个JSON对象
+        """
+        fields = fields or list(CONTENT_TYPE_FIELDS['all'])
+        prompt = self._create_word_prompt(word, word_info, fields)
+        
+        client = self._get_openai_client(provider)
+        
+        options = {'response_format': {'type': 'json_object'}} if self.json_mode else {}
+        response = client.chat.completions.create(
+            model=self._provider_model(provider),
+            messages=[
+                {"role": "system", "content": WORD_CONTENT_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_completion_tokens(fields),
+            temperature=0.7,
+            **options
+        )
+        
+        usage = response.usage
+        if usage is not None:
+            self._record_usage(provider, purpose, usage.prompt_tokens, usage.completion_tokens)
+        content = response.choices[0].message.content
+        return self._parse_content(content, fields)
+    
+    def _generate_with_zhipu(self, word: str, word_info: Dict, fields: Optional[List[str]] = None,
+                             purpose: str = 'all') -> ParsedContent:
+        """使用智谱AI API生成内容；fields 指定时只生成这些字段（没有JSON模式，靠提示词约束格式）"""
         # 智谱AI API集成示例
         api_key = os.getenv('ZHIPU_API_KEY', '')
         
         if not api_key:
-            return self._generate_fallback_content(word, word_info)
+            raise AIProviderError("ZHIPU_API_KEY is not set")
         
-        url = "https://open.bigmodel.cn/api/paas/v3/model-api/chatglm_turbo/invoke"
+        url = f"{self.zhipu_api_base}/chatglm_turbo/invoke"
         
-        prompt = self._create_word_prompt(word, word_info)
+        fields = fields or list(CONTENT_TYPE_FIELDS['all'])
+        prompt = self._create_word_prompt(word, word_info, fields)
         
         headers = {
             "Authorization": f"Bearer {api_key}",
@@ -79,123 +739,181 @@ class AIService:
         data = {
             "prompt": prompt,
             "temperature": 0.7,
-            "max_tokens": 1000
+            "max_tokens": max_completion_tokens(fields)
         }
         
+        response = self.http.post(url, headers=headers, json=data, timeout=self.request_timeout)
+        if response.status_code != 200:
+            raise AIProviderError(f"Zhipu API returned HTTP {response.status_code}",
+                                  retryable=response.status_code in RETRYABLE_STATUS_CODES)
+        
+        result = response.json().get('data', {})
+        usage = result.get('usage') or {}
+        self._record_usage('zhipu', purpose, usage.get('prompt_tokens'), usage.get('completion_tokens'))
+        content = result.get('choices', [{}])[0].get('content', '')
+        return self._parse_content(content, fields)
+    
+    def stream_chat(self, system_prompt: str, user_message: str):
+        """
+        流式聊天：逐段产出模型生成的文本
+        在产出第一段之前失败会抛出异常，调用方可以改用关键词回复
+        流式请求不做对冲，只发给当前最快的健康provider
+        """
+        if not self.providers:
+            raise AIProviderError(f"AI provider '{self.ai_provider}' does not support chat")
+        provider = self.router.ranked()[0]
+        if provider in ('openai', 'local'):
+            stream = partial(self._stream_with_openai, provider=provider)
+        elif provider == 'zhipu':
+            stream = self._stream_with_zhipu
+        else:
+            stream = self._stream_with_mock
+        
+        breaker = self.breakers[provider]
+        if not breaker.allow():
+            raise AIProviderError(f"{provider} circuit breaker is open")
+        
+        started = time.perf_counter()
+        first = True
         try:
-            response = requests.post(url, headers=headers, json=data, timeout=10)
-            if response.status_code == 200:
-                result = response.json()
-                content = result.get('data', {}).get('choices', [{}])[0].get('content', '')
-                return self._parse_ai_response(content, word, word_info)
-            else:
-                return self._generate_fallback_content(word, word_info)
-        except Exception as e:
-            print(f"Zhipu API error: {e}")
-            return self._generate_fallback_content(word, word_info)
+            for chunk in stream(system_prompt, user_message):
+                if chunk:
+                    if first:
+                        AI_CHAT_TTFT.observe(time.perf_counter() - started, provider=provider)
+                        first = False
+                    yield chunk
+        except GeneratorExit:
+            # 客户端断开、生成器被关闭：结果未知，归还半开状态的试探名额
+            breaker.abandon()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
     
-    def _create_word_prompt(self, word: str, word_info: Dict) -> str:
-        """创建AI提示词"""
-        return f"""
-        请为GRE单词 "{word}" 生成以下学习内容，要求准确、有趣、易记：
-
-        单词信息：
-        - 发音：{word_info.get('pronunciation', '')}
-        - 英文释义：{word_info.get('definition_en', '')}
-        - 中文释义：{word_info.get('definition_zh', '')}
+    def _stream_with_openai(self, system_prompt: str, user_message: str, provider: str = 'openai'):
+        client = self._get_openai_client(provider)
+        response = client.chat.completions.create(
+            model=self._provider_model(provider),
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message}
+            ],
+            max_tokens=800,
+            temperature=0.7,
+            stream=True
+        )
+        for chunk in response:
+            if chunk.choices:
+                yield chunk.choices[0].delta.content
+    
+    def _stream_with_zhipu(self, system_prompt: str, user_message: str):
+        api_key = os.getenv('ZHIPU_API_KEY', '')
+        if not api_key:
+            raise AIProviderError("ZHIPU_API_KEY is not set")
         
-        请生成：
-        1. 词根词缀分析（如果有的话）：
-           - 拆解词根、前缀、后缀
-           - 每个部分的含义
-           - 组合后的含义解释
-
-        2. 记忆方法（请提供3种）：
-           - 联想记忆法：编写一个有趣的小故事
-           - 谐音记忆法：利用谐音帮助记忆
-           - 视觉记忆法：创造形象的画面联想
-
-        3. 6个同义词选项（用于六选二练习）：
-           - 包含2个正确同义词
-           - 4个干扰选项（意思相近但不完全相同）
-
-        4. 4个释义选项（用于释义练习）：
-           - 1个正确释义
-           - 3个错误但相似的释义
-
-        请以JSON格式返回，包含以下字段：
-        etymology_parts, etymology_explanation, memory_story, memory_phonetic, memory_visual, 
-        synonym_options, correct_synonyms, definition_options, correct_definition_index
+        url = f"{self.zhipu_api_base}/chatglm_turbo/sse-invoke"
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Accept": "text/event-stream"
+        }
+        data = {
+            "prompt": self._zhipu_chat_prompt(system_prompt, user_message),
+            "temperature": 0.7
+        }
+        
+        with self.http.post(url, headers=headers, json=data, timeout=self.request_timeout, stream=True) as response:
+            if response.status_code != 200:
+                raise AIProviderError(f"Zhipu API returned HTTP {response.status_code}")
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith('data:'):
+                    yield line[5:]
+    
+    @staticmethod
+    def _zhipu_chat_prompt(system_prompt: str, user_message: str) -> List[Dict]:
+        """chatglm_turbo 没有 system 角色，系统提示作为第一轮对话发送"""
+        return [
+            {"role": "user", "content": system_prompt},
+            {"role": "assistant", "content": "好的。"},
+            {"role": "user", "content": user_message}
+        ]
+    
+    def _stream_with_mock(self, system_prompt: str, user_message: str):
+        latency = float(os.getenv('MOCK_AI_LATENCY', '0.05'))
+        answer = self._mock_chat_answer(user_message)
+        for i in range(0, len(answer), 4):
+            time.sleep(latency / 5)
+            yield answer[i:i + 4]
+    
+    @staticmethod
+    def _mock_chat_answer(user_message: str) -> str:
+        return f"[mock] 关于你的问题「{user_message}」：这是本地模拟provider的流式回复。"
+    
+    def _collect_metrics(self):
+        """抓取/metrics时读取内容缓存统计和熔断器状态"""
+        stats = dict(self.content_cache.stats)
+        yield ('acegre_ai_cache_events_total', 'counter', 'AI content cache lookups and evictions',
+               [({'event': event}, count) for event, count in stats.items()])
+        yield ('acegre_ai_circuit_breaker_open', 'gauge', '1 while the provider circuit breaker is not closed',
+               [({'provider': provider}, int(breaker.state != CircuitBreaker.CLOSED))
+                for provider, breaker in self.breakers.items()])
+    
+    def _generate_with_mock(self, word: str, word_info: Dict, fields: Optional[List[str]] = None,
+                            purpose: str = 'all') -> ParsedContent:
+        """本地模拟provider（AI_PROVIDER=mock），用于测试和预生成演练，不产生API费用"""
+        time.sleep(float(os.getenv('MOCK_AI_LATENCY', '0.05')))
+        content = self._mock_content(word, word_info, fields)
+        # 与 mock_llm_server.py 相同的粗略估算（约2个字符1个token）
+        self._record_usage('mock', purpose, len(self._create_word_prompt(word, word_info, fields)) // 2,
+                           len(content) // 2)
+        return self._parse_content(content, fields)
+    
+    @staticmethod
+    def _mock_content(word: str, word_info: Dict, fields: Optional[List[str]] = None) -> str:
+        data = {
+            'etymology_parts': [{'part': word[:3], 'meaning': 'root'}, {'part': word[3:], 'meaning': 'suffix'}],
+            'etymology_explanation': f"Mock etymology for '{word}'",
+            'memory_story': f"[mock] 关于'{word}'的联想故事：{word_info.get('definition_zh', '')}",
+            'memory_phonetic': f"[mock] '{word}'的谐音记忆",
+            'memory_visual': f"[mock] '{word}'的视觉画面"
+        }
+        if fields:
+            data = {field: value for field, value in data.items() if field in fields}
+        return json.dumps(data, ensure_ascii=False)
+    
+    def _create_word_prompt(self, word: str, word_info: Dict, fields: Optional[List[str]] = None) -> str:
+        """
+        创建AI提示词：只列出本次要生成的字段，不带示例和多余说明
+        fields 省略时生成全部字段
+        """
+        wanted = '\n'.join(f"- {field}：{FIELD_DESCRIPTIONS[field]}"
+                           for field in fields or CONTENT_TYPE_FIELDS['all'])
+        return (f"GRE单词 \"{word}\" {word_info.get('pronunciation', '')}："
+                f"{word_info.get('definition_en', '')}；{word_info.get('definition_zh', '')}\n"
+                f"用中文生成准确、有趣、易记的学习内容，只返回包含以下字段的JSON对象：\n{wanted}")
+    
+    def _parse_content(self, content: str, fields: Optional[List[str]] = None) -> ParsedContent:
         """
+        解析AI响应：从代码块或前后文字中提取JSON，按字段校验，保留所有有效字段
+        每个缺失或无效的字段计入监控；一个有效字段都没有时抛出 AIResponseParseError
+        """
+        schema = {field: WORD_CONTENT_SCHEMA[field] for field in fields} if fields else WORD_CONTENT_SCHEMA
+        parsed = parse_word_content(content, schema)
+        for field, reason in parsed.errors.items():
+            AI_FIELD_FAILURES.inc(field=field, reason=reason)
+        if not parsed.fields:
+            raise AIResponseParseError(f"No usable fields in AI response: {parsed.errors}")
+        return parsed
     
     def _parse_ai_response(self, content: str, word: str, word_info: Dict) -> Dict:
-        """解析AI响应并格式化"""
-        try:
-            # 尝试解析JSON响应
-            if content.strip().startswith('{'):
-                ai_data = json.loads(content)
-            else:
-                # 如果不是JSON格式，手动解析
-                ai_data = self._manual_parse_response(content)
-            
-            # 更新原始单词信息
-            enhanced_info = word_info.copy()
-            
-            # 词根词缀
-            if 'etymology_parts' in ai_data:
-                enhanced_info['etymology'] = {
-                    'parts': ai_data['etymology_parts'],
-                    'explanation': ai_data.get('etymology_explanation', '')
-                }
-            
-            # 记忆方法
-            enhanced_info['memory_story'] = ai_data.get('memory_story', word_info.get('memory_story', ''))
-            enhanced_info['memory_phonetic'] = ai_data.get('memory_phonetic', word_info.get('memory_phonetic', ''))
-            enhanced_info['memory_visual'] = ai_data.get('memory_visual', word_info.get('memory_visual', ''))
-            
-            # 同义词选项
-            if 'synonym_options' in ai_data:
-                enhanced_info['synonym_options'] = ai_data['synonym_options']
-                enhanced_info['synonyms'] = ai_data.get('correct_synonyms', [0, 1])
-            
-            # 释义选项
-            if 'definition_options' in ai_data:
-                enhanced_info['definition_options'] = ai_data['definition_options']
-                enhanced_info['correct_definition'] = ai_data.get('correct_definition_index', 0)
-            
-            return enhanced_info
-            
-        except Exception as e:
-            print(f"Response parsing error: {e}")
-            return word_info
+        """解析AI响应并合并到单词信息中（同义词和释义练习保留单词库中离线生成的版本）"""
+        enhanced_info = word_info.copy()
+        enhanced_info.update(content_from_fields(self._parse_content(content).fields))
+        return enhanced_info
     
     def _manual_parse_response(self, content: str) -> Dict:
-        """手动解析非JSON格式的AI响应"""
-        # 简单的文本解析逻辑
-        result = {}
-        
-        lines = content.split('\n')
-        current_section = None
-        
-        for line in lines:
-            line = line.strip()
-            if '词根词缀' in line or 'etymology' in line.lower():
-                current_section = 'etymology'
-            elif '联想记忆' in line or 'story' in line.lower():
-                current_section = 'story'
-            elif '谐音记忆' in line or 'phonetic' in line.lower():
-                current_section = 'phonetic'
-            elif '视觉记忆' in line or 'visual' in line.lower():
-                current_section = 'visual'
-            elif line and current_section:
-                if current_section == 'story':
-                    result['memory_story'] = line
-                elif current_section == 'phonetic':
-                    result['memory_phonetic'] = line
-                elif current_section == 'visual':
-                    result['memory_visual'] = line
-        
-        return result
+        """手动解析非JSON格式的AI响应（按小节标题收集每一节的所有行）"""
+        return parse_sections(content)
     
     def _generate_fallback_content(self, word: str, word_info: Dict) -> Dict:
         """生成默认内容（当AI API不可用时）"""
@@ -252,3 +970,14 @@ def generate_custom_exercise(word: str, exercise_type: str) -> Dict:
         'options': ['Option A', 'Option B', 'Option C', 'Option D'],
         'correct_answer': 0
     }
+
+if __name__ == '__main__':
+    import sys
+    
+    if len(sys.argv) < 2 or sys.argv[1] != 'cache-clear':
+        print("Usage: python ai_service.py cache-clear [word]")
+        sys.exit(1)
+    
+    target_word = sys.argv[2] if len(sys.argv) > 2 else None
+    removed = ai_service.content_cache.invalidate(target_word)
+    print(f"✅ Removed {removed} cached entries{' for ' + target_word if target_word else ''}")
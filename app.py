@@ -1,190 +1,107 @@
-from flask import Flask, render_template, redirect, url_for, session, request, jsonify
+from flask import Flask, render_template, redirect, url_for, session, request, jsonify, Response, stream_with_context, g, abort, send_file
+import hashlib
 import json
 import os
-import random
+import time
 from datetime import datetime
-from ai_service import ai_service, enhance_word_with_ai
+from typing import Optional
+from ai_service import ai_service
+from user_store import create_user_store, default_study_progress
+from word_bank import WordBank, DEFAULT_WORD_BANK_FILE
+from word_sampler import WordSampler
+from intent_engine import IntentEngine, DEFAULT_INTENTS_FILE
+from retrieval import RetrievalIndex
+from srs import ReviewScheduler, grade_from_score
+from enrichment import EnrichmentQueue
+from metrics import registry, CONTENT_TYPE
+from profiling import RequestProfiler, PROFILE_HEADER
+from assets import AssetManifest, IMMUTABLE_CACHE_CONTROL
 
 app = Flask(__name__)
 app.secret_key = 'acegre_secret_key_2024'  # For session management
 
-# Simple user storage (in production, use a proper database)
-USERS_FILE = 'users.json'
-
-# GRE Word Database (in production, use a proper database)
-GRE_WORDS = [
-    {
-        "word": "abstruse",
-        "pronunciation": "/æbˈstrus/",
-        "level": "hard",
-        "definition_en": "Difficult to understand; obscure",
-        "definition_zh": "难以理解的；深奥的",
-        "etymology": {
-            "parts": [
-                {"part": "ab-", "meaning": "away from"},
-                {"part": "trus", "meaning": "thrust"},
-                {"part": "-e", "meaning": "adjective suffix"}
-            ],
-            "explanation": "Originally meaning 'thrust away' or hidden from understanding"
-        },
-        "synonym_options": ["obscure", "clear", "complex", "transparent", "convoluted", "obvious"],
-        "synonyms": [0, 4],  # obscure, convoluted
-        "definition_options": [
-            "Difficult to understand; obscure",
-            "Easy to comprehend",
-            "Relating to abstract art",
-            "Simple and straightforward"
-        ],
-        "correct_definition": 0,
-        "memory_story": "Imagine an 'abstract' painting that's so 'obtuse' (abstruse) that nobody can understand what it means!",
-        "memory_phonetic": "Ab-STRUS sounds like 'abstract truth' - abstract truths are often hard to understand.",
-        "memory_visual": "Picture a maze with 'ABS' (abstract) pathways that are 'TRUCE' (hard to navigate)"
-    },
-    {
-        "word": "ameliorate",
-        "pronunciation": "/əˈmilyəˌreɪt/",
-        "level": "medium",
-        "definition_en": "To make or become better; improve",
-        "definition_zh": "改善；改进",
-        "etymology": {
-            "parts": [
-                {"part": "a-", "meaning": "to"},
-                {"part": "melior", "meaning": "better"},
-                {"part": "-ate", "meaning": "verb suffix"}
-            ],
-            "explanation": "From Latin 'melior' meaning better, so literally 'to make better'"
-        },
-        "synonym_options": ["worsen", "improve", "maintain", "enhance", "deteriorate", "upgrade"],
-        "synonyms": [1, 3],  # improve, enhance
-        "definition_options": [
-            "To make worse",
-            "To make or become better; improve",
-            "To remain the same",
-            "To analyze carefully"
-        ],
-        "correct_definition": 1,
-        "memory_story": "Amy's lemonade was terrible, but she worked to 'ameliorate' it by adding more sugar until it was much better!",
-        "memory_phonetic": "A-MELI-ORATE sounds like 'Amy's melody rate' - Amy improved her melody to get a better rate!",
-        "memory_visual": "Picture 'A MELON RATE' - upgrading from bad melons to premium melons for a better rate"
-    },
-    {
-        "word": "castigate",
-        "pronunciation": "/ˈkæstɪˌgeɪt/",
-        "level": "medium",
-        "definition_en": "To criticize or punish severely",
-        "definition_zh": "严厉批评；惩罚",
-        "etymology": {
-            "parts": [
-                {"part": "castig", "meaning": "pure, chaste"},
-                {"part": "-ate", "meaning": "verb suffix"}
-            ],
-            "explanation": "Originally meant 'to make pure' through punishment or discipline"
-        },
-        "synonym_options": ["praise", "scold", "ignore", "rebuke", "compliment", "reward"],
-        "synonyms": [1, 3],  # scold, rebuke
-        "definition_options": [
-            "To praise highly",
-            "To criticize or punish severely",
-            "To ignore completely",
-            "To reward generously"
-        ],
-        "correct_definition": 1,
-        "memory_story": "The knight had to 'castigate' (punish) the soldiers who broke the castle gate rules!",
-        "memory_phonetic": "CASTI-GATE sounds like 'cast the gate' - someone was severely punished and cast out of the gate!",
-        "memory_visual": "Picture a 'CASTLE GATE' where guards severely scold anyone who breaks the rules"
-    },
-    {
-        "word": "ephemeral",
-        "pronunciation": "/ɪˈfɛmərəl/",
-        "level": "hard",
-        "definition_en": "Lasting for a very short time; transitory",
-        "definition_zh": "短暂的；瞬息的",
-        "etymology": {
-            "parts": [
-                {"part": "epi-", "meaning": "upon"},
-                {"part": "hemer", "meaning": "day"},
-                {"part": "-al", "meaning": "adjective suffix"}
-            ],
-            "explanation": "From Greek 'ephemeros' meaning 'lasting only a day'"
-        },
-        "synonym_options": ["permanent", "temporary", "eternal", "fleeting", "lasting", "durable"],
-        "synonyms": [1, 3],  # temporary, fleeting
-        "definition_options": [
-            "Lasting forever",
-            "Lasting for a very short time; transitory",
-            "Happening regularly",
-            "Very important"
-        ],
-        "correct_definition": 1,
-        "memory_story": "The beautiful 'ephemeral' butterfly lived for only one day - like an 'e-femoral' (electronic femur) that breaks quickly!",
-        "memory_phonetic": "E-PHEMER-AL sounds like 'E-FAME-REAL' - electronic fame is often very short-lived and ephemeral!",
-        "memory_visual": "Picture an 'E-FOLDER' that disappears after one day - very ephemeral digital storage"
-    },
-    {
-        "word": "gregarious",
-        "pronunciation": "/grɪˈgeəriəs/",
-        "level": "easy",
-        "definition_en": "Sociable; enjoying the company of others",
-        "definition_zh": "爱社交的；合群的",
-        "etymology": {
-            "parts": [
-                {"part": "greg", "meaning": "flock, herd"},
-                {"part": "-arious", "meaning": "characterized by"}
-            ],
-            "explanation": "From Latin 'grex' meaning flock - someone who likes to be part of a group"
-        },
-        "synonym_options": ["antisocial", "sociable", "isolated", "outgoing", "withdrawn", "lonely"],
-        "synonyms": [1, 3],  # sociable, outgoing
-        "definition_options": [
-            "Preferring to be alone",
-            "Sociable; enjoying the company of others",
-            "Very aggressive",
-            "Extremely quiet"
-        ],
-        "correct_definition": 1,
-        "memory_story": "Greg was so 'gregarious' that everyone called him 'Great Greg' because he loved hanging out with groups!",
-        "memory_phonetic": "GREG-ARIOUS sounds like 'Greg-hilarious' - Greg is so sociable and funny that everyone wants to be around him!",
-        "memory_visual": "Picture 'GREG' surrounded by 'VARIOUS' people - he's gregarious and loves variety in his social circle"
-    },
-    {
-        "word": "laconic",
-        "pronunciation": "/ləˈkɒnɪk/",
-        "level": "medium",
-        "definition_en": "Using few words; concise",
-        "definition_zh": "简洁的；言简意赅的",
-        "etymology": {
-            "parts": [
-                {"part": "Lacon", "meaning": "Laconia (Sparta)"},
-                {"part": "-ic", "meaning": "adjective suffix"}
-            ],
-            "explanation": "From Laconia, region of ancient Sparta, known for brief, pithy speech"
-        },
-        "synonym_options": ["verbose", "concise", "talkative", "brief", "wordy", "lengthy"],
-        "synonyms": [1, 3],  # concise, brief
-        "definition_options": [
-            "Using many words",
-            "Using few words; concise",
-            "Speaking loudly",
-            "Speaking softly"
-        ],
-        "correct_definition": 1,
-        "memory_story": "The 'laconic' speaker was like a 'lack-tonic' - he lacked the tonic of many words and kept it short!",
-        "memory_phonetic": "LACONIC sounds like 'LACK-TONIC' - he lacks the tonic of long speeches, keeps it brief!",
-        "memory_visual": "Picture a 'LAKE-COMIC' who tells very short jokes by the lake - brief and to the point"
-    }
-]
+# User storage: USER_STORE=json (users.json, default) or USER_STORE=sqlite (users.db)
+USERS_FILE = os.getenv('USERS_FILE', 'users.json')
+USERS_DB = os.getenv('USERS_DB', 'users.db')
+user_store = create_user_store(os.getenv('USER_STORE', 'json'), USERS_FILE, USERS_DB)
+
+# GRE word bank, loaded from WORD_BANK_FILE and reloaded when the file changes
+word_bank = WordBank(os.getenv('WORD_BANK_FILE', DEFAULT_WORD_BANK_FILE),
+                     reload_interval=float(os.getenv('WORD_BANK_RELOAD_INTERVAL', '5')))
+
+# Offline chat answers: bilingual intent table compiled into one keyword automaton
+intent_engine = IntentEngine(os.getenv('INTENTS_FILE', DEFAULT_INTENTS_FILE), word_bank)
+
+# BM25F index over word bank passages; confident matches answer chat without an LLM call
+retrieval_index = RetrievalIndex(word_bank, min_confidence=float(os.getenv('CHAT_LOCAL_MIN_CONFIDENCE', '0.1')))
+
+# Per-user pools of unlearned words for /api/word/random
+word_sampler = WordSampler(word_bank, user_store)
+
+# Spaced-repetition schedule; due reviews are served before new words
+review_scheduler = ReviewScheduler(user_store)
+
+# Upper bound on cards per /api/word/batch request
+MAX_WORD_BATCH = 20
+
+# Bounded background pool for AI enrichment of word cards
+enrichment_queue = EnrichmentQueue(ai_service,
+                                   max_workers=int(os.getenv('ENRICHMENT_WORKERS', '4')),
+                                   max_pending=int(os.getenv('ENRICHMENT_MAX_PENDING', '64')))
+
+# Per-endpoint latency, exposed with the other metrics on /metrics
+HTTP_REQUEST_SECONDS = registry.histogram('acegre_http_request_duration_seconds',
+                                          'Request latency by route', ('endpoint', 'method', 'status'))
+CHAT_ANSWERS = registry.counter('acegre_chat_answers_total',
+                                'Chat answers by source (local index, llm, keyword fallback)', ('source',))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
 
-def load_users():
-    """Load users from JSON file"""
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+# Opt-in request profiling: enabled by PROFILE_DIR; requests are picked by
+# PROFILE_SAMPLE_RATE or by sending the X-AceGRE-Profile header with PROFILE_TOKEN
+profiler = RequestProfiler(os.getenv('PROFILE_DIR'),
+                           sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', '0')),
+                           token=os.getenv('PROFILE_TOKEN'),
+                           max_captures=int(os.getenv('PROFILE_MAX_CAPTURES', '200')))
 
-def save_users(users):
-    """Save users to JSON file"""
-    with open(USERS_FILE, 'w', encoding='utf-8') as f:
-        json.dump(users, f, indent=2, ensure_ascii=False)
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if profiler.enabled and profiler.should_profile(request.headers.get(PROFILE_HEADER)):
+        g.profile_capture = profiler.start()
+
+def finish_profile(status):
+    capture = g.pop('profile_capture', None)
+    if capture is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        profiler.finish(capture, endpoint, request.method, request.path, status)
+
+@app.after_request
+def record_request_latency(response):
+    started = g.get('request_started')
+    if started is not None:
+        # Label by route pattern, not raw path, so /api/word/enrichment/<word> stays one series
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint,
+                                     method=request.method, status=response.status_code)
+    finish_profile(response.status_code)
+    return response
+
+@app.teardown_request
+def finish_abandoned_profile(error):
+    # after_request is skipped when a request fails outside the view
+    if g.get('profile_capture') is not None:
+        finish_profile(500)
+
+# Fingerprinted, precompressed assets from build_assets.py (plain static files until built)
+asset_manifest = AssetManifest(os.path.join(app.static_folder, 'dist'))
+
+@app.template_global()
+def asset_url(filename):
+    """URL of a static asset, using its fingerprinted build when one exists"""
+    hashed = asset_manifest.lookup(filename)
+    if hashed:
+        return url_for('built_asset', filename=hashed)
+    return url_for('static', filename=filename)
 
 @app.route('/')
 def language_selection():
@@ -200,8 +117,7 @@ def api_login():
     if not email or not password:
         return jsonify({'success': False, 'message': 'Please fill in all fields'})
     
-    users = load_users()
-    user = users.get(email)
+    user = user_store.get_user(email)
     
     if user and user.get('password') == password:
         # Store user session
@@ -234,26 +150,17 @@ def api_register():
     if len(password) < 6:
         return jsonify({'success': False, 'message': 'Password must be at least 6 characters'})
     
-    users = load_users()
-    
-    if email in users:
-        return jsonify({'success': False, 'message': 'Email already exists'})
-    
     # Create new user
-    users[email] = {
+    created = user_store.create_user(email, {
         'name': name,
         'email': email,
         'password': password,  # In production, hash this!
         'created_at': datetime.now().isoformat(),
-        'study_progress': {
-            'word': {'level': 1, 'completed': 0},
-            'math': {'level': 1, 'completed': 0},
-            'reading': {'level': 1, 'completed': 0},
-            'writing': {'level': 1, 'completed': 0}
-        }
-    }
+        'study_progress': default_study_progress()
+    })
     
-    save_users(users)
+    if not created:
+        return jsonify({'success': False, 'message': 'Email already exists'})
     
     return jsonify({
         'success': True, 
@@ -280,9 +187,7 @@ def dashboard():
     user_name = session.get('user_name', 'User')
     
     # Load user progress
-    users = load_users()
-    user_data = users.get(session['user_id'], {})
-    study_progress = user_data.get('study_progress', {})
+    study_progress = user_store.get_study_progress(session['user_id'])
     
     return render_template('dashboard.html', 
                          language=lang, 
@@ -303,48 +208,167 @@ def word_learning():
 
 @app.route('/api/word/random', methods=['POST'])
 def api_get_random_word():
-    """Get a random word based on difficulty and learned words"""
+    """Get a random unlearned word based on difficulty"""
     if 'user_id' not in session:
         return jsonify({'success': False, 'message': 'Not logged in'})
     
     data = request.get_json()
     difficulty = data.get('difficulty', 'medium')
-    learned_words = data.get('learned_words', [])
     
-    # Filter words by difficulty
-    available_words = [word for word in GRE_WORDS 
-                      if word['level'] == difficulty and word['word'] not in learned_words]
+    payload = next_word_card(session['user_id'], difficulty)
+    if payload is None:
+        return jsonify({'success': False, 'message': 'No words available'}), 404
+    return jsonify(payload)
+
+def next_word_card(user_id, difficulty, submit=None):
+    """
+    Payload of /api/word/random, or None when the word bank is empty
+    (also served by the ASGI entry point, which passes its own submit)
+    """
+    # Due reviews first, then a new unlearned word (learned words come from the user store)
+    word = None
+    due_word = review_scheduler.next_due(user_id)
+    if due_word:
+        word = word_bank.get(due_word)
+    if word is None:
+        word = word_sampler.pick(user_id, difficulty)
+    if word is None:
+        return None
+    
+    # Return the base card right away; AI enrichment runs in the background
+    card, enrichment = card_with_enrichment(word, submit)
+    return word_card(card, enrichment, user_store.is_favorite(user_id, card['word']))
+
+@app.route('/api/word/batch', methods=['POST'])
+def api_get_word_batch():
+    """Get the next few cards in one round trip (the client keeps them in a prefetch queue)"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'})
     
-    # If no words available at this difficulty, use all words
-    if not available_words:
-        available_words = [word for word in GRE_WORDS if word['word'] not in learned_words]
+    data = request.get_json()
+    difficulty = data.get('difficulty', 'medium')
+    try:
+        count = max(1, min(int(data.get('count', 5)), MAX_WORD_BATCH))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'Invalid count'})
+    # Words the client already holds (current card, queued and recently shown)
+    exclude = set(data.get('exclude') or [])
+    
+    # Due reviews first; each served review is snoozed, so repeated calls give distinct words
+    words = []
+    while len(words) < count:
+        due_word = review_scheduler.next_due(session['user_id'])
+        if due_word is None:
+            break
+        entry = word_bank.get(due_word)
+        if entry is not None and due_word not in exclude:
+            words.append(entry)
+            exclude.add(due_word)
+    words.extend(word_sampler.pick_many(session['user_id'], difficulty, count - len(words), exclude))
     
-    # If still no words, reset learned words
-    if not available_words:
-        available_words = GRE_WORDS
+    return jsonify({
+        'success': True,
+        'words': [word_card(*card_with_enrichment(entry), user_store.is_favorite(session['user_id'], entry['word']))
+                  for entry in words]
+    })
+
+@app.route('/api/word/enrichment/<word>')
+def api_word_enrichment(word):
+    """Poll for the AI-enhanced version of a word card"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'})
     
-    # Select random word
-    word = random.choice(available_words)
+    entry = word_bank.get(word)
+    if not entry:
+        return jsonify({'success': False, 'message': 'Word not found'})
     
-    # 使用AI增强单词内容（如果需要）
-    enhanced_word = enhance_word_with_ai(word.copy())
+    card, enrichment = card_with_enrichment(entry)
+    if enrichment != 'ready':
+        return jsonify({'success': True, 'enrichment': enrichment})
     
-    return jsonify({
+    # The enhanced card only changes with the corpus or the cached AI content
+    return conditional_json(word_card(card, enrichment, user_store.is_favorite(session['user_id'], word)))
+
+VALIDATED_CACHE_CONTROL = 'private, no-cache'
+
+def conditional_json(payload):
+    """
+    JSON response with an ETag over its body; a matching If-None-Match gets 304.
+    Bodies are deterministic (sorted keys), so the same content always has the same tag.
+    """
+    response = jsonify(payload)
+    response.add_etag()
+    response.headers['Cache-Control'] = VALIDATED_CACHE_CONTROL
+    return response.make_conditional(request)
+
+def make_etag(*parts) -> str:
+    """Validator over the inputs a response is built from, so it can be checked before doing any work"""
+    return hashlib.sha256('\x00'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:32]
+
+def enhance_etag(word: str, content_type: str) -> str:
+    """/api/word/enhance validator: word, corpus version, prompt template and content cache key (provider, model)"""
+    content_type = ai_service.normalize_content_type(content_type)
+    return make_etag(word, word_bank.version, ai_service.prompt_template_hash,
+                     ai_service.content_cache_key(word, content_type))
+
+def progress_etag(user_id: str) -> str:
+    """/api/progress validator from the store's per-user progress version"""
+    return make_etag(user_id, user_store.get_progress_version(user_id))
+
+def not_modified(etag: str, if_none_match) -> Optional[Response]:
+    """304 for a matching If-None-Match (werkzeug ETags), otherwise None"""
+    if not if_none_match.contains_weak(etag):
+        return None
+    return app.response_class(status=304, headers={'ETag': f'"{etag}"', 'Cache-Control': VALIDATED_CACHE_CONTROL})
+
+def tagged(response: Response, etag: str) -> Response:
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = VALIDATED_CACHE_CONTROL
+    return response
+
+def card_with_enrichment(entry, submit=None):
+    """
+    Cached AI content if available, otherwise the base entry with enrichment queued
+    (by submit, default enrichment_queue.submit; the ASGI entry point queues asyncio jobs).
+    Returns (card, enrichment status: ready / pending / failed / none).
+    """
+    if not ai_service.ai_enabled:
+        return entry, 'none'
+    
+    cached = ai_service.get_cached_content(entry['word'], entry)
+    if cached is not None:
+        return cached, 'ready'
+    
+    status, content = enrichment_queue.status(entry['word'])
+    if status == 'ready':
+        return content, 'ready'
+    if status == 'failed':
+        return entry, 'failed'
+    if status is None and not (submit or enrichment_queue.submit)(entry['word'], entry):
+        return entry, 'none'
+    return entry, 'pending'
+
+def word_card(word, enrichment, is_favorite=False):
+    """JSON payload for one word card; is_favorite is the requesting user's star"""
+    return {
         'success': True,
-        'word': enhanced_word['word'],
-        'pronunciation': enhanced_word['pronunciation'],
-        'level': enhanced_word['level'],
-        'definition_en': enhanced_word['definition_en'],
-        'definition_zh': enhanced_word['definition_zh'],
-        'etymology': enhanced_word['etymology'],
-        'synonym_options': enhanced_word['synonym_options'],
-        'synonyms': enhanced_word['synonyms'],
-        'definition_options': enhanced_word['definition_options'],
-        'correct_definition': enhanced_word['correct_definition'],
-        'memory_story': enhanced_word['memory_story'],
-        'memory_phonetic': enhanced_word['memory_phonetic'],
-        'memory_visual': enhanced_word['memory_visual']
-    })
+        'word': word['word'],
+        'pronunciation': word['pronunciation'],
+        'level': word['level'],
+        'definition_en': word['definition_en'],
+        'definition_zh': word['definition_zh'],
+        'etymology': word['etymology'],
+        # Words without hand-picked synonyms have no synonym exercise
+        'synonym_options': word.get('synonym_options', []),
+        'synonyms': word.get('synonyms', []),
+        'definition_options': word['definition_options'],
+        'correct_definition': word['correct_definition'],
+        'memory_story': word['memory_story'],
+        'memory_phonetic': word['memory_phonetic'],
+        'memory_visual': word['memory_visual'],
+        'is_favorite': is_favorite,
+        'enrichment': enrichment
+    }
 
 @app.route('/api/word/favorite', methods=['POST'])
 def api_toggle_favorite():
@@ -355,24 +379,11 @@ def api_toggle_favorite():
     data = request.get_json()
     word = data.get('word')
     
-    users = load_users()
-    user_data = users.get(session['user_id'], {})
-    favorites = user_data.get('favorite_words', [])
-    
-    is_favorite = word in favorites
-    
-    if is_favorite:
-        favorites.remove(word)
-    else:
-        favorites.append(word)
-    
-    user_data['favorite_words'] = favorites
-    users[session['user_id']] = user_data
-    save_users(users)
+    is_favorite = user_store.toggle_favorite(session['user_id'], word)
     
     return jsonify({
         'success': True,
-        'is_favorite': not is_favorite,
+        'is_favorite': is_favorite,
         'message': 'Favorite updated'
     })
 
@@ -385,30 +396,36 @@ def api_mark_learned():
     data = request.get_json()
     word = data.get('word')
     
-    users = load_users()
-    user_data = users.get(session['user_id'], {})
-    learned_words = user_data.get('learned_words', [])
-    
-    if word not in learned_words:
-        learned_words.append(word)
-        user_data['learned_words'] = learned_words
-        
-        # Update study progress
-        if 'study_progress' not in user_data:
-            user_data['study_progress'] = {}
-        if 'word' not in user_data['study_progress']:
-            user_data['study_progress']['word'] = {'level': 1, 'completed': 0}
-        
-        user_data['study_progress']['word']['completed'] += 1
-        
-        users[session['user_id']] = user_data
-        save_users(users)
+    # Also updates the word study progress when the word is new
+    if user_store.mark_learned(session['user_id'], word):
+        word_sampler.mark_learned(session['user_id'], word)
     
     return jsonify({
         'success': True,
         'message': 'Word marked as learned'
     })
 
+@app.route('/api/word/review', methods=['POST'])
+def api_record_review():
+    """Record an exercise outcome and reschedule the word"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'})
+    
+    data = request.get_json()
+    word = data.get('word')
+    score = data.get('score')
+    
+    if not word_bank.get(word) or not isinstance(score, (int, float)):
+        return jsonify({'success': False, 'message': 'Invalid review'})
+    
+    state = review_scheduler.record(session['user_id'], word, grade_from_score(score))
+    
+    return jsonify({
+        'success': True,
+        'due': state['due'],
+        'message': 'Review recorded'
+    })
+
 @app.route('/api/word/enhance', methods=['POST'])
 def api_enhance_word():
     """使用AI增强单词内容"""
@@ -420,40 +437,23 @@ def api_enhance_word():
     content_type = data.get('content_type', 'all')  # all, memory, etymology, exercise
     
     # 找到对应的单词
-    word_data = None
-    for w in GRE_WORDS:
-        if w['word'] == word:
-            word_data = w.copy()
-            break
+    word_data = word_bank.get(word)
     
     if not word_data:
         return jsonify({'success': False, 'message': 'Word not found'})
+    word_data = word_data.copy()
+    
+    # 校验值在生成内容之前就能算出：客户端重新验证时直接返回304，不会再调用AI
+    etag = enhance_etag(word, content_type)
+    response = not_modified(etag, request.if_none_match)
+    if response is not None:
+        return response
     
     try:
-        # 使用AI服务生成内容
-        if content_type == 'memory':
-            # 只生成记忆方法
-            enhanced_content = ai_service.generate_word_content(word, word_data)
-            return jsonify({
-                'success': True,
-                'memory_story': enhanced_content.get('memory_story'),
-                'memory_phonetic': enhanced_content.get('memory_phonetic'),
-                'memory_visual': enhanced_content.get('memory_visual')
-            })
-        elif content_type == 'etymology':
-            # 只生成词根词缀
-            enhanced_content = ai_service.generate_word_content(word, word_data)
-            return jsonify({
-                'success': True,
-                'etymology': enhanced_content.get('etymology')
-            })
-        else:
-            # 生成全部内容
-            enhanced_content = ai_service.generate_word_content(word, word_data)
-            return jsonify({
-                'success': True,
-                'enhanced_data': enhanced_content
-            })
+        # 使用AI服务生成内容（只生成该内容类型需要的字段；已缓存的内容不会再次调用AI）
+        enhanced_content = ai_service.generate_word_content(word, word_data, content_type)
+        return enhance_response(jsonify(enhance_payload(enhanced_content, content_type)), etag, word, word_data,
+                                content_type)
             
     except Exception as e:
         return jsonify({
@@ -461,6 +461,53 @@ def api_enhance_word():
             'message': f'AI enhancement failed: {str(e)}'
         })
 
+def enhance_response(response, etag, word, word_data, content_type):
+    """
+    Tags the response only once its content is cached: default content or content
+    still missing fields would otherwise be pinned by 304s after AI generation succeeds
+    """
+    if not ai_service.ai_enabled or ai_service.get_cached_content(word, word_data, content_type) is None:
+        return response
+    return tagged(response, etag)
+
+def enhance_payload(enhanced_content, content_type):
+    """Response body of /api/word/enhance for one content type"""
+    if content_type == 'memory':
+        # 只返回记忆方法
+        return {
+            'success': True,
+            'memory_story': enhanced_content.get('memory_story'),
+            'memory_phonetic': enhanced_content.get('memory_phonetic'),
+            'memory_visual': enhanced_content.get('memory_visual')
+        }
+    if content_type == 'etymology':
+        # 只返回词根词缀
+        return {
+            'success': True,
+            'etymology': enhanced_content.get('etymology')
+        }
+    # 全部内容
+    return {
+        'success': True,
+        'enhanced_data': enhanced_content
+    }
+
+@app.route('/api/progress')
+def api_study_progress():
+    """Study progress for the dashboard; revalidated with If-None-Match"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'})
+    
+    # The version is bumped by every progress change, so a revalidation skips reading the progress itself
+    etag = progress_etag(session['user_id'])
+    response = not_modified(etag, request.if_none_match)
+    if response is not None:
+        return response
+    return tagged(jsonify({
+        'success': True,
+        'study_progress': user_store.get_study_progress(session['user_id'])
+    }), etag)
+
 @app.route('/api/ai/chat', methods=['POST'])
 def api_ai_chat():
     """AI聊天接口 - 回答用户关于单词学习的问题"""
@@ -474,68 +521,149 @@ def api_ai_chat():
     if not user_message:
         return jsonify({'success': False, 'message': 'Message cannot be empty'})
     
+    return jsonify(chat_reply(user_message, context))
+
+def chat_reply(user_message: str, context: dict) -> dict:
+    """/api/ai/chat 的响应内容（ASGI入口也使用）"""
     try:
-        # 创建AI聊天提示
-        system_prompt = """你是一位专业的GRE词汇导师。请用友好、专业的方式回答学生关于GRE单词学习的问题。
-        你可以帮助学生：
-        1. 解释单词含义和用法
-        2. 提供记忆技巧
-        3. 分析词根词缀
-        4. 给出同义词和反义词
-        5. 提供例句和语境
-        
-        请用中英文混合的方式回答，确保学生能够理解。"""
-        
-        # 构建用户消息（包含上下文）
-        full_message = user_message
-        if context.get('current_word'):
-            full_message = f"关于单词'{context['current_word']}'：{user_message}"
+        # 词库里能直接回答的问题（释义、词根、同义词、记忆法）由本地检索索引回答
+        local_answer = retrieval_index.answer(user_message, context.get('current_word') or '')
+        if local_answer:
+            CHAT_ANSWERS.inc(source='local')
+            return {
+                'success': True,
+                'response': local_answer.text,
+                'source': 'local'
+            }
         
-        # 这里可以调用实际的AI API
-        # 暂时返回智能回复
+        # 非流式接口返回智能回复（流式接口 /api/ai/chat/stream 会把问题发给模型）
         ai_response = generate_smart_response(user_message, context)
+        CHAT_ANSWERS.inc(source='fallback')
         
-        return jsonify({
+        return {
             'success': True,
             'response': ai_response
-        })
+        }
         
     except Exception as e:
-        return jsonify({
+        return {
             'success': False,
             'message': f'AI chat failed: {str(e)}'
-        })
+        }
 
-def generate_smart_response(message: str, context: dict) -> str:
-    """生成智能回复（当AI API不可用时的fallback）"""
-    message_lower = message.lower()
-    current_word = context.get('current_word', '')
-    
-    # 关键词匹配回复
-    if '记忆' in message or 'remember' in message_lower:
-        if current_word:
-            return f"对于单词'{current_word}'，我建议使用多种记忆方法：\n1. 词根词缀法：分析单词构成\n2. 联想记忆法：创造有趣的故事\n3. 谐音记忆法：利用发音相似的中文词汇\n4. 视觉记忆法：在脑海中构建画面\n\n你想了解哪种方法呢？"
-        else:
-            return "记忆GRE单词的关键是多样化的方法：词根词缀、联想故事、谐音记忆、视觉画面等。选择最适合你的方法坚持练习！"
+@app.route('/api/ai/chat/stream', methods=['POST'])
+def api_ai_chat_stream():
+    """AI聊天流式接口 - 通过Server-Sent Events逐段返回模型输出"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Not logged in'})
     
-    elif '词根' in message or 'etymology' in message_lower:
-        return f"词根词缀是理解单词的强大工具！它们像拼图一样组成完整的单词含义。{'我来为你分析一下' + current_word + '的词根构成。' if current_word else '告诉我你想了解哪个单词的词根分析？'}"
+    data = request.get_json()
+    user_message = data.get('message', '')
+    context = data.get('context', {})  # 当前单词上下文
     
-    elif '同义词' in message or 'synonym' in message_lower:
-        return f"同义词练习是GRE的重点！{'对于' + current_word + '，' if current_word else ''}记住要注意词汇的细微差别和使用语境。想要更多练习吗？"
+    if not user_message:
+        return jsonify({'success': False, 'message': 'Message cannot be empty'})
     
-    elif '例句' in message or 'example' in message_lower:
-        if current_word:
-            return f"理解'{current_word}'的用法需要看具体语境。我来给你一些实际例句，帮助你掌握正确用法。"
-        else:
-            return "例句确实很重要！它们帮助我们理解单词在实际语境中的使用。你想看哪个单词的例句？"
+    system_prompt, full_message = build_chat_prompt(user_message, context)
+    local_answer = retrieval_index.answer(user_message, context.get('current_word') or '')
+    
+    def events():
+        sent_any = False
+        if local_answer:
+            # 本地检索有把握时不调用模型
+            CHAT_ANSWERS.inc(source='local')
+            yield sse_event({'token': local_answer.text, 'source': 'local'})
+            yield sse_event({}, event='done')
+            return
+        try:
+            if not ai_service.ai_enabled:
+                raise RuntimeError('No AI provider configured')
+            for chunk in ai_service.stream_chat(system_prompt, full_message):
+                if not sent_any:
+                    CHAT_ANSWERS.inc(source='llm')
+                    sent_any = True
+                yield sse_event({'token': chunk})
+        except Exception as e:
+            print(f"AI chat stream error: {e}")
+            if sent_any:
+                yield sse_event({'message': 'AI stream interrupted'}, event='error')
+            else:
+                # 模型不可用时改用关键词回复
+                CHAT_ANSWERS.inc(source='fallback')
+                yield sse_event({'token': generate_smart_response(user_message, context), 'fallback': True})
+        yield sse_event({}, event='done')
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def sse_event(payload: dict, event: str = None) -> str:
+    """Format one Server-Sent Event"""
+    prefix = f"event: {event}\n" if event else ''
+    return f"{prefix}data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+def build_chat_prompt(user_message: str, context: dict):
+    """构建聊天的系统提示和用户消息（包含当前单词上下文）"""
+    system_prompt = """你是一位专业的GRE词汇导师。请用友好、专业的方式回答学生关于GRE单词学习的问题。
+        你可以帮助学生：
+        1. 解释单词含义和用法
+        2. 提供记忆技巧
+        3. 分析词根词缀
+        4. 给出同义词和反义词
+        5. 提供例句和语境
+        
+        请用中英文混合的方式回答，确保学生能够理解。"""
     
-    elif '难' in message or 'difficult' in message_lower:
-        return "GRE单词确实有挑战性，但不要担心！每个人都会遇到困难。关键是：\n1. 循序渐进，不要急于求成\n2. 反复复习，加深印象\n3. 多种方法结合使用\n4. 保持积极心态\n\n坚持下去，你一定可以的！💪"
+    # 构建用户消息（包含上下文）
+    full_message = user_message
+    if context.get('current_word'):
+        full_message = f"关于单词'{context['current_word']}'：{user_message}"
     
-    else:
-        # 通用回复
-        return f"我理解你的问题。{'关于' + current_word + '，' if current_word else ''}让我来帮你解答。如果你有具体的学习困惑，可以告诉我更多细节，我会提供更有针对性的建议。"
+    return system_prompt, full_message
+
+def generate_smart_response(message: str, context: dict) -> str:
+    """生成智能回复（当AI API不可用时的fallback）：意图表匹配 + 词库字段填充模板"""
+    return intent_engine.respond(message, context.get('current_word', ''))
+
+@app.route('/assets/<path:filename>')
+def built_asset(filename):
+    """Serve a fingerprinted asset, precompressed to match Accept-Encoding"""
+    variant = asset_manifest.resolve(filename, request.accept_encodings)
+    if variant is None:
+        abort(404)
+    path, mimetype, encoding = variant
+    response = send_file(path, mimetype=mimetype, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+@app.route('/debug/profiles')
+def profile_index():
+    """Captured request profiles, slowest first"""
+    token = request.args.get('token') or request.headers.get(PROFILE_HEADER)
+    if not profiler.enabled or not profiler.authorized(token):
+        abort(404)
+    return render_template('profiles.html', captures=profiler.captures(), token=token,
+                           sample_rate=profiler.sample_rate)
+
+@app.route('/debug/profiles/<filename>')
+def profile_file(filename):
+    """Download one .pstats or .collapsed file"""
+    token = request.args.get('token') or request.headers.get(PROFILE_HEADER)
+    if not profiler.enabled or not profiler.authorized(token):
+        abort(404)
+    path = profiler.file_path(filename)
+    if path is None:
+        abort(404)
+    return send_file(os.path.abspath(path), as_attachment=True)
 
 @app.route('/logout')
 def logout():
@@ -0,0 +1,280 @@
+"""
+ASGI entry point for AceGRE
+Serves the AI-bound endpoints on an event loop and every other route through the Flask app,
+so in-flight provider calls are no longer capped by the number of worker threads
+
+Usage: uvicorn asgi:application --host 0.0.0.0 --port 8001
+"""
+
+import asyncio
+import json
+import os
+import time
+from functools import partial
+
+from asgiref.wsgi import WsgiToAsgi
+from itsdangerous import BadSignature
+from werkzeug.http import parse_cookie, parse_etags
+
+from ai_service import ai_service
+from app import (CHAT_ANSWERS, HTTP_REQUEST_SECONDS, app, build_chat_prompt, chat_reply, enhance_etag,
+                 enhance_payload, enhance_response, enrichment_queue, generate_smart_response, next_word_card,
+                 not_modified, profiler, retrieval_index, sse_event, word_bank)
+from async_ai import AsyncAIService
+from profiling import PROFILE_HEADER
+
+async_ai = AsyncAIService(ai_service, max_connections=int(os.getenv('AI_ASYNC_MAX_CONNECTIONS', '1000')))
+
+# Every route not served natively below runs unchanged on asgiref's thread pool
+flask_application = WsgiToAsgi(app)
+
+SSE_HEADERS = [(b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache'),
+               (b'x-accel-buffering', b'no')]
+
+NOT_LOGGED_IN = {'success': False, 'message': 'Not logged in'}
+
+
+class Request:
+    """The parts of an ASGI HTTP request the async views use"""
+
+    def __init__(self, scope, body: bytes, receive):
+        self.scope = scope
+        self.body = body
+        self.receive = receive
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+
+    def get_json(self):
+        """Parsed JSON object body, or None when the body is not one"""
+        try:
+            data = json.loads(self.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    @property
+    def user_id(self):
+        """user_id from the signed Flask session cookie (these views only read the session)"""
+        interface = app.session_interface
+        serializer = interface.get_signing_serializer(app)
+        value = parse_cookie(self.headers.get('cookie', '')).get(interface.get_cookie_name(app))
+        if not value or serializer is None:
+            return None
+        try:
+            session = serializer.loads(value, max_age=int(app.permanent_session_lifetime.total_seconds()))
+        except BadSignature:
+            return None
+        return session.get('user_id')
+
+    async def wait_disconnect(self):
+        while (await self.receive())['type'] != 'http.disconnect':
+            pass
+
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+def json_response(payload, status: int = 200):
+    """Same body as jsonify"""
+    with app.app_context():
+        response = app.json.response(payload)
+    response.status_code = status
+    return response
+
+
+async def send_response(send, response):
+    """Send a buffered Flask response object"""
+    await send({'type': 'http.response.start', 'status': response.status_code,
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                            for name, value in response.headers.items()]})
+    await send({'type': 'http.response.body', 'body': response.get_data()})
+
+
+def bad_request():
+    return json_response({'success': False, 'message': 'Request body must be a JSON object'}, status=400)
+
+
+VIEWS = {}
+
+
+def view(path: str):
+    """Serve POST requests to path natively on the event loop"""
+    def register(fn):
+        VIEWS[path] = fn
+        return fn
+    return register
+
+
+@view('/api/word/random')
+async def random_word(request: Request, send):
+    user_id = request.user_id
+    if user_id is None:
+        return await send_response(send, json_response(NOT_LOGGED_IN))
+    data = request.get_json()
+    if data is None:
+        return await send_response(send, bad_request())
+
+    # The user store does blocking I/O, so picking runs on a thread; enrichment is queued
+    # as an asyncio task on this loop instead of occupying the enrichment thread pool
+    submit = partial(enrichment_queue.submit_async, generate=async_ai.generate_ai_content,
+                     loop=asyncio.get_running_loop())
+    payload = await asyncio.to_thread(next_word_card, user_id, data.get('difficulty', 'medium'), submit)
+    if payload is None:
+        return await send_response(send, json_response({'success': False, 'message': 'No words available'},
+                                                        status=404))
+    await send_response(send, json_response(payload))
+
+
+@view('/api/word/enhance')
+async def enhance_word(request: Request, send):
+    if request.user_id is None:
+        return await send_response(send, json_response(NOT_LOGGED_IN))
+    data = request.get_json()
+    if data is None:
+        return await send_response(send, bad_request())
+
+    word = data.get('word')
+    content_type = data.get('content_type', 'all')
+    word_data = word_bank.get(word)
+    if not word_data:
+        return await send_response(send, json_response({'success': False, 'message': 'Word not found'}))
+    word_data = word_data.copy()
+
+    # Checked before generating, as in app.api_enhance_word, so a revalidation never reaches the provider
+    etag = enhance_etag(word, content_type)
+    response = not_modified(etag, parse_etags(request.headers.get('if-none-match')))
+    if response is not None:
+        return await send_response(send, response)
+
+    try:
+        enhanced_content = await async_ai.generate_word_content(word, word_data, content_type)
+        # The cache lookup deciding whether to tag can fall through to SQLite, so it runs off the loop
+        response = json_response(enhance_payload(enhanced_content, content_type))
+        response = await asyncio.to_thread(enhance_response, response, etag, word, word_data, content_type)
+    except Exception as e:
+        response = json_response({'success': False, 'message': f'AI enhancement failed: {str(e)}'})
+    await send_response(send, response)
+
+
+@view('/api/ai/chat')
+async def chat(request: Request, send):
+    if request.user_id is None:
+        return await send_response(send, json_response(NOT_LOGGED_IN))
+    data = request.get_json()
+    if data is None:
+        return await send_response(send, bad_request())
+    user_message = data.get('message', '')
+    if not user_message:
+        return await send_response(send, json_response({'success': False, 'message': 'Message cannot be empty'}))
+    await send_response(send, json_response(chat_reply(user_message, data.get('context', {}))))
+
+
+@view('/api/ai/chat/stream')
+async def chat_stream(request: Request, send):
+    if request.user_id is None:
+        return await send_response(send, json_response(NOT_LOGGED_IN))
+    data = request.get_json()
+    if data is None:
+        return await send_response(send, bad_request())
+    user_message = data.get('message', '')
+    context = data.get('context', {})
+    if not user_message:
+        return await send_response(send, json_response({'success': False, 'message': 'Message cannot be empty'}))
+
+    system_prompt, full_message = build_chat_prompt(user_message, context)
+    local_answer = retrieval_index.answer(user_message, context.get('current_word') or '')
+
+    async def events():
+        if local_answer:
+            CHAT_ANSWERS.inc(source='local')
+            yield sse_event({'token': local_answer.text, 'source': 'local'})
+            yield sse_event({}, event='done')
+            return
+        sent_any = False
+        try:
+            async for chunk in async_ai.stream_chat(system_prompt, full_message):
+                if not sent_any:
+                    CHAT_ANSWERS.inc(source='llm')
+                    sent_any = True
+                yield sse_event({'token': chunk})
+        except Exception as e:
+            print(f"AI chat stream error: {e}")
+            if sent_any:
+                yield sse_event({'message': 'AI stream interrupted'}, event='error')
+            else:
+                CHAT_ANSWERS.inc(source='fallback')
+                yield sse_event({'token': generate_smart_response(user_message, context), 'fallback': True})
+        yield sse_event({}, event='done')
+
+    async def pump():
+        await send({'type': 'http.response.start', 'status': 200, 'headers': SSE_HEADERS})
+        async for event in events():
+            await send({'type': 'http.response.body', 'body': event.encode('utf-8'), 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    streaming = asyncio.ensure_future(pump())
+    disconnected = asyncio.ensure_future(request.wait_disconnect())
+    await asyncio.wait({streaming, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+    disconnected.cancel()
+    if not streaming.done():
+        # The client went away: stop the upstream stream instead of paying for tokens nobody reads
+        streaming.cancel()
+        await asyncio.gather(streaming, return_exceptions=True)
+        return
+    streaming.result()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await async_ai.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+    handler = VIEWS.get(scope['path']) if scope['type'] == 'http' and scope['method'] == 'POST' else None
+    if handler is None:
+        return await flask_application(scope, receive, send)
+
+    # The Flask before/after_request hooks do not run here, so the same timing and profiling happen inline
+    started = time.perf_counter()
+    endpoint = scope['path']
+    request = Request(scope, await read_body(receive), receive)
+    capture = None
+    if profiler.enabled and profiler.should_profile(request.headers.get(PROFILE_HEADER.lower())):
+        # Profiles the event loop thread, so concurrent requests' coroutines show up in the capture too
+        capture = profiler.start()
+    status = None
+
+    async def timed_send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            # As on the Flask path, streaming responses are timed until their headers go out
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method='POST',
+                                         status=status)
+        await send(message)
+
+    try:
+        await handler(request, timed_send)
+    finally:
+        if status is None:
+            # Failed before responding: the server answers 500, which Flask's error path would also record
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method='POST',
+                                         status=500)
+        if capture is not None:
+            profiler.finish(capture, endpoint, 'POST', endpoint, status or 500)
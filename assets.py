@@ -0,0 +1,62 @@
+"""
+Static Assets Module for AceGRE
+Resolves template asset names through the build manifest and picks the precompressed variant to serve
+"""
+
+import json
+import mimetypes
+import os
+from typing import Optional, Tuple
+
+from build_assets import MANIFEST_NAME
+
+# Hashed names change with the content, so browsers may cache them for good
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# (Content-Encoding, file suffix) in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class AssetManifest:
+    """
+    Maps 'css/style.css' to its fingerprinted build output in dist_dir.
+    Without a build (local development) every name falls through to the plain static file.
+    The manifest is re-read when the build replaces it.
+    """
+
+    def __init__(self, dist_dir: str):
+        self.dist_dir = dist_dir
+        self.manifest_path = os.path.join(dist_dir, MANIFEST_NAME)
+        self._manifest = {}
+        self._mtime = None
+
+    def _load(self) -> dict:
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            self._manifest, self._mtime = {}, None
+            return self._manifest
+        if mtime != self._mtime:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self._manifest = json.load(f)
+            self._mtime = mtime
+        return self._manifest
+
+    def lookup(self, filename: str) -> Optional[str]:
+        """Fingerprinted name of a static file, or None if it was not built"""
+        return self._load().get(filename)
+
+    def resolve(self, filename: str, accept_encoding) -> Optional[Tuple[str, str, Optional[str]]]:
+        """
+        (path, mimetype, content encoding) of the best variant of a built asset for
+        the client's Accept-Encoding, or None for names outside dist_dir.
+        """
+        path = os.path.abspath(os.path.join(self.dist_dir, filename))
+        if not path.startswith(os.path.abspath(self.dist_dir) + os.sep) or not os.path.isfile(path):
+            return None
+
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        for encoding, suffix in ENCODINGS:
+            if accept_encoding[encoding] and os.path.isfile(path + suffix):
+                return path + suffix, mimetype, encoding
+        return path, mimetype, None
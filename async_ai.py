@@ -0,0 +1,331 @@
+"""
+Async AI Module for AceGRE
+Non-blocking provider calls on one shared httpx connection pool, used by the ASGI entry point
+"""
+
+import asyncio
+import os
+import time
+from functools import partial
+from typing import Dict, List, Optional
+
+import httpx
+
+from ai_service import (AI_CHAT_TTFT, AI_FALLBACKS, AI_FIELD_REGENERATIONS, AI_PARSE_FAILURES, AI_PROVIDER_SECONDS,
+                        CONTENT_TYPE_FIELDS, RETRYABLE_STATUS_CODES, WORD_CONTENT_SYSTEM_PROMPT,
+                        AIProviderError, AIResponseParseError, AIService, content_from_fields, max_completion_tokens)
+from content_parser import ParsedContent
+
+
+class AsyncAIService:
+    """
+    Async counterpart of AIService.generate_word_content and stream_chat.
+    Shares the sync service's configuration, content cache, prompts, parser, circuit
+    breakers, provider router and metrics, so both serving paths see the same state;
+    only the HTTP calls differ: OpenAI-compatible providers go through the SDK's
+    AsyncOpenAI and Zhipu through plain requests, all on one httpx.AsyncClient pool.
+    An in-flight call costs a coroutine and a pooled connection instead of a worker
+    thread, and a hedged call's loser is cancelled outright. Concurrent requests for
+    the same uncached word share one generation within the process (the sync path's
+    cross-worker file lock is not taken).
+    """
+
+    def __init__(self, service: AIService, max_connections: int = 1000):
+        self.service = service
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+        self._openai_clients = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Created on first use, inside the serving event loop"""
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_connections,
+                                  max_keepalive_connections=min(self.max_connections, 100))
+            self._client = httpx.AsyncClient(timeout=self.service.request_timeout, limits=limits)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._openai_clients.clear()
+
+    async def generate_word_content(self, word: str, word_info: Dict, content_type: str = 'all') -> Dict:
+        """AIService.generate_word_content: falls back to default content instead of raising"""
+        if not self.service.ai_enabled:
+            AI_FALLBACKS.inc(reason='disabled')
+            return self.service._generate_fallback_content(word, word_info)
+        try:
+            return await self.generate_ai_content(word, word_info, content_type)
+        except Exception as e:
+            return self.service._content_on_error(e, word, word_info)
+
+    async def generate_ai_content(self, word: str, word_info: Dict, content_type: str = 'all') -> Dict:
+        """Cached content, or one shared generation per word and content type; raises on failure"""
+        service = self.service
+        content_type = service.normalize_content_type(content_type)
+        # A memory miss falls through to SQLite, so the lookup runs off the event loop like the write
+        cached = await asyncio.to_thread(service.get_cached_content, word, word_info, content_type)
+        if cached is not None:
+            return cached
+
+        key = service.content_cache_key(word, content_type)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._generate_uncached(key, word, word_info, content_type))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded: one waiter disconnecting must not cancel the generation the others are waiting on
+        content = await asyncio.shield(future)
+        enhanced_info = word_info.copy()
+        enhanced_info.update(content)
+        return enhanced_info
+
+    async def _generate_uncached(self, key: str, word: str, word_info: Dict, content_type: str) -> Dict:
+        service = self.service
+        if not service.providers:
+            raise AIProviderError(f"Unknown AI provider: {service.ai_provider}")
+
+        async def generate(provider, fields, purpose):
+            return await self._call_provider(provider, fields, purpose, word, word_info)
+
+        parsed = await service.router.acall(partial(generate, fields=list(CONTENT_TYPE_FIELDS[content_type]),
+                                                    purpose=content_type))
+        fields = dict(parsed.fields)
+        missing = parsed.missing
+
+        async def regenerate(provider):
+            AI_FIELD_REGENERATIONS.inc(provider=provider)
+            return await generate(provider, missing, 'field_retry')
+
+        for _ in range(service.field_retries if missing else 0):
+            try:
+                retry = await service.router.acall(regenerate)
+            except Exception as e:
+                print(f"AI field regeneration error: {e}")
+                break
+            fields.update(retry.fields)
+            missing = [field for field in missing if field not in fields]
+            if not missing:
+                break
+
+        content = content_from_fields(fields)
+        # Incomplete content is not cached, so the missing fields are generated again next time;
+        # the SQLite write runs off the event loop
+        if not missing:
+            await asyncio.to_thread(service.content_cache.set, key, content, word, service.cache_provider,
+                                    service.cache_model, service.prompt_template_hash)
+        return content
+
+    async def _call_provider(self, provider: str, fields: List[str], purpose: str, word: str,
+                             word_info: Dict) -> ParsedContent:
+        """AIService._call_provider with asyncio sleeps between retries"""
+        service = self.service
+        breaker = service.breakers[provider]
+        if not breaker.allow():
+            raise AIProviderError(f"{provider} circuit breaker is open")
+
+        generate = self._generator(provider)
+        try:
+            for attempt in range(service.max_retries + 1):
+                started = time.perf_counter()
+                try:
+                    result = await generate(word, word_info, fields, purpose)
+                except AIResponseParseError:
+                    elapsed = time.perf_counter() - started
+                    AI_PROVIDER_SECONDS.observe(elapsed, provider=provider, content_type=purpose,
+                                                outcome='parse_error')
+                    AI_PARSE_FAILURES.inc(provider=provider)
+                    service.router.record(provider, elapsed, ok=True)
+                    breaker.record_success()
+                    raise
+                except Exception as e:
+                    elapsed = time.perf_counter() - started
+                    AI_PROVIDER_SECONDS.observe(elapsed, provider=provider, content_type=purpose, outcome='error')
+                    service.router.record(provider, elapsed, ok=False)
+                    if attempt < service.max_retries and self._is_retryable(e):
+                        await asyncio.sleep(service._backoff_delay(attempt))
+                        continue
+                    breaker.record_failure()
+                    raise
+                elapsed = time.perf_counter() - started
+                AI_PROVIDER_SECONDS.observe(elapsed, provider=provider, content_type=purpose, outcome='ok')
+                service.router.record(provider, elapsed, ok=True)
+                breaker.record_success()
+                return result
+        except asyncio.CancelledError:
+            # Hedge loser or abandoned request: the outcome is unknown, so the breaker learns nothing
+            breaker.abandon()
+            raise
+
+    def _is_retryable(self, error: Exception) -> bool:
+        return isinstance(error, httpx.TransportError) or self.service._is_retryable(error)
+
+    def _generator(self, provider: str):
+        if provider in ('openai', 'local'):
+            return partial(self._generate_with_openai, provider=provider)
+        if provider == 'zhipu':
+            return self._generate_with_zhipu
+        if provider == 'mock':
+            return self._generate_with_mock
+        raise AIProviderError(f"Unknown AI provider: {provider}")
+
+    def _openai_client(self, provider: str):
+        """
+        AIService._get_openai_client for AsyncOpenAI: one client per OpenAI-compatible
+        provider, on the shared connection pool; retries are left to _call_provider
+        """
+        client = self._openai_clients.get(provider)
+        if client is None:
+            service = self.service
+            if provider == 'local':
+                api_key, base_url = service.local_api_key, service.local_base_url
+            else:
+                api_key, base_url = service.openai_api_key, service.openai_base_url
+            if not api_key:
+                raise AIProviderError("OPENAI_API_KEY is not set")
+            from openai import AsyncOpenAI
+            client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=service.request_timeout,
+                                 max_retries=0, http_client=self.client)
+            self._openai_clients[provider] = client
+        return client
+
+    def _zhipu_headers(self) -> Dict:
+        api_key = os.getenv('ZHIPU_API_KEY', '')
+        if not api_key:
+            raise AIProviderError("ZHIPU_API_KEY is not set")
+        return {'Authorization': f'Bearer {api_key}'}
+
+    async def _post_json(self, provider: str, url: str, headers: Dict, payload: Dict) -> Dict:
+        response = await self.client.post(url, headers=headers, json=payload)
+        if response.status_code != 200:
+            raise AIProviderError(f"{provider} API returned HTTP {response.status_code}",
+                                  retryable=response.status_code in RETRYABLE_STATUS_CODES)
+        return response.json()
+
+    async def _generate_with_openai(self, word: str, word_info: Dict, fields: List[str], purpose: str,
+                                    provider: str = 'openai') -> ParsedContent:
+        service = self.service
+        client = self._openai_client(provider)
+        options = {'response_format': {'type': 'json_object'}} if service.json_mode else {}
+        response = await client.chat.completions.create(
+            model=service._provider_model(provider),
+            messages=[
+                {'role': 'system', 'content': WORD_CONTENT_SYSTEM_PROMPT},
+                {'role': 'user', 'content': service._create_word_prompt(word, word_info, fields)}
+            ],
+            max_tokens=max_completion_tokens(fields),
+            temperature=0.7,
+            **options
+        )
+
+        usage = response.usage
+        if usage is not None:
+            service._record_usage(provider, purpose, usage.prompt_tokens, usage.completion_tokens)
+        return service._parse_content(response.choices[0].message.content, fields)
+
+    async def _generate_with_zhipu(self, word: str, word_info: Dict, fields: List[str],
+                                   purpose: str) -> ParsedContent:
+        service = self.service
+        payload = {
+            'prompt': service._create_word_prompt(word, word_info, fields),
+            'temperature': 0.7,
+            'max_tokens': max_completion_tokens(fields)
+        }
+        result = await self._post_json('zhipu', f"{service.zhipu_api_base}/chatglm_turbo/invoke",
+                                       self._zhipu_headers(), payload)
+        data = result.get('data', {})
+        usage = data.get('usage') or {}
+        service._record_usage('zhipu', purpose, usage.get('prompt_tokens'), usage.get('completion_tokens'))
+        content = (data.get('choices') or [{}])[0].get('content', '')
+        return service._parse_content(content, fields)
+
+    async def _generate_with_mock(self, word: str, word_info: Dict, fields: List[str],
+                                  purpose: str) -> ParsedContent:
+        service = self.service
+        await asyncio.sleep(float(os.getenv('MOCK_AI_LATENCY', '0.05')))
+        content = service._mock_content(word, word_info, fields)
+        service._record_usage('mock', purpose, len(service._create_word_prompt(word, word_info, fields)) // 2,
+                              len(content) // 2)
+        return service._parse_content(content, fields)
+
+    async def stream_chat(self, system_prompt: str, user_message: str):
+        """
+        AIService.stream_chat as an async generator; raises before the first chunk if the
+        provider fails, and closing the generator closes the upstream stream
+        """
+        service = self.service
+        if not service.providers:
+            raise AIProviderError(f"AI provider '{service.ai_provider}' does not support chat")
+        provider = service.router.ranked()[0]
+        if provider in ('openai', 'local'):
+            stream = partial(self._stream_with_openai, provider=provider)
+        elif provider == 'zhipu':
+            stream = self._stream_with_zhipu
+        else:
+            stream = self._stream_with_mock
+
+        breaker = service.breakers[provider]
+        if not breaker.allow():
+            raise AIProviderError(f"{provider} circuit breaker is open")
+
+        started = time.perf_counter()
+        first = True
+        try:
+            async for chunk in stream(system_prompt, user_message):
+                if chunk:
+                    if first:
+                        AI_CHAT_TTFT.observe(time.perf_counter() - started, provider=provider)
+                        first = False
+                    yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            breaker.abandon()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+
+    async def _stream_with_openai(self, system_prompt: str, user_message: str, provider: str = 'openai'):
+        stream = await self._openai_client(provider).chat.completions.create(
+            model=self.service._provider_model(provider),
+            messages=[
+                {'role': 'system', 'content': system_prompt},
+                {'role': 'user', 'content': user_message}
+            ],
+            max_tokens=800,
+            temperature=0.7,
+            stream=True
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # openai 1.3's AsyncStream has no aclose(); close the HTTP response so a cancelled
+            # chat releases its upstream connection
+            await stream.response.aclose()
+
+    async def _stream_with_zhipu(self, system_prompt: str, user_message: str):
+        service = self.service
+        headers = dict(self._zhipu_headers(), Accept='text/event-stream')
+        payload = {
+            'prompt': service._zhipu_chat_prompt(system_prompt, user_message),
+            'temperature': 0.7
+        }
+        url = f"{service.zhipu_api_base}/chatglm_turbo/sse-invoke"
+        async with self.client.stream('POST', url, headers=headers, json=payload) as response:
+            if response.status_code != 200:
+                raise AIProviderError(f"Zhipu API returned HTTP {response.status_code}")
+            async for line in response.aiter_lines():
+                if line and line.startswith('data:'):
+                    yield line[5:]
+
+    async def _stream_with_mock(self, system_prompt: str, user_message: str):
+        latency = float(os.getenv('MOCK_AI_LATENCY', '0.05'))
+        answer = self.service._mock_chat_answer(user_message)
+        for i in range(0, len(answer), 4):
+            await asyncio.sleep(latency / 5)
+            yield answer[i:i + 4]
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Hot-path microbenchmarks
+Times the request hot paths against synthetic fixtures of 1k/10k/100k users
+and words: user store load/save and single-user operations, word selection
+for /api/word/random, the word lookup in /api/word/enhance, AI response
+parsing, the chat retrieval index and the chat keyword responder.
+
+Results are written as JSON; pass --compare with an earlier results file to
+print the change per case and exit non-zero on a regression.
+
+Usage: python bench_hot_paths.py [--sizes 1000 10000 100000] [--output bench_results.json]
+       python bench_hot_paths.py --compare bench_results.json --output bench_new.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+LEVELS = ('easy', 'medium', 'hard')
+
+# Each repeat runs the case for at least this long
+MIN_REPEAT_SECONDS = 0.05
+
+
+def synthetic_word(i: int) -> dict:
+    word = f'word{i:06d}'
+    return {
+        'word': word,
+        'pronunciation': f'/{word}/',
+        'level': LEVELS[i % len(LEVELS)],
+        'definition_en': f'Synthetic definition of {word}',
+        'definition_zh': f'{word}的释义',
+        'etymology': {
+            'parts': [{'part': word[:4], 'meaning': 'root'}, {'part': word[4:], 'meaning': 'suffix'}],
+            'explanation': f'Synthetic etymology of {word}'
+        },
+        'synonym_options': ['alpha', 'beta', 'gamma', 'delta', 'epsilon', 'zeta'],
+        'synonyms': [0, 3],
+        'definition_options': ['A', 'B', 'C', 'D'],
+        'correct_definition': 0,
+        'memory_story': f'Story for {word}',
+        'memory_phonetic': f'Phonetic hint for {word}',
+        'memory_visual': f'Visual hint for {word}'
+    }
+
+
+def synthetic_user(i: int, words: list, rng: random.Random) -> dict:
+    from user_store import default_study_progress
+
+    email = f'user{i}@example.com'
+    learned = rng.sample(words, min(len(words), 20))
+    return {
+        'name': f'user{i}',
+        'email': email,
+        'password': 'password',
+        'created_at': '2024-01-01T00:00:00',
+        'study_progress': default_study_progress(),
+        'learned_words': learned,
+        'favorite_words': learned[:3]
+    }
+
+
+def large_json_response(size: int) -> str:
+    """A well-formed AI reply whose etymology grows with the fixture size"""
+    return json.dumps({
+        'etymology_parts': [{'part': f'p{i}', 'meaning': f'meaning {i}'} for i in range(max(1, size // 10))],
+        'etymology_explanation': 'x' * size,
+        'memory_story': '联想' * size,
+        'memory_phonetic': '谐音' * 10,
+        'memory_visual': '画面' * 10,
+        'synonym_options': ['a', 'b', 'c', 'd', 'e', 'f'],
+        'correct_synonyms': [0, 1],
+        'definition_options': ['A', 'B', 'C', 'D'],
+        'correct_definition_index': 0
+    }, ensure_ascii=False)
+
+
+def large_text_response(size: int) -> str:
+    """A non-JSON AI reply with `size` lines, which goes through _manual_parse_response"""
+    sections = ['词根词缀分析：', '联想记忆法：', '谐音记忆法：', '视觉记忆法：']
+    lines = []
+    for i in range(size):
+        lines.append(sections[i % len(sections)] if i % 25 == 0 else f'  第{i}行内容 line {i}')
+    return '\n'.join(lines)
+
+
+def measure(fn, repeat: int = 5) -> dict:
+    """Run fn in timed batches; reports per-call microseconds"""
+    # Calibrate the batch size so each repeat takes at least MIN_REPEAT_SECONDS
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= MIN_REPEAT_SECONDS:
+            break
+        number *= 10 if elapsed < MIN_REPEAT_SECONDS / 10 else 2
+
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - started) / number)
+
+    return {
+        'median_us': round(statistics.median(timings) * 1e6, 3),
+        'min_us': round(min(timings) * 1e6, 3),
+        'calls_per_repeat': number,
+        'repeats': repeat
+    }
+
+
+def legacy_random_word(words: list, learned_words: list, difficulty: str, rng: random.Random) -> dict:
+    """The original list filter in api_get_random_word, kept for comparison"""
+    available = [w for w in words if w['word'] not in learned_words and w['level'] == difficulty]
+    if not available:
+        available = [w for w in words if w['word'] not in learned_words]
+    return rng.choice(available or words)
+
+
+def legacy_lookup(words: list, word: str) -> dict:
+    """The original linear scan in api_enhance_word, kept for comparison"""
+    for w in words:
+        if w['word'] == word:
+            return w
+    return None
+
+
+def bench_size(size: int, tmp: str, repeat: int) -> dict:
+    from ai_service import ai_service
+    from retrieval import RetrievalIndex
+    from user_store import JSONUserStore
+    from word_bank import WordBank
+    from word_sampler import WordSampler
+
+    rng = random.Random(size)
+    words = [synthetic_word(i) for i in range(size)]
+    word_names = [w['word'] for w in words]
+
+    bank_path = os.path.join(tmp, f'words_{size}.json')
+    with open(bank_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': 'bench', 'words': words}, f, ensure_ascii=False)
+    word_bank = WordBank(bank_path, reload_interval=0)
+
+    users_path = os.path.join(tmp, f'users_{size}.json')
+    with open(users_path, 'w', encoding='utf-8') as f:
+        json.dump({f'user{i}@example.com': synthetic_user(i, word_names, rng) for i in range(size)}, f)
+    store = JSONUserStore(users_path)
+    users = store.load_all()
+
+    sampler = WordSampler(word_bank, store)
+    retrieval_index = RetrievalIndex(word_bank)
+    emails = [f'user{i}@example.com' for i in range(size)]
+    sample_email = emails[size // 2]
+    sample_learned = users[sample_email]['learned_words']
+    word_info = words[size // 2]
+    json_response = large_json_response(size)
+    text_response = large_text_response(size)
+    toggled = iter(range(10 ** 9))
+
+    cases = {
+        'user_store.load_all': lambda: store.load_all(),
+        'user_store.save_all': lambda: store.save_all(users),
+        'user_store.get_user': lambda: store.get_user(rng.choice(emails)),
+        'user_store.toggle_favorite': lambda: store.toggle_favorite(sample_email, word_names[next(toggled) % size]),
+        'random_word.legacy_filter': lambda: legacy_random_word(words, sample_learned, 'medium', rng),
+        'random_word.sampler_pick': lambda: sampler.pick(sample_email, 'medium'),
+        'enhance_lookup.legacy_scan': lambda: legacy_lookup(words, word_names[-1]),
+        'enhance_lookup.word_bank_get': lambda: word_bank.get(word_names[-1]),
+        'chat.retrieval_answer': lambda: retrieval_index.answer('这个词的词根是什么？', word_info['word']),
+        'ai.parse_ai_response': lambda: ai_service._parse_ai_response(json_response, word_info['word'], word_info),
+        'ai.manual_parse_response': lambda: ai_service._manual_parse_response(text_response),
+    }
+
+    results = {}
+    for name, fn in cases.items():
+        results[name] = measure(fn, repeat)
+        print(f"  {name:<32} {results[name]['median_us']:>14.2f} us")
+    return results
+
+
+def bench_chat(repeat: int) -> dict:
+    from app import generate_smart_response
+
+    messages = [
+        ('这个单词怎么记忆？', {'current_word': 'abstruse'}),
+        ('What is the etymology?', {}),
+        ('有没有例句', {'current_word': 'laconic'}),
+        ('随便聊聊', {}),
+    ]
+    results = {}
+    for i, (message, context) in enumerate(messages):
+        name = f'chat.generate_smart_response[{i}]'
+        results[name] = measure(lambda: generate_smart_response(message, context), repeat)
+        print(f"  {name:<32} {results[name]['median_us']:>14.2f} us")
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def compare(previous: dict, current: dict, threshold: float) -> bool:
+    """Print the ratio per case; returns True if any case regressed beyond threshold"""
+    regressed = False
+    print(f"\n{'case':<44} {'before us':>12} {'after us':>12} {'ratio':>7}")
+    for size, cases in current['results'].items():
+        for name, stats in cases.items():
+            before = previous.get('results', {}).get(size, {}).get(name)
+            if not before:
+                continue
+            ratio = stats['median_us'] / before['median_us'] if before['median_us'] else float('inf')
+            flag = ''
+            if ratio > threshold:
+                flag = '  REGRESSION'
+                regressed = True
+            print(f"{size + ' ' + name:<44} {before['median_us']:>12.2f} {stats['median_us']:>12.2f} "
+                  f"{ratio:>6.2f}x{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmarks for AceGRE hot paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='number of users and words in each fixture')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='ratio over the earlier median that counts as a regression')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the benchmark away from the real users file and AI cache
+        os.environ['USERS_FILE'] = os.path.join(tmp, 'users.json')
+        os.environ['USER_STORE'] = 'json'
+        os.environ['AI_CACHE_FILE'] = os.path.join(tmp, 'ai_cache.db')
+        os.environ['AI_PROVIDER'] = 'none'
+
+        results = {}
+        for size in args.sizes:
+            print(f"size={size}")
+            results[str(size)] = bench_size(size, tmp, args.repeat)
+        print("chat")
+        results['chat'] = bench_chat(args.repeat)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': git_commit(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'sizes': args.sizes,
+            'repeat': args.repeat
+        },
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        if compare(previous, report, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+User store benchmark
+Compares the original users.json handling (full re-read and in-place rewrite
+on every request) with the cached, locked JSONUserStore, using several worker
+processes that share one users file like gunicorn workers do.
+
+Usage: python bench_user_store.py [--users 100000] [--workers 4] [--duration 10]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from user_store import JSONUserStore, default_study_progress
+
+
+class LegacyJSONUserStore:
+    """The pre-cache load_users()/save_users() behaviour, kept for comparison"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _load(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save(self, users):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(users, f, indent=2, ensure_ascii=False)
+
+    def get_user(self, email):
+        return self._load().get(email)
+
+    def toggle_favorite(self, email, word):
+        users = self._load()
+        user_data = users.get(email, {})
+        favorites = user_data.get('favorite_words', [])
+        if word in favorites:
+            favorites.remove(word)
+        else:
+            favorites.append(word)
+        user_data['favorite_words'] = favorites
+        users[email] = user_data
+        self._save(users)
+
+
+STORES = {
+    'before': LegacyJSONUserStore,
+    'after': JSONUserStore,
+}
+
+
+def build_fixture(path: str, user_count: int):
+    users = {}
+    for i in range(user_count):
+        email = f'user{i}@example.com'
+        users[email] = {
+            'name': f'user{i}',
+            'email': email,
+            'password': 'password',
+            'created_at': '2024-01-01T00:00:00',
+            'study_progress': default_study_progress(),
+            'learned_words': ['abstruse', 'laconic'],
+            'favorite_words': ['ephemeral']
+        }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(users, f, indent=2, ensure_ascii=False)
+
+
+def worker(store_name, path, user_count, duration, write_ratio, seed, results):
+    store = STORES[store_name](path)
+    rng = random.Random(seed)
+    reads = writes = errors = 0
+    deadline = time.perf_counter() + duration
+
+    while time.perf_counter() < deadline:
+        email = f'user{rng.randrange(user_count)}@example.com'
+        try:
+            if rng.random() < write_ratio:
+                store.toggle_favorite(email, 'laconic')
+                writes += 1
+            else:
+                store.get_user(email)
+                reads += 1
+        except (ValueError, OSError):
+            # Torn reads of a half-written file surface as JSON decode errors
+            errors += 1
+
+    results.put((reads, writes, errors))
+
+
+def run(store_name, user_count, workers, duration, write_ratio):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'users.json')
+        build_fixture(path, user_count)
+
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker,
+                                    args=(store_name, path, user_count, duration, write_ratio, i, results))
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    reads = sum(t[0] for t in totals)
+    writes = sum(t[1] for t in totals)
+    errors = sum(t[2] for t in totals)
+    return {
+        'store': store_name,
+        'requests_per_sec': round((reads + writes) / duration, 1),
+        'reads': reads,
+        'writes': writes,
+        'errors': errors
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark users.json store throughput')
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per store')
+    parser.add_argument('--write-ratio', type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"users={args.users} workers={args.workers} duration={args.duration}s "
+          f"write_ratio={args.write_ratio}")
+    for store_name in STORES:
+        result = run(store_name, args.users, args.workers, args.duration, args.write_ratio)
+        print(f"{result['store']:>6}: {result['requests_per_sec']:>10} req/s  "
+              f"reads={result['reads']} writes={result['writes']} errors={result['errors']}")
+
+
+if __name__ == '__main__':
+    main()
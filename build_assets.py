@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Static asset build
+Minifies static/css and static/js, gives each file a content-hashed name and
+writes gzip and brotli variants next to it in static/dist, plus a manifest the
+templates resolve names through. Without the brotli package (see requirements.txt)
+only gzip is written, with a warning.
+
+Usage: python build_assets.py [--static static] [--out static/dist]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+try:
+    import brotli
+except ImportError:  # gzip variants only
+    brotli = None
+
+ASSET_DIRS = ('css', 'js')
+MANIFEST_NAME = 'manifest.json'
+
+_WORD_CHAR = re.compile(r'[\w$\\]|[^\x00-\x7f]')
+
+# After these characters (or keywords) a '/' starts a regex literal rather than a division
+_REGEX_PREFIX = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = ('return', 'typeof', 'case', 'in', 'of', 'delete', 'void', 'throw')
+
+# CSS punctuation that never needs surrounding whitespace
+_CSS_TIGHT_AFTER = set('{};,>~:(')
+_CSS_TIGHT_BEFORE = set('{};,>~)')
+
+
+def _js_needs_space(prev: str, nxt: str) -> bool:
+    """Whether removing the whitespace between two characters would merge JS tokens"""
+    if _WORD_CHAR.match(prev) and _WORD_CHAR.match(nxt):
+        return True
+    return prev + nxt in ('++', '--', '+-', '-+', '//')
+
+
+def _css_needs_space(prev: str, nxt: str) -> bool:
+    # Descendant selectors ("a .b") and calc() operators depend on the space
+    return prev not in _CSS_TIGHT_AFTER and nxt not in _CSS_TIGHT_BEFORE
+
+
+def _skip_string(source: str, i: int) -> int:
+    """Index just past the string or template literal starting at source[i]"""
+    quote = source[i]
+    i += 1
+    depth = 0
+    while i < len(source):
+        ch = source[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if quote == '`':
+            if source.startswith('${', i):
+                depth += 1
+                i += 2
+                continue
+            if ch == '}' and depth:
+                depth -= 1
+            elif ch == '`' and not depth:
+                return i + 1
+        elif ch == quote:
+            return i + 1
+        i += 1
+    return i
+
+
+def _skip_regex(source: str, i: int) -> int:
+    """Index just past the regex literal starting at source[i]"""
+    i += 1
+    in_class = False
+    while i < len(source):
+        ch = source[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if ch == '[':
+            in_class = True
+        elif ch == ']':
+            in_class = False
+        elif ch == '/' and not in_class:
+            i += 1
+            while i < len(source) and _WORD_CHAR.match(source[i]):
+                i += 1
+            return i
+        elif ch == '\n':
+            return i
+        i += 1
+    return i
+
+
+def _regex_allowed(out) -> bool:
+    """Whether a '/' after the emitted output starts a regex literal"""
+    tail = ''.join(out[-12:]).rstrip()
+    if not tail or tail[-1] in _REGEX_PREFIX:
+        return True
+    word = re.search(r'[\w$]+$', tail)
+    return bool(word) and word.group(0) in _REGEX_KEYWORDS
+
+
+def _minify(source: str, js: bool) -> str:
+    """
+    Strip comments and collapse whitespace outside strings (and, for JS,
+    template literals and regexes). JS line breaks are kept wherever automatic
+    semicolon insertion could depend on them.
+    """
+    needs_space = _js_needs_space if js else _css_needs_space
+    out = []
+    last = ''
+    pending = None  # whitespace skipped since the last token: None, ' ' or '\n'
+    i = 0
+    n = len(source)
+
+    while i < n:
+        ch = source[i]
+        if ch.isspace() or source.startswith('/*', i):
+            if ch.isspace():
+                start = i
+                while i < n and source[i].isspace():
+                    i += 1
+            else:
+                start = i
+                end = source.find('*/', i + 2)
+                i = n if end == -1 else end + 2
+            if pending != '\n':
+                pending = '\n' if '\n' in source[start:i] else ' '
+            continue
+        if js and source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+            continue
+
+        if ch in '"\'' or (js and ch == '`'):
+            end = _skip_string(source, i)
+        elif js and ch == '/' and _regex_allowed(out):
+            end = _skip_regex(source, i)
+        else:
+            end = i + 1
+        token = source[i:end]
+        i = end
+
+        if pending and last:
+            if js and pending == '\n' and last not in '{[(,;':
+                out.append('\n')
+            elif needs_space(last, token[0]):
+                out.append(' ')
+        pending = None
+        out.append(token)
+        last = token[-1]
+
+    return ''.join(out) + '\n'
+
+
+def minify_js(source: str) -> str:
+    return _minify(source, js=True)
+
+
+def minify_css(source: str) -> str:
+    # A ';' before '}' is redundant
+    return _minify(source, js=False).replace(';}', '}')
+
+
+MINIFIERS = {
+    '.js': minify_js,
+    '.css': minify_css,
+}
+
+
+def hashed_name(relative_path: str, content: bytes) -> str:
+    stem, ext = os.path.splitext(relative_path)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:10]}{ext}"
+
+
+def build(static_dir: str, out_dir: str) -> dict:
+    """Build every asset; returns the manifest {source path: hashed path}"""
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+
+    manifest = {}
+    for asset_dir in ASSET_DIRS:
+        for root, _, files in os.walk(os.path.join(static_dir, asset_dir)):
+            for filename in sorted(files):
+                source_path = os.path.join(root, filename)
+                relative = os.path.relpath(source_path, static_dir).replace(os.sep, '/')
+                minify = MINIFIERS.get(os.path.splitext(filename)[1])
+
+                with open(source_path, 'rb') as f:
+                    content = f.read()
+                if minify:
+                    content = minify(content.decode('utf-8')).encode('utf-8')
+
+                target = hashed_name(relative, content)
+                target_path = os.path.join(out_dir, target)
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                with open(target_path, 'wb') as f:
+                    f.write(content)
+                # mtime=0 keeps the .gz bytes identical between builds
+                with open(target_path + '.gz', 'wb') as f:
+                    f.write(gzip.compress(content, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    with open(target_path + '.br', 'wb') as f:
+                        f.write(brotli.compress(content, quality=11))
+
+                manifest[relative] = target
+                print(f"{relative:<28} {os.path.getsize(source_path):>7} -> {len(content):>7} bytes "
+                      f"(gzip {os.path.getsize(target_path + '.gz')})")
+
+    with open(os.path.join(out_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Minify, fingerprint and precompress static assets')
+    parser.add_argument('--static', default=os.path.join(here, 'static'))
+    parser.add_argument('--out', default=os.path.join(here, 'static', 'dist'))
+    args = parser.parse_args()
+
+    manifest = build(args.static, args.out)
+    print(f"\n✅ Built {len(manifest)} assets into {args.out}")
+    if brotli is None:
+        print("⚠️  brotli is not installed: .br variants were skipped and browsers get gzip "
+              "(pip install -r requirements.txt)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Offline distractor build
+Vectorizes the word bank with hashed character n-gram TF-IDF (NumPy only) and
+writes the synonym (six-choose-two) and definition (four-choice) exercises of
+every word into the corpus file, so serving never asks a model for them.
+
+Distractors are near misses: definitions of words with similar but not
+paraphrased meanings, and words that look alike or mean something related.
+Hand-written exercises are kept unless --force is given; with --force the
+distractors are rebuilt and hand-picked correct synonyms are still kept.
+Correct synonyms are never derived from similarity (close definitions are as often
+antonyms as synonyms), so words without hand-picked synonyms get no synonym
+exercise and are listed for curation.
+
+Distractors are drawn from the corpus itself, so it needs at least MIN_CORPUS_WORDS (5)
+words: each word plus the four synonym distractors (which also covers the three definition
+distractors). A word whose correct synonyms are themselves corpus words can still come up
+short in a corpus that small; it keeps its current exercise and is listed.
+
+Usage: python build_distractors.py [--words data/gre_words.json] [--output PATH] [--force]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import time
+import zlib
+
+import numpy as np
+
+from word_bank import DEFAULT_WORD_BANK_FILE
+
+SYNONYM_OPTIONS = 6
+SYNONYM_ANSWERS = 2
+DEFINITION_OPTIONS = 4
+
+# The word itself plus one headword per synonym distractor (definitions need fewer)
+MIN_CORPUS_WORDS = max(1 + SYNONYM_OPTIONS - SYNONYM_ANSWERS, DEFINITION_OPTIONS)
+
+# Candidates kept per word from each similarity search
+NEIGHBORS = 32
+
+_WORD = re.compile(r'[a-z]+')
+
+
+def char_ngrams(text: str, low: int, high: int):
+    """Character n-grams inside word boundaries (' word ' padded)"""
+    for token in _WORD.findall(text.lower()):
+        padded = f' {token} '
+        for n in range(low, high + 1):
+            for i in range(len(padded) - n + 1):
+                yield padded[i:i + n]
+
+
+def tfidf_matrix(texts, ngram_range, dims: int) -> np.ndarray:
+    """
+    L2-normalised TF-IDF rows over n-grams hashed into dims columns.
+    crc32 keeps the hashing stable across runs (str hash is salted per process).
+    """
+    rows, cols = [], []
+    for row, text in enumerate(texts):
+        for gram in char_ngrams(text, *ngram_range):
+            rows.append(row)
+            cols.append(zlib.crc32(gram.encode('utf-8')) % dims)
+
+    counts = np.zeros((len(texts), dims), dtype=np.float32)
+    np.add.at(counts, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)), 1)
+
+    df = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(texts)) / (1 + df)).astype(np.float32) + 1
+    matrix = np.log1p(counts) * idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+def _top_k(sims: np.ndarray, k: int) -> np.ndarray:
+    """Column indices of the k largest values per row, largest first"""
+    top = np.argpartition(sims, -k, axis=1)[:, -k:]
+    order = np.argsort(np.take_along_axis(sims, top, axis=1), axis=1)[:, ::-1]
+    return np.take_along_axis(top, order, axis=1)
+
+
+def nearest_neighbors(definitions: np.ndarray, spelling: np.ndarray, spelling_weight: float, k: int,
+                      batch: int = 512):
+    """
+    The k most similar words to every word (itself excluded), most similar first, by
+    definition alone and by definition mixed with spelling. Both lists come from one
+    pass over row batches, so the definition similarities are computed only once.
+    """
+    n = len(definitions)
+    k = min(k, n - 1)
+    by_definition = np.empty((n, k), dtype=np.int64)
+    by_lookalike = np.empty((n, k), dtype=np.int64)
+    for start in range(0, n, batch):
+        end = min(start + batch, n)
+        rows, own = np.arange(end - start), np.arange(start, end)
+
+        sims = definitions[start:end] @ definitions.T
+        mixed = spelling[start:end] @ spelling.T
+        mixed *= spelling_weight
+        mixed += (1 - spelling_weight) * sims
+
+        sims[rows, own] = -np.inf
+        mixed[rows, own] = -np.inf
+        by_definition[start:end] = _top_k(sims, k)
+        by_lookalike[start:end] = _top_k(mixed, k)
+    return by_definition, by_lookalike
+
+
+def load_corpus(path: str):
+    """(container, words); container is the parsed JSON object or None for lists and JSON Lines"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            return None, [json.loads(line) for line in f if line.strip()]
+        data = json.load(f)
+    if isinstance(data, dict):
+        return data, data['words']
+    return None, data
+
+
+def save_corpus(path: str, container, words):
+    """Write atomically, so a hot-reloading server never sees a partial file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for entry in words:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        else:
+            json.dump(dict(container, words=words) if container is not None else words, f,
+                      ensure_ascii=False, indent=2)
+            f.write('\n')
+    os.replace(tmp_path, path)
+
+
+def has_synonym_exercise(entry) -> bool:
+    options = entry.get('synonym_options') or []
+    answers = entry.get('synonyms') or []
+    return len(options) == SYNONYM_OPTIONS and len(answers) == SYNONYM_ANSWERS and \
+        all(0 <= i < len(options) for i in answers)
+
+
+def has_definition_exercise(entry) -> bool:
+    options = entry.get('definition_options') or []
+    return len(options) == DEFINITION_OPTIONS and 0 <= entry.get('correct_definition', -1) < len(options)
+
+
+class DistractorBuilder:
+    """
+    Similarity model over the whole corpus.
+    Definition space: TF-IDF of definition_en n-grams (3-5 chars).
+    Lookalike similarity: definition similarity mixed with headword n-gram (2-3 chars)
+    similarity, so a synonym distractor may be near in meaning, in spelling, or both.
+    Candidates whose definitions are at least max_similarity alike count as paraphrases
+    (possible correct answers) and are never offered as distractors.
+    """
+
+    def __init__(self, words, dims: int = 512, spelling_dims: int = 128, spelling_weight: float = 0.5,
+                 max_similarity: float = 0.85):
+        self.words = words
+        self.max_similarity = max_similarity
+
+        self.definitions = tfidf_matrix([entry.get('definition_en', '') for entry in words], (3, 5), dims)
+        spelling = tfidf_matrix([entry['word'] for entry in words], (2, 3), spelling_dims)
+        self.definition_neighbors, self.lookalike_neighbors = nearest_neighbors(
+            self.definitions, spelling, spelling_weight, NEIGHBORS)
+
+    def definition_similarity(self, i: int, j: int) -> float:
+        return float(self.definitions[i] @ self.definitions[j])
+
+    def _candidates(self, neighbors, rng: random.Random):
+        """
+        Near misses first, then random words for when the corpus is too small (or too
+        uniform) to supply enough; random draws are lazy so a large corpus is never scanned.
+        """
+        yield from neighbors
+        n = len(self.words)
+        for _ in range(64):
+            yield rng.randrange(n)
+        order = list(range(n))
+        rng.shuffle(order)
+        yield from order
+
+    def synonym_exercise(self, i: int, rng: random.Random):
+        """
+        (options, answer indices), or None when the word has no hand-picked synonyms to build
+        around or the corpus has too few other words to fill the distractors
+        """
+        entry = self.words[i]
+        if not has_synonym_exercise(entry):
+            return None
+        correct = [entry['synonym_options'][j] for j in entry['synonyms']]
+
+        chosen = set(correct)
+        distractors = []
+        for j in self._candidates(self.lookalike_neighbors[i], rng):
+            candidate = self.words[j]['word']
+            if j == i or candidate in chosen or self.definition_similarity(i, j) >= self.max_similarity:
+                continue
+            chosen.add(candidate)
+            distractors.append(candidate)
+            if len(distractors) == SYNONYM_OPTIONS - len(correct):
+                break
+        if len(distractors) < SYNONYM_OPTIONS - len(correct):
+            return None
+
+        options = correct + distractors
+        rng.shuffle(options)
+        return options, sorted(options.index(word) for word in correct)
+
+    def definition_exercise(self, i: int, synonyms, rng: random.Random):
+        correct = self.words[i].get('definition_en', '')
+        seen = {correct.strip().lower()}
+        distractors = []
+        for j in self._candidates(self.definition_neighbors[i], rng):
+            candidate = self.words[j]
+            text = candidate.get('definition_en', '')
+            if j == i or candidate['word'] in synonyms or not text or text.strip().lower() in seen or \
+                    self.definition_similarity(i, j) >= self.max_similarity:
+                continue
+            seen.add(text.strip().lower())
+            distractors.append(text)
+            if len(distractors) == DEFINITION_OPTIONS - 1:
+                break
+
+        options = [correct] + distractors
+        rng.shuffle(options)
+        return options, options.index(correct)
+
+
+def build(words, force: bool = False, **options) -> dict:
+    """
+    Write exercises into the word entries in place; returns counts of what was (re)built
+    and the words whose synonym exercise was left as it was, for lack of hand-picked
+    synonyms (needs_synonyms) or of distractors in a small corpus (too_few_distractors)
+    """
+    builder = DistractorBuilder(words, **options)
+    stats = {'synonym': 0, 'definition': 0, 'needs_synonyms': [], 'too_few_distractors': []}
+    for i, entry in enumerate(words):
+        # Seeded per word, so rebuilding an unchanged corpus gives the same option order
+        rng = random.Random(zlib.crc32(entry['word'].encode('utf-8')))
+        if force or not has_synonym_exercise(entry):
+            exercise = builder.synonym_exercise(i, rng)
+            if exercise is None:
+                reason = 'too_few_distractors' if has_synonym_exercise(entry) else 'needs_synonyms'
+                stats[reason].append(entry['word'])
+            else:
+                entry['synonym_options'], entry['synonyms'] = exercise
+                stats['synonym'] += 1
+        if force or not has_definition_exercise(entry):
+            synonyms = [entry['synonym_options'][j] for j in entry['synonyms']] \
+                if has_synonym_exercise(entry) else []
+            entry['definition_options'], entry['correct_definition'] = builder.definition_exercise(i, synonyms, rng)
+            stats['definition'] += 1
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build synonym and definition exercises for the word bank offline')
+    parser.add_argument('--words', default=os.getenv('WORD_BANK_FILE', DEFAULT_WORD_BANK_FILE))
+    parser.add_argument('--output', help='corpus file to write (default: overwrite --words)')
+    parser.add_argument('--force', action='store_true', help='rebuild hand-written exercises too')
+    parser.add_argument('--dims', type=int, default=512, help='hashed n-gram columns for definitions')
+    parser.add_argument('--max-similarity', type=float, default=0.85,
+                        help='definitions at least this similar are treated as paraphrases, not distractors')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    container, words = load_corpus(args.words)
+    if len(words) < MIN_CORPUS_WORDS:
+        parser.error(f'need at least {MIN_CORPUS_WORDS} words to draw distractors from, found {len(words)}')
+
+    stats = build(words, force=args.force, dims=args.dims, max_similarity=args.max_similarity)
+    output = args.output or args.words
+    save_corpus(output, container, words)
+    print(f"✅ {len(words)} words: {stats['synonym']} synonym and {stats['definition']} definition exercises "
+          f"built in {time.perf_counter() - started:.1f}s -> {output}")
+    if stats['needs_synonyms']:
+        print(f"⚠️  {len(stats['needs_synonyms'])} words have no hand-picked synonyms and were left without a "
+              f"synonym exercise: {', '.join(stats['needs_synonyms'])}")
+    if stats['too_few_distractors']:
+        print(f"⚠️  {len(stats['too_few_distractors'])} words kept their synonym exercise because the corpus has "
+              f"too few other words for new distractors: {', '.join(stats['too_few_distractors'])}")
+
+
+if __name__ == '__main__':
+    main()
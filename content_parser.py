@@ -0,0 +1,197 @@
+"""
+Content Parser Module for AceGRE
+Extracts AI word content from model replies and validates it one field at a time,
+so a reply with fences, surrounding prose, truncation or one bad field still
+yields every field that is usable
+"""
+
+import json
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+MAX_TEXT_LENGTH = 1000
+MAX_ETYMOLOGY_PARTS = 8
+
+_FENCED = re.compile(r'```(?:json|JSON)?\s*(.*?)```', re.DOTALL)
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+_decoder = json.JSONDecoder()
+
+
+def _text(value) -> str:
+    if not isinstance(value, str):
+        raise ValueError('not a string')
+    value = value.strip()
+    if not value:
+        raise ValueError('empty')
+    if len(value) > MAX_TEXT_LENGTH:
+        raise ValueError('too long')
+    return value
+
+
+def _etymology_parts(value) -> List[Dict]:
+    if not isinstance(value, list) or not value:
+        raise ValueError('not a non-empty list')
+    if len(value) > MAX_ETYMOLOGY_PARTS:
+        raise ValueError('too many parts')
+    parts = []
+    for item in value:
+        if isinstance(item, (list, tuple)) and len(item) == 2:
+            item = {'part': item[0], 'meaning': item[1]}
+        if not isinstance(item, dict):
+            raise ValueError('part is not an object')
+        parts.append({'part': _text(item.get('part')), 'meaning': _text(item.get('meaning'))})
+    return parts
+
+
+# Field name in the model reply -> validator returning the cleaned value or raising ValueError
+WORD_CONTENT_SCHEMA: Dict[str, Callable] = {
+    'etymology_parts': _etymology_parts,
+    'etymology_explanation': _text,
+    'memory_story': _text,
+    'memory_phonetic': _text,
+    'memory_visual': _text,
+}
+
+
+class ParsedContent(NamedTuple):
+    fields: Dict          # valid fields, cleaned
+    errors: Dict          # field -> 'missing' | 'invalid'
+    source: str           # 'json', 'salvaged', 'text' or 'none'
+
+    @property
+    def missing(self) -> List[str]:
+        """Fields to ask for again"""
+        return list(self.errors)
+
+
+def _is_content(data, keys) -> bool:
+    return isinstance(data, dict) and (keys is None or any(key in data for key in keys))
+
+
+def _loads_object(candidate: str, keys) -> Optional[Dict]:
+    for text in (candidate, _TRAILING_COMMA.sub(r'\1', candidate)):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            continue
+        if _is_content(data, keys):
+            return data
+    return None
+
+
+def extract_json_object(text: str, keys=None) -> Optional[Dict]:
+    """
+    The first JSON object in a reply (with at least one of keys, if given): the whole
+    reply, a ``` fenced block, or an object embedded in prose (found by decoding from
+    each '{' until one parses).
+    """
+    stripped = text.strip()
+    data = _loads_object(stripped, keys)
+    if data is not None:
+        return data
+
+    for block in _FENCED.findall(text):
+        data = _loads_object(block.strip(), keys)
+        if data is not None:
+            return data
+
+    start = text.find('{')
+    attempts = 0
+    while start != -1 and attempts < 32:
+        try:
+            data, _ = _decoder.raw_decode(text, start)
+            if _is_content(data, keys):
+                return data
+        except ValueError:
+            pass
+        start = text.find('{', start + 1)
+        attempts += 1
+    return None
+
+
+def salvage_fields(text: str, names) -> Dict:
+    """
+    Decode "name": value pairs one by one, for replies whose object as a whole
+    does not parse (cut off mid-way, or a syntax error in some other field).
+    """
+    found = {}
+    for name in names:
+        match = re.search(r'"%s"\s*:\s*' % re.escape(name), text)
+        if not match:
+            continue
+        try:
+            found[name], _ = _decoder.raw_decode(text, match.end())
+        except ValueError:
+            continue
+    return found
+
+
+# Section heading keyword in plain-text replies -> field
+_SECTIONS = {
+    '词根词缀': 'etymology_explanation', 'etymology': 'etymology_explanation',
+    '联想记忆': 'memory_story', 'story': 'memory_story',
+    '谐音记忆': 'memory_phonetic', 'phonetic': 'memory_phonetic',
+    '视觉记忆': 'memory_visual', 'visual': 'memory_visual',
+}
+# A heading names its section at the start of the line (after any list or markdown markers)
+# and either ends in a colon or is short
+_HEADING = re.compile(r'[#*\-•\d.、)）\s]*.{0,4}?(%s)([^:：]*)([:：]?)\s*(.*)' % '|'.join(_SECTIONS),
+                      re.IGNORECASE)
+
+
+def parse_sections(text: str) -> Dict:
+    """Plain-text reply: every line under a section heading (and text after the heading's colon)"""
+    sections = {}
+    current = None
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        heading = _HEADING.match(line)
+        if heading and (heading.group(3) or len(line) <= 24):
+            current = _SECTIONS[heading.group(1).lower()]
+            line = heading.group(4)
+        if current and line:
+            sections.setdefault(current, []).append(line.lstrip('-*• '))
+    return {field: '\n'.join(lines) for field, lines in sections.items()}
+
+
+def _normalize(data: Dict) -> Dict:
+    """Accept the nested {"etymology": {"parts", "explanation"}} shape as well"""
+    etymology = data.get('etymology')
+    if isinstance(etymology, dict):
+        data = dict(data)
+        data.setdefault('etymology_parts', etymology.get('parts'))
+        data.setdefault('etymology_explanation', etymology.get('explanation'))
+    return data
+
+
+def validate(data: Dict, schema: Dict[str, Callable] = WORD_CONTENT_SCHEMA) -> Tuple[Dict, Dict]:
+    """(valid fields, errors) for every schema field"""
+    fields, errors = {}, {}
+    for name, validator in schema.items():
+        if data.get(name) is None:
+            errors[name] = 'missing'
+            continue
+        try:
+            fields[name] = validator(data[name])
+        except ValueError:
+            errors[name] = 'invalid'
+    return fields, errors
+
+
+def parse_word_content(text: str, schema: Dict[str, Callable] = WORD_CONTENT_SCHEMA) -> ParsedContent:
+    """Best-effort parse of a word content reply; never raises"""
+    text = text or ''
+    keys = list(schema) + ['etymology']
+    data = extract_json_object(text, keys)
+    source = 'json'
+    if data is None:
+        data = salvage_fields(text, keys)
+        source = 'salvaged'
+    if not data and not text.lstrip().startswith(('{', '`')):
+        data = parse_sections(text)
+        source = 'text'
+
+    fields, errors = validate(_normalize(data), schema)
+    return ParsedContent(fields, errors, source if fields else 'none')
@@ -0,0 +1,130 @@
+"""
+Background Enrichment Module for AceGRE
+Runs AI word enhancement on a bounded worker pool so requests never wait on the LLM
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Optional, Tuple
+
+PENDING = 'pending'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class EnrichmentQueue:
+    """
+    Bounded background pool for AIService.generate_ai_content.
+    Jobs are deduplicated by word; finished jobs are kept in a bounded map
+    so clients can poll for the enhanced card.
+    The ASGI entry point queues jobs as asyncio tasks instead (submit_async);
+    both kinds share the same bookkeeping and bound.
+    """
+
+    def __init__(self, ai_service, max_workers: int = 4, max_pending: int = 64,
+                 max_results: int = 1024, retry_after: float = 60.0):
+        self.ai_service = ai_service
+        self.max_pending = max_pending
+        self.max_results = max_results
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='enrichment')
+        self._jobs = OrderedDict()  # word -> (status, content, finished_at)
+        self._pending = 0
+        self._tasks = set()  # running asyncio jobs, referenced so they are not garbage collected
+        self._lock = threading.Lock()
+
+    def _reserve(self, word: str) -> Optional[bool]:
+        """True if the caller should start the job, None if it is queued or recently done, False if full"""
+        with self._lock:
+            job = self._jobs.get(word)
+            if job is not None:
+                status, _, finished_at = job
+                if status != FAILED or time.monotonic() - finished_at < self.retry_after:
+                    return None
+            if self._pending >= self.max_pending:
+                return False
+            self._pending += 1
+            self._set(word, (PENDING, None, None))
+            return True
+
+    def submit(self, word: str, word_info: Dict) -> bool:
+        """Queue enrichment of a word; returns False if the queue is full"""
+        reserved = self._reserve(word)
+        if reserved:
+            self._executor.submit(self._run, word, dict(word_info))
+        return reserved is not False
+
+    def submit_async(self, word: str, word_info: Dict, generate: Callable, loop: asyncio.AbstractEventLoop) -> bool:
+        """
+        submit() for the ASGI entry point: the job is an asyncio task on loop awaiting
+        generate(word, word_info) rather than a pool thread. Safe to call from any thread.
+        """
+        reserved = self._reserve(word)
+        if reserved:
+            try:
+                loop.call_soon_threadsafe(self._start_task, loop, word, generate, dict(word_info))
+            except RuntimeError:
+                # The loop has been closed (server shutting down)
+                self._finish(word, (FAILED, None, time.monotonic()))
+                return False
+        return reserved is not False
+
+    def _start_task(self, loop: asyncio.AbstractEventLoop, word: str, generate: Callable, word_info: Dict):
+        task = loop.create_task(self._run_async(word, generate, word_info))
+        self._tasks.add(task)
+        task.add_done_callback(partial(self._task_done, word))
+
+    def status(self, word: str) -> Tuple[Optional[str], Optional[Dict]]:
+        """(status, enhanced word) for a word, or (None, None) if this worker never queued it"""
+        with self._lock:
+            job = self._jobs.get(word)
+        if job is None:
+            return None, None
+        return job[0], job[1]
+
+    def _run(self, word: str, word_info: Dict):
+        try:
+            content = self.ai_service.generate_ai_content(word, word_info)
+            result = (READY, content, time.monotonic())
+        except Exception as e:
+            print(f"Background enrichment error for '{word}': {e}")
+            result = (FAILED, None, time.monotonic())
+        self._finish(word, result)
+
+    async def _run_async(self, word: str, generate: Callable, word_info: Dict) -> Tuple:
+        try:
+            content = await generate(word, word_info)
+        except Exception as e:
+            print(f"Background enrichment error for '{word}': {e}")
+            return FAILED, None, time.monotonic()
+        return READY, content, time.monotonic()
+
+    def _task_done(self, word: str, task: asyncio.Task):
+        """
+        Bookkeeping runs here rather than in _run_async: a task cancelled at shutdown
+        (possibly before it ever started) still releases its slot, and the job ends
+        FAILED so the word can be queued again instead of staying PENDING forever
+        """
+        self._tasks.discard(task)
+        if task.cancelled() or task.exception() is not None:
+            self._finish(word, (FAILED, None, time.monotonic()))
+        else:
+            self._finish(word, task.result())
+
+    def _finish(self, word: str, result: Tuple):
+        with self._lock:
+            self._pending -= 1
+            self._set(word, result)
+
+    def _set(self, word: str, job: Tuple):
+        self._jobs[word] = job
+        self._jobs.move_to_end(word)
+        while len(self._jobs) > self.max_results:
+            oldest_word, (status, _, _) = next(iter(self._jobs.items()))
+            if status == PENDING:
+                break
+            del self._jobs[oldest_word]
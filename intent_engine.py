@@ -0,0 +1,184 @@
+"""
+Intent Engine Module for AceGRE
+Matches chat messages against a data-driven bilingual intent table with an
+Aho-Corasick automaton and answers from templates filled with word bank fields
+"""
+
+import json
+import os
+import string
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from word_bank import WordBank
+
+DEFAULT_INTENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'intents.json')
+
+
+class AhoCorasick:
+    """
+    Keyword automaton: one pass over the text reports every keyword occurrence.
+    Payloads are attached per keyword and returned with the match span.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._built = False
+
+    def add(self, keyword: str, payload):
+        node = 0
+        for ch in keyword:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][ch] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append((len(keyword), payload))
+        self._built = False
+
+    def build(self):
+        """Compute failure links breadth-first and merge outputs along them"""
+        queue = deque(self._goto[0].values())
+        for node in queue:
+            self._fail[node] = 0
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+        self._built = True
+
+    def search(self, text: str):
+        """Yield (start, end, payload) for every keyword occurrence in text"""
+        if not self._built:
+            self.build()
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for index, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, payload in output[node]:
+                yield index + 1 - length, index + 1, payload
+
+
+class _Template:
+    """A response template and the placeholder fields it needs"""
+
+    __slots__ = ('text', 'fields')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.fields = {name for _, name, _, _ in string.Formatter().parse(text) if name}
+
+
+class Intent:
+    __slots__ = ('name', 'templates', 'order')
+
+    def __init__(self, name: str, templates: List[_Template], order: int):
+        self.name = name
+        self.templates = templates
+        self.order = order
+
+    def render(self, fields: Dict[str, str]) -> Optional[str]:
+        """First template whose placeholders can all be filled"""
+        for template in self.templates:
+            if all(fields.get(name) for name in template.fields):
+                return template.text.format_map(fields)
+        return None
+
+
+def word_fields(word: str, entry: Optional[Dict]) -> Dict[str, str]:
+    """Template fields for the current word; empty values mean 'not available'"""
+    fields = {'word': word or ''}
+    if not entry:
+        return fields
+
+    etymology = entry.get('etymology') or {}
+    options = entry.get('synonym_options') or []
+    fields.update({
+        'word': entry['word'],
+        'pronunciation': entry.get('pronunciation', ''),
+        'level': entry.get('level', ''),
+        'definition_en': entry.get('definition_en', ''),
+        'definition_zh': entry.get('definition_zh', ''),
+        'etymology_parts': ' + '.join(f"{part['part']}（{part['meaning']}）" for part in etymology.get('parts', [])),
+        'etymology_explanation': etymology.get('explanation', ''),
+        'synonyms': ', '.join(options[i] for i in entry.get('synonyms', []) if 0 <= i < len(options)),
+        'memory_story': entry.get('memory_story', ''),
+        'memory_phonetic': entry.get('memory_phonetic', ''),
+        'memory_visual': entry.get('memory_visual', '')
+    })
+    return fields
+
+
+class IntentEngine:
+    """
+    Intent table compiled into one automaton over all keywords (matched case-insensitively).
+    A message is scored in a single pass: each distinct keyword adds its weight to its intent.
+    The best intent answers; a runner-up scoring at least secondary_ratio of the best adds its answer too.
+    """
+
+    def __init__(self, path: str = DEFAULT_INTENTS_FILE, word_bank: WordBank = None):
+        self.path = path
+        self.word_bank = word_bank
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        self.secondary_ratio = data.get('secondary_ratio', 0.75)
+        self.max_intents = data.get('max_intents', 2)
+        self.default = Intent('default', [_Template(text) for text in data['default']], -1)
+        self.intents = []
+        self.automaton = AhoCorasick()
+
+        for order, spec in enumerate(data['intents']):
+            intent = Intent(spec['name'], [_Template(text) for text in spec['responses']], order)
+            self.intents.append(intent)
+            for keyword in spec['keywords']:
+                text, weight = (keyword, 1.0) if isinstance(keyword, str) else keyword
+                text = text.lower()
+                # ASCII keywords must start a word, so "in" does not match inside "abstain"
+                self.automaton.add(text, (intent, float(weight), text.isascii()))
+        self.automaton.build()
+
+    def classify(self, message: str) -> List[Tuple[Intent, float]]:
+        """Intents with their scores, best first"""
+        text = message.lower()
+        scores = {}
+        seen = set()
+        for start, end, (intent, weight, word_start) in self.automaton.search(text):
+            if word_start and start > 0 and text[start - 1].isascii() and text[start - 1].isalnum():
+                continue
+            keyword = (intent.name, text[start:end])
+            if keyword in seen:
+                continue
+            seen.add(keyword)
+            scores[intent] = scores.get(intent, 0.0) + weight
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0].order))
+
+    def respond(self, message: str, current_word: str = '') -> str:
+        entry = self.word_bank.get(current_word) if self.word_bank and current_word else None
+        fields = word_fields(current_word, entry)
+
+        ranked = self.classify(message)
+        if not ranked:
+            return self.default.render(fields)
+
+        best_score = ranked[0][1]
+        answers = []
+        for intent, score in ranked[:self.max_intents]:
+            if answers and score < best_score * self.secondary_ratio:
+                break
+            answer = intent.render(fields)
+            if answer:
+                answers.append(answer)
+        return '\n\n'.join(answers) if answers else self.default.render(fields)
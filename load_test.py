@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test
+Registers and logs in simulated users against a running AceGRE server, then
+drives a weighted mix of the word and AI endpoints from one thread per user.
+Reports throughput and p50/p95/p99 latency per endpoint.
+
+Run the app against the local mock provider so no API credits are spent:
+    python mock_llm_server.py --latency 0.8 --error-rate 0.02 &
+    AI_PROVIDER=openai OPENAI_API_KEY=mock OPENAI_BASE_URL=http://127.0.0.1:8081/v1 python app.py &
+    python load_test.py --users 50 --duration 60
+
+Usage: python load_test.py [--base-url http://127.0.0.1:8001] [--users 20] [--duration 30] [--json out.json]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import requests
+
+# (name, weight) - roughly what one study session sends
+ENDPOINT_MIX = [
+    ('/api/word/random', 25),
+    ('/api/word/batch', 10),
+    ('/api/word/enrichment/<word>', 15),
+    ('/api/word/learned', 10),
+    ('/api/word/favorite', 10),
+    ('/api/word/enhance', 15),
+    ('/api/ai/chat', 15),
+]
+
+# Cards the page prefetches per /api/word/batch request
+BATCH_SIZE = 5
+
+# Asked about the current word, so local retrieval and the intent table both get traffic
+CHAT_QUESTIONS = [
+    '这个单词怎么记忆？',
+    '能给我一个例句吗？',
+    '这个词的词根是什么？',
+    '有哪些同义词？',
+    'What does it mean?',
+]
+
+
+def percentile(sorted_values, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class Results:
+    """Per-endpoint latencies and error counts shared by all user threads"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add(self, endpoint: str, seconds: float, ok: bool):
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def summary(self, duration: float) -> dict:
+        endpoints = {}
+        total = 0
+        for endpoint in sorted(self.latencies):
+            values = sorted(self.latencies[endpoint])
+            total += len(values)
+            endpoints[endpoint] = {
+                'requests': len(values),
+                'errors': self.errors[endpoint],
+                'requests_per_sec': round(len(values) / duration, 1),
+                'p50_ms': round(percentile(values, 0.50) * 1000, 1),
+                'p95_ms': round(percentile(values, 0.95) * 1000, 1),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 1),
+                'max_ms': round(values[-1] * 1000, 1),
+            }
+        return {
+            'duration': round(duration, 1),
+            'requests': total,
+            'requests_per_sec': round(total / duration, 1),
+            'endpoints': endpoints
+        }
+
+
+class SimulatedUser:
+    """One logged-in browser session working through words"""
+
+    def __init__(self, base_url: str, results: Results, stream: bool, rng: random.Random):
+        self.base_url = base_url.rstrip('/')
+        self.results = results
+        self.stream = stream
+        self.rng = rng
+        self.session = requests.Session()
+        self.current_word = None
+        self.recent_words = []
+        self.etags = {}
+
+    def _post(self, endpoint: str, payload: dict, stream: bool = False):
+        started = time.perf_counter()
+        ok = False
+        data = None
+        try:
+            response = self.session.post(self.base_url + endpoint, json=payload, timeout=60, stream=stream)
+            if stream:
+                # Read the whole event stream, so latency is measured to the last event
+                for _ in response.iter_lines():
+                    pass
+                ok = response.status_code == 200
+            else:
+                data = response.json()
+                ok = response.status_code == 200 and data.get('success', True) is not False
+        except (requests.RequestException, ValueError):
+            pass
+        self.results.add(endpoint, time.perf_counter() - started, ok)
+        return data
+
+    def _get(self, endpoint: str, path: str):
+        """GET with If-None-Match like the page's validator cache; a 304 counts as success"""
+        started = time.perf_counter()
+        ok = False
+        data = None
+        headers = {'If-None-Match': self.etags[path]} if path in self.etags else {}
+        try:
+            response = self.session.get(self.base_url + path, headers=headers, timeout=60)
+            if response.status_code == 304:
+                ok = True
+            else:
+                data = response.json()
+                ok = response.status_code == 200 and data.get('success', True) is not False
+                if response.headers.get('ETag'):
+                    self.etags[path] = response.headers['ETag']
+        except (requests.RequestException, ValueError):
+            pass
+        self.results.add(endpoint, time.perf_counter() - started, ok)
+        return data
+
+    def _show(self, word: str):
+        self.current_word = word
+        self.recent_words = (self.recent_words + [word])[-20:]
+
+    def login(self) -> bool:
+        email = f"load-{uuid.uuid4().hex[:12]}@example.com"
+        password = 'loadtest'
+        self.session.post(self.base_url + '/api/register',
+                          json={'name': 'Load Test', 'email': email, 'password': password}, timeout=30)
+        response = self.session.post(self.base_url + '/api/login',
+                                     json={'email': email, 'password': password}, timeout=30)
+        return response.ok and response.json().get('success', False)
+
+    def step(self):
+        endpoint = self.rng.choices([name for name, _ in ENDPOINT_MIX],
+                                    weights=[weight for _, weight in ENDPOINT_MIX])[0]
+        if endpoint != '/api/word/random' and self.current_word is None:
+            endpoint = '/api/word/random'
+
+        if endpoint == '/api/word/random':
+            data = self._post(endpoint, {'difficulty': self.rng.choice(['easy', 'medium', 'hard'])})
+            if data and data.get('success'):
+                self._show(data['word'])
+        elif endpoint == '/api/word/batch':
+            data = self._post(endpoint, {'difficulty': self.rng.choice(['easy', 'medium', 'hard']),
+                                         'count': BATCH_SIZE, 'exclude': self.recent_words})
+            if data and data.get('words'):
+                self._show(data['words'][0]['word'])
+        elif endpoint == '/api/word/enrichment/<word>':
+            self._get(endpoint, f'/api/word/enrichment/{self.current_word}')
+        elif endpoint == '/api/word/learned':
+            self._post(endpoint, {'word': self.current_word})
+        elif endpoint == '/api/word/favorite':
+            self._post(endpoint, {'word': self.current_word})
+        elif endpoint == '/api/word/enhance':
+            self._post(endpoint, {'word': self.current_word, 'content_type': 'all'})
+        else:
+            payload = {'message': self.rng.choice(CHAT_QUESTIONS), 'context': {'current_word': self.current_word}}
+            if self.stream:
+                self._post('/api/ai/chat/stream', payload, stream=True)
+            else:
+                self._post(endpoint, payload)
+
+    def run(self, deadline: float, think_time: float):
+        while time.monotonic() < deadline:
+            self.step()
+            if think_time:
+                time.sleep(self.rng.uniform(0, think_time * 2))
+
+
+def run(base_url: str, users: int, duration: float, think_time: float, stream: bool) -> dict:
+    results = Results()
+    simulated = []
+    for i in range(users):
+        user = SimulatedUser(base_url, results, stream, random.Random(i))
+        if not user.login():
+            raise SystemExit(f"Could not register/log in a simulated user at {base_url}")
+        simulated.append(user)
+
+    started = time.monotonic()
+    deadline = started + duration
+    threads = [threading.Thread(target=user.run, args=(deadline, think_time), daemon=True) for user in simulated]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results.summary(time.monotonic() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Drive a running AceGRE server with simulated users')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8001')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds')
+    parser.add_argument('--think-time', type=float, default=0.0, help='mean seconds between a user\'s requests')
+    parser.add_argument('--stream', action='store_true', help='use /api/ai/chat/stream for chat requests')
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args()
+
+    print(f"base_url={args.base_url} users={args.users} duration={args.duration}s "
+          f"think_time={args.think_time}s stream={args.stream}")
+    summary = run(args.base_url, args.users, args.duration, args.think_time, args.stream)
+
+    print(f"\n{'endpoint':<28} {'req':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint, stats in summary['endpoints'].items():
+        print(f"{endpoint:<28} {stats['requests']:>7} {stats['errors']:>5} {stats['requests_per_sec']:>8} "
+              f"{stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}")
+    print(f"\ntotal: {summary['requests']} requests, {summary['requests_per_sec']} req/s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
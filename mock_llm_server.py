@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+本地模拟LLM服务器
+模拟 ai_service.py 使用的 OpenAI chat-completions 和智谱 invoke / sse-invoke 接口，
+用于压测和本地开发，不产生API费用
+
+用法: python mock_llm_server.py --port 8081 --latency 0.8 --error-rate 0.02 --malformed-rate 0.05
+然后: OPENAI_BASE_URL=http://127.0.0.1:8081/v1 OPENAI_API_KEY=mock python app.py
+或:   AI_PROVIDER=zhipu ZHIPU_API_KEY=mock ZHIPU_API_BASE=http://127.0.0.1:8081/api/paas/v3/model-api python app.py
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+
+app = Flask(__name__)
+
+config = {
+    'latency': 0.8,
+    'jitter': 0.3,
+    'ttft': 0.2,
+    'error_rate': 0.0,
+    'malformed_rate': 0.0
+}
+
+
+def simulated_latency(base: float) -> float:
+    return max(0.0, base + random.uniform(-config['jitter'], config['jitter']) * base)
+
+
+def word_from_prompt(prompt: str) -> str:
+    match = re.search(r'"([A-Za-z-]+)"', prompt) or re.search(r"'([A-Za-z-]+)'", prompt)
+    return match.group(1) if match else 'word'
+
+
+def completion_text(prompt: str) -> str:
+    """单词内容提示词返回JSON（只含提示词列出的字段），其余（聊天）返回一段文字"""
+    if 'JSON' not in prompt and 'json' not in prompt:
+        return f"这是模拟导师的回答：{prompt[:40]}…… 建议结合词根词缀和联想记忆来掌握这个单词。"
+
+    word = word_from_prompt(prompt)
+    data = {
+        'etymology_parts': [{'part': word[:3], 'meaning': 'mock root'},
+                            {'part': word[3:], 'meaning': 'mock suffix'}],
+        'etymology_explanation': f"Mock etymology for '{word}'",
+        'memory_story': f"[mock-server] 关于'{word}'的联想故事",
+        'memory_phonetic': f"[mock-server] '{word}'的谐音记忆",
+        'memory_visual': f"[mock-server] '{word}'的视觉画面"
+    }
+    # 只返回提示词里要求的字段（按内容类型生成或补生成缺失字段）
+    wanted = {field: value for field, value in data.items() if field in prompt}
+    content = json.dumps(wanted or data, ensure_ascii=False)
+
+    if random.random() < config['malformed_rate']:
+        # 截断的JSON，模拟模型输出不完整
+        return content[:len(content) // 2]
+    return content
+
+
+def injected_error():
+    if random.random() < config['error_rate']:
+        status = random.choice([429, 500, 503])
+        return jsonify({'error': {'message': 'mock injected error', 'code': status}}), status
+    return None
+
+
+def usage(prompt: str, completion: str) -> dict:
+    prompt_tokens = len(prompt) // 2
+    completion_tokens = len(completion) // 2
+    return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens}
+
+
+def chunks(text: str, size: int = 8):
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
+
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def openai_chat_completions():
+    error = injected_error()
+    if error:
+        time.sleep(simulated_latency(config['ttft']))
+        return error
+
+    data = request.get_json()
+    prompt = '\n'.join(message.get('content', '') for message in data.get('messages', []))
+    text = completion_text(prompt)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    model = data.get('model', 'mock')
+
+    if data.get('stream'):
+        def events():
+            time.sleep(simulated_latency(config['ttft']))
+            pieces = list(chunks(text))
+            delay = max(0.0, config['latency'] - config['ttft']) / max(1, len(pieces))
+            for piece in pieces:
+                chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                         'model': model,
+                         'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}]}
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                time.sleep(delay)
+            final = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                     'model': model, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]}
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+        return Response(events(), mimetype='text/event-stream')
+
+    time.sleep(simulated_latency(config['latency']))
+    return jsonify({
+        'id': completion_id,
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+        'usage': usage(prompt, text)
+    })
+
+
+@app.route('/api/paas/v3/model-api/<model>/invoke', methods=['POST'])
+def zhipu_invoke(model):
+    time.sleep(simulated_latency(config['latency']))
+    error = injected_error()
+    if error:
+        return error
+
+    prompt = request.get_json().get('prompt', '')
+    if isinstance(prompt, list):
+        prompt = '\n'.join(message.get('content', '') for message in prompt)
+    text = completion_text(prompt)
+    return jsonify({
+        'code': 200,
+        'msg': '操作成功',
+        'success': True,
+        'data': {
+            'request_id': uuid.uuid4().hex,
+            'task_status': 'SUCCESS',
+            'choices': [{'role': 'assistant', 'content': text}],
+            'usage': usage(prompt, text)
+        }
+    })
+
+
+@app.route('/api/paas/v3/model-api/<model>/sse-invoke', methods=['POST'])
+def zhipu_sse_invoke(model):
+    error = injected_error()
+    if error:
+        return error
+
+    prompt = request.get_json().get('prompt', '')
+    if isinstance(prompt, list):
+        prompt = '\n'.join(message.get('content', '') for message in prompt)
+    text = completion_text(prompt)
+
+    def events():
+        time.sleep(simulated_latency(config['ttft']))
+        pieces = list(chunks(text))
+        delay = max(0.0, config['latency'] - config['ttft']) / max(1, len(pieces))
+        for piece in pieces:
+            yield f"event:add\ndata:{piece}\n\n"
+            time.sleep(delay)
+        yield f"event:finish\ndata:\nmeta:{json.dumps({'usage': usage(prompt, text)})}\n\n"
+    return Response(events(), mimetype='text/event-stream')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local mock of the OpenAI and Zhipu APIs used by AceGRE')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.8, help='mean seconds per completion')
+    parser.add_argument('--jitter', type=float, default=0.3, help='relative latency jitter (0.3 = +/-30%%)')
+    parser.add_argument('--ttft', type=float, default=0.2, help='seconds to first streamed token')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered 429/5xx')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='fraction of truncated JSON replies')
+    args = parser.parse_args()
+
+    config.update(latency=args.latency, jitter=args.jitter, ttft=args.ttft,
+                  error_rate=args.error_rate, malformed_rate=args.malformed_rate)
+    print(f"🤖 Mock LLM server on http://{args.host}:{args.port} {config}")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
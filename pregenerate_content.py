@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+AI内容预生成脚本
+在考试季之前为单词库中的所有单词批量生成AI内容，写入网站读取的内容缓存
+支持并发、客户端限流（请求数/分钟、token数/分钟）和断点续跑
+
+用法: python pregenerate_content.py --concurrency 4 --rpm 60 --tpm 90000
+      AI_PROVIDER=mock python pregenerate_content.py   # 本地模拟provider演练
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_service import CONTENT_TYPE_FIELDS, ai_service, max_completion_tokens
+from word_bank import WordBank, DEFAULT_WORD_BANK_FILE
+
+# 单次生成的最大输出token数（与provider调用中的 max_tokens 一致，预生成的是全部字段）
+MAX_COMPLETION_TOKENS = max_completion_tokens(CONTENT_TYPE_FIELDS['all'])
+
+
+class RateLimiter:
+    """令牌桶限流：同时限制每分钟请求数和每分钟token数"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.rpm = requests_per_minute
+        self.tpm = tokens_per_minute
+        self._request_budget = requests_per_minute
+        self._token_budget = tokens_per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int):
+        """阻塞直到请求和token预算都足够"""
+        tokens = min(tokens, self.tpm) if self.tpm else tokens
+        while True:
+            with self._lock:
+                self._refill()
+                request_ok = not self.rpm or self._request_budget >= 1
+                tokens_ok = not self.tpm or self._token_budget >= tokens
+                if request_ok and tokens_ok:
+                    if self.rpm:
+                        self._request_budget -= 1
+                    if self.tpm:
+                        self._token_budget -= tokens
+                    return
+                wait = 0.0
+                if not request_ok:
+                    wait = max(wait, (1 - self._request_budget) * 60.0 / self.rpm)
+                if not tokens_ok:
+                    wait = max(wait, (tokens - self._token_budget) * 60.0 / self.tpm)
+            time.sleep(min(wait, 5.0))
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._request_budget = min(self.rpm, self._request_budget + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self._token_budget = min(self.tpm, self._token_budget + elapsed * self.tpm / 60.0)
+
+
+def estimate_tokens(prompt: str) -> int:
+    """粗略估算一次调用的token数：提示词（中文约1字1token）加最大输出"""
+    return len(prompt) // 2 + MAX_COMPLETION_TOKENS
+
+
+class Checkpoint:
+    """
+    追加写入的JSONL断点文件，每完成一个单词写一行
+    记录缓存键，提示词模板或provider变化后旧记录自动失效
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 崩溃时最后一行可能只写了一半
+                        continue
+                    if record.get('status') == 'done':
+                        self.done[record['word']] = record['key']
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def is_done(self, word: str, key: str) -> bool:
+        return self.done.get(word) == key
+
+    def record(self, word: str, key: str, status: str, error: str = None):
+        line = {'word': word, 'key': key, 'status': status, 'time': time.time()}
+        if error:
+            line['error'] = error
+        with self._lock:
+            self._file.write(json.dumps(line, ensure_ascii=False) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            if status == 'done':
+                self.done[word] = key
+
+    def close(self):
+        self._file.close()
+
+
+def pregenerate(words, concurrency: int, limiter: RateLimiter, checkpoint: Checkpoint, force: bool = False):
+    """为所有未完成的单词生成内容，返回 (成功数, 失败数, 跳过数)"""
+    counts = {'done': 0, 'failed': 0, 'skipped': 0}
+    counts_lock = threading.Lock()
+    total = len(words)
+
+    def work(entry):
+        word = entry['word']
+        key = ai_service.content_cache_key(word)
+        if not force and (checkpoint.is_done(word, key) or ai_service.get_cached_content(word, entry)):
+            status = 'skipped'
+        else:
+            if force:
+                ai_service.content_cache.invalidate(word)
+            limiter.acquire(estimate_tokens(ai_service._create_word_prompt(word, entry)))
+            try:
+                ai_service.generate_ai_content(word, dict(entry))
+                checkpoint.record(word, key, 'done')
+                status = 'done'
+            except Exception as e:
+                checkpoint.record(word, key, 'failed', str(e))
+                print(f"❌ {word}: {e}")
+                status = 'failed'
+
+        with counts_lock:
+            counts[status] += 1
+            finished = sum(counts.values())
+            if status != 'skipped' and (finished % 50 == 0 or finished == total):
+                print(f"[{finished}/{total}] done={counts['done']} failed={counts['failed']} "
+                      f"skipped={counts['skipped']}")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(work, words))
+
+    return counts['done'], counts['failed'], counts['skipped']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-generate AI content for every word in the word bank')
+    parser.add_argument('--word-bank', default=os.getenv('WORD_BANK_FILE', DEFAULT_WORD_BANK_FILE))
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rpm', type=float, default=60, help='requests per minute (0 = unlimited)')
+    parser.add_argument('--tpm', type=float, default=90000, help='tokens per minute (0 = unlimited)')
+    parser.add_argument('--checkpoint', default='pregenerate_checkpoint.jsonl')
+    parser.add_argument('--limit', type=int, help='only process the first N words')
+    parser.add_argument('--force', action='store_true', help='regenerate words that are already cached')
+    args = parser.parse_args()
+
+    if not ai_service.ai_enabled:
+        print(f"⚠️  AI_PROVIDER={ai_service.ai_provider} 不会生成AI内容，请设置 openai、zhipu、local 或 mock，"
+              f"openai 和 zhipu 还需要配置对应的API密钥")
+        return
+
+    words = list(WordBank(args.word_bank, reload_interval=0).all_words())
+    if args.limit:
+        words = words[:args.limit]
+
+    print(f"🔧 预生成 {len(words)} 个单词 (provider={ai_service.cache_provider}, "
+          f"concurrency={args.concurrency}, rpm={args.rpm}, tpm={args.tpm})")
+    print(f"写入缓存: {ai_service.content_cache.path}，断点文件: {args.checkpoint}")
+
+    checkpoint = Checkpoint(args.checkpoint)
+    started = time.time()
+    try:
+        done, failed, skipped = pregenerate(words, args.concurrency, RateLimiter(args.rpm, args.tpm),
+                                            checkpoint, args.force)
+    finally:
+        checkpoint.close()
+
+    print(f"\n🎉 完成：生成 {done}，失败 {failed}，跳过 {skipped}，耗时 {time.time() - started:.1f}s")
+    if failed:
+        print("重新运行同一命令即可重试失败的单词")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Request Profiling Module for AceGRE
+Opt-in profiling of sampled or explicitly requested requests.
+Each capture writes a cProfile .pstats dump and a collapsed-stack file
+(flamegraph.pl / speedscope input) to a rotating directory.
+"""
+
+import cProfile
+import glob
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+
+PROFILE_HEADER = 'X-AceGRE-Profile'
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval from a helper thread"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        own_file = os.path.abspath(__file__)
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                if code.co_filename != own_file:
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+class ProfileCapture:
+    """State of one in-flight profiled request"""
+
+    def __init__(self, profile: Optional[cProfile.Profile], sampler: StackSampler):
+        self.started = time.perf_counter()
+        self.profile = profile
+        self.sampler = sampler
+
+
+class RequestProfiler:
+    """
+    Decides which requests to profile and stores the results.
+    Disabled unless an output directory is configured. A request is profiled when
+    it wins the sample_rate draw or carries PROFILE_HEADER with the configured token.
+    Only one cProfile capture runs at a time (the profiler hook is not safe to stack);
+    concurrent captures still get the stack sampler.
+    """
+
+    def __init__(self, output_dir: Optional[str], sample_rate: float = 0.0, token: Optional[str] = None,
+                 max_captures: int = 200, sample_interval: float = 0.005):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.token = token
+        self.max_captures = max_captures
+        self.sample_interval = sample_interval
+        self._cprofile_lock = threading.Lock()
+        self._rotate_lock = threading.Lock()
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.output_dir)
+
+    def authorized(self, token: Optional[str]) -> bool:
+        return bool(self.token) and token == self.token
+
+    def should_profile(self, header_value: Optional[str]) -> bool:
+        if not self.enabled:
+            return False
+        if header_value is not None and self.authorized(header_value):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self) -> ProfileCapture:
+        profile = None
+        if self._cprofile_lock.acquire(blocking=False):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler (e.g. a debugger) is already active
+                self._cprofile_lock.release()
+                profile = None
+        sampler = StackSampler(threading.get_ident(), self.sample_interval)
+        return ProfileCapture(profile, sampler)
+
+    def finish(self, capture: ProfileCapture, endpoint: str, method: str, path: str, status: int) -> Dict:
+        """Stop profiling and write the capture; returns its metadata"""
+        duration = time.perf_counter() - capture.started
+        if capture.profile is not None:
+            capture.profile.disable()
+            self._cprofile_lock.release()
+        stacks = capture.sampler.stop()
+
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', endpoint).strip('_') or 'root'
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{slug}-{int(duration * 1000)}ms-{uuid.uuid4().hex[:6]}"
+        base = os.path.join(self.output_dir, name)
+        files = []
+
+        if capture.profile is not None:
+            capture.profile.dump_stats(base + '.pstats')
+            files.append(name + '.pstats')
+        if stacks:
+            with open(base + '.collapsed', 'w', encoding='utf-8') as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            files.append(name + '.collapsed')
+
+        meta = {
+            'name': name,
+            'endpoint': endpoint,
+            'method': method,
+            'path': path,
+            'status': status,
+            'duration_ms': round(duration * 1000, 2),
+            'samples': sum(stacks.values()),
+            'time': time.time(),
+            'files': files
+        }
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+        self._rotate()
+        return meta
+
+    def _rotate(self):
+        """Delete the oldest captures beyond max_captures"""
+        with self._rotate_lock:
+            metas = sorted(glob.glob(os.path.join(self.output_dir, '*.json')), key=os.path.getmtime)
+            for meta_path in metas[:max(0, len(metas) - self.max_captures)]:
+                for path in glob.glob(meta_path[:-len('.json')] + '.*'):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    def captures(self, limit: int = 100) -> List[Dict]:
+        """Captured requests, slowest first"""
+        if not self.enabled:
+            return []
+        metas = []
+        for meta_path in glob.glob(os.path.join(self.output_dir, '*.json')):
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    metas.append(json.load(f))
+            except (OSError, ValueError):
+                # Rotated away or still being written
+                continue
+        metas.sort(key=lambda meta: meta['duration_ms'], reverse=True)
+        return metas[:limit]
+
+    def file_path(self, filename: str) -> Optional[str]:
+        """Path of a capture file, or None for names outside the profile directory"""
+        if not self.enabled or os.path.basename(filename) != filename:
+            return None
+        path = os.path.join(self.output_dir, filename)
+        return path if os.path.isfile(path) else None
@@ -0,0 +1,214 @@
+"""
+Provider Router Module for AceGRE
+Sends each AI call to the fastest healthy provider and hedges slow calls on the runner-up
+"""
+
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+
+from metrics import registry
+
+AI_HEDGES = registry.counter(
+    'acegre_ai_hedged_requests_total', 'Backup requests sent to a second provider and which request won',
+    ('reason', 'winner'))
+
+
+class ProviderStats:
+    """EWMA latency and error rate of one provider, plus a window of recent latencies for its p95"""
+
+    def __init__(self, alpha: float, window: int):
+        self.alpha = alpha
+        self.latency: Optional[float] = None   # seconds; None until the first successful call
+        self.error_rate = 0.0
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float, ok: bool):
+        # Failed calls only move the error rate: a refused connection is fast but not a fast provider
+        if ok:
+            self.latency = seconds if self.latency is None else \
+                (1 - self.alpha) * self.latency + self.alpha * seconds
+            self.samples.append(seconds)
+        self.error_rate = (1 - self.alpha) * self.error_rate + self.alpha * (0.0 if ok else 1.0)
+
+    def percentile(self, q: float, min_samples: int) -> Optional[float]:
+        if len(self.samples) < min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def expected_latency(self) -> float:
+        """Latency inflated by the error rate; untried providers score 0 so they get traffic first"""
+        if self.latency is None:
+            return 0.0
+        return self.latency / max(1.0 - self.error_rate, 0.05)
+
+
+class ProviderRouter:
+    """
+    Orders providers by expected latency (EWMA latency / (1 - EWMA error rate)), skipping
+    those whose circuit breaker is open, and runs each call on the best one.
+    If the call has not finished by the hedge deadline, the same call is sent to the
+    runner-up and the first success wins. The deadline is the primary's recent p95,
+    pulled in so that a backup sent then can still finish within the SLO; hedges are
+    capped at hedge_ratio of calls so a slow period does not double the provider load.
+    A primary that fails before the deadline fails over to the runner-up at once.
+    The losing call is cancelled if it has not started; one already in flight is told
+    to stop retrying, and its reply is dropped.
+    """
+
+    def __init__(self, providers: List[str], breakers: Dict, slo: Optional[float] = None, alpha: float = 0.2,
+                 window: int = 200, min_samples: int = 20, hedge_ratio: float = 0.1, max_workers: int = 64):
+        self.providers = list(providers)
+        self.breakers = breakers
+        self.slo = slo
+        self.min_samples = min_samples
+        self.hedge_ratio = hedge_ratio
+        self.stats = {provider: ProviderStats(alpha, window) for provider in self.providers}
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._hedges = 0
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='ai-router') \
+            if len(self.providers) > 1 else None
+        registry.register_collector(self._collect_metrics)
+
+    def record(self, provider: str, seconds: float, ok: bool):
+        stats = self.stats.get(provider)
+        if stats is not None:
+            with self._lock:
+                stats.record(seconds, ok)
+
+    def ranked(self) -> List[str]:
+        """Healthy providers, fastest expected first (ties keep the configured order)"""
+        with self._lock:
+            scores = {provider: stats.expected_latency() for provider, stats in self.stats.items()}
+        healthy = [provider for provider in self.providers if self.breakers[provider].available()]
+        # Nothing healthy: the first provider's breaker rejects the call straight away
+        return sorted(healthy, key=scores.get) or self.providers[:1]
+
+    def hedge_delay(self, primary: str, backup: str) -> Optional[float]:
+        """Seconds to wait for the primary before hedging; None to never hedge"""
+        with self._lock:
+            delay = self.stats[primary].percentile(0.95, self.min_samples)
+            backup_latency = self.stats[backup].latency or 0.0
+        budget = self.slo - backup_latency if self.slo else 0.0
+        if budget > 0:
+            # Only worth pulling in when the backup is fast enough to land inside the SLO
+            delay = budget if delay is None else min(delay, budget)
+        return delay
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self._hedges >= self.hedge_ratio * self._calls:
+                return False
+            self._hedges += 1
+            return True
+
+    def call(self, fn: Callable):
+        """
+        fn(provider, cancelled) performs the call on one provider; cancelled is a
+        threading.Event set once the other request has won
+        """
+        order = self.ranked()
+        with self._lock:
+            self._calls += 1
+        if len(order) == 1:
+            return fn(order[0], threading.Event())
+
+        primary, backup = order[0], order[1]
+        cancelled = {primary: threading.Event(), backup: threading.Event()}
+        pending = {self._executor.submit(fn, primary, cancelled[primary]): primary}
+        delay = self.hedge_delay(primary, backup)
+        reason = None
+        error = None
+        while pending:
+            timeout = delay if reason is None else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Past the deadline: hedge if the budget allows, then wait for whichever finishes
+                if self._take_hedge():
+                    reason = 'slow'
+                    pending[self._executor.submit(fn, backup, cancelled[backup])] = backup
+                else:
+                    reason = 'budget'
+                continue
+
+            for future in done:
+                provider = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                for loser, loser_provider in pending.items():
+                    cancelled[loser_provider].set()
+                    loser.cancel()
+                if reason in ('slow', 'failover'):
+                    AI_HEDGES.inc(reason=reason, winner='primary' if provider == primary else 'backup')
+                return result
+
+            if reason in (None, 'budget') and backup not in pending.values():
+                reason = 'failover'
+                pending[self._executor.submit(fn, backup, cancelled[backup])] = backup
+        if reason in ('slow', 'failover'):
+            AI_HEDGES.inc(reason=reason, winner='none')
+        raise error
+
+    async def acall(self, fn: Callable):
+        """
+        call() for coroutines: fn(provider) returns an awaitable, and the losing
+        request is cancelled outright (including its HTTP request)
+        """
+        order = self.ranked()
+        with self._lock:
+            self._calls += 1
+        if len(order) == 1:
+            return await fn(order[0])
+
+        primary, backup = order[0], order[1]
+        pending = {asyncio.ensure_future(fn(primary)): primary}
+        delay = self.hedge_delay(primary, backup)
+        reason = None
+        error = None
+        try:
+            while pending:
+                timeout = delay if reason is None else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if self._take_hedge():
+                        reason = 'slow'
+                        pending[asyncio.ensure_future(fn(backup))] = backup
+                    else:
+                        reason = 'budget'
+                    continue
+
+                for task in done:
+                    provider = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        error = e
+                        continue
+                    if reason in ('slow', 'failover'):
+                        AI_HEDGES.inc(reason=reason, winner='primary' if provider == primary else 'backup')
+                    return result
+
+                if reason in (None, 'budget') and backup not in pending.values():
+                    reason = 'failover'
+                    pending[asyncio.ensure_future(fn(backup))] = backup
+        finally:
+            for task in pending:
+                task.cancel()
+        if reason in ('slow', 'failover'):
+            AI_HEDGES.inc(reason=reason, winner='none')
+        raise error
+
+    def _collect_metrics(self):
+        with self._lock:
+            stats = [(provider, s.latency, s.error_rate) for provider, s in self.stats.items()]
+        yield ('acegre_ai_provider_latency_ewma_seconds', 'gauge', 'Router EWMA of successful call latency',
+               [({'provider': provider}, latency) for provider, latency, _ in stats if latency is not None])
+        yield ('acegre_ai_provider_error_rate_ewma', 'gauge', 'Router EWMA of the call error rate',
+               [({'provider': provider}, error_rate) for provider, _, error_rate in stats])
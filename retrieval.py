@@ -0,0 +1,211 @@
+"""
+Retrieval Module for AceGRE
+BM25F inverted index over word bank passages, used to answer chat questions without an LLM call
+"""
+
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from intent_engine import word_fields
+from word_bank import WordBank, WordBankSnapshot
+
+_TOKEN = re.compile(r'[a-z0-9]+|[\u4e00-\u9fff]+')
+
+# Function words are dropped from the field text, where they would match almost any question
+STOPWORDS = frozenset(
+    'a an and are as at be by can do doe for from had has have how i in is it its me of on or so that the this '
+    'to was were what when where which who why with you your'.split()
+)
+
+# aspect -> (cue terms a question about it uses, word bank fields it needs, answer template)
+ASPECTS = {
+    'definition': (
+        'meaning mean definition define translate translation 意思 含义 释义 定义 中文 翻译',
+        ('definition_en', 'definition_zh'),
+        "'{word}' {pronunciation}\n英文释义：{definition_en}\n中文释义：{definition_zh}"
+    ),
+    'etymology': (
+        'etymology root prefix suffix origin derive 词根 词缀 前缀 后缀 来源 构词',
+        ('etymology_parts', 'etymology_explanation'),
+        "'{word}'的词根构成：{etymology_parts}\n{etymology_explanation}"
+    ),
+    'synonyms': (
+        'synonym similar 同义词 近义词 同义 近义',
+        ('synonyms',),
+        "'{word}'（{definition_zh}）的同义词：{synonyms}"
+    ),
+    'memory': (
+        'remember memorize memory mnemonic trick tip 记忆 记住 记不住 助记 联想 谐音 技巧',
+        ('memory_story', 'memory_phonetic', 'memory_visual'),
+        "'{word}'的记忆方法：\n1. 联想记忆：{memory_story}\n2. 谐音记忆：{memory_phonetic}\n3. 视觉记忆：{memory_visual}"
+    ),
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased English words (plural 's' stripped) and Chinese character bigrams.
+    Documents and queries go through the same normalisation, so the crude stemming is consistent.
+    """
+    tokens = []
+    for run in _TOKEN.findall(text.lower()):
+        if run.isascii():
+            if len(run) > 4 and run.endswith('s') and not run.endswith('ss'):
+                run = run[:-1]
+            tokens.append(run)
+        elif len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+class Passage:
+    """
+    One word/aspect pair, indexed as two fields: the key (headword and the aspect's cue terms)
+    and the body (the word bank text the answer is built from)
+    """
+    __slots__ = ('word', 'aspect', 'answer', 'terms', 'length', 'body_terms', 'body_length', 'cue_terms',
+                 'word_terms')
+
+    def __init__(self, word: str, aspect: str, answer: str, terms: Counter, body_terms: Counter,
+                 cue_terms: frozenset, word_terms: frozenset):
+        self.word = word
+        self.aspect = aspect
+        self.answer = answer
+        self.terms = terms
+        self.length = sum(terms.values())
+        self.body_terms = body_terms
+        self.body_length = sum(body_terms.values())
+        self.cue_terms = cue_terms
+        self.word_terms = word_terms
+
+
+class LocalAnswer(NamedTuple):
+    text: str
+    word: str
+    aspect: str
+    score: float
+    confidence: float
+
+
+class _Index:
+    """One immutable BM25F index; rebuilt from scratch for each corpus version"""
+
+    def __init__(self, snapshot: WordBankSnapshot, k1: float, b: float, body_weight: float):
+        self.version = snapshot.version
+        self.k1 = k1
+        self.b = b
+        self.body_weight = body_weight
+        self.passages: List[Passage] = []
+        self.postings: Dict[str, List[int]] = {}
+        self.headwords = set()
+
+        cue_terms = {aspect: frozenset(tokenize(cues)) for aspect, (cues, _, _) in ASPECTS.items()}
+        for entry in snapshot.words:
+            fields = word_fields(entry['word'], entry)
+            word_terms = frozenset(tokenize(entry['word']))
+            self.headwords.update(word_terms)
+            for aspect, (cues, needed, template) in ASPECTS.items():
+                if not all(fields.get(name) for name in needed):
+                    continue
+                key = Counter(tokenize(' '.join([entry['word'], cues])))
+                # The headword already scores in the key field; counting it again wherever a story
+                # repeats it would rank that passage above the one whose aspect the question asks about
+                body = Counter(term for term in tokenize(' '.join(fields[name] for name in needed))
+                               if term not in word_terms and term not in STOPWORDS)
+                passage = Passage(entry['word'], aspect, template.format_map(fields), key, body,
+                                  cue_terms[aspect], word_terms)
+                doc_id = len(self.passages)
+                self.passages.append(passage)
+                for term in passage.terms.keys() | passage.body_terms.keys():
+                    self.postings.setdefault(term, []).append(doc_id)
+
+        total = len(self.passages)
+        self.avg_length = sum(p.length for p in self.passages) / total if total else 0.0
+        self.avg_body_length = sum(p.body_length for p in self.passages) / total if total else 0.0
+        self.idf = {term: math.log(1 + (total - len(ids) + 0.5) / (len(ids) + 0.5))
+                    for term, ids in self.postings.items()}
+
+    def score(self, passage: Passage, query: Counter) -> float:
+        """BM25F: per-field length-normalised term frequencies are weighted and summed, then saturated once"""
+        key_norm = 1 - self.b + self.b * passage.length / self.avg_length
+        body_norm = 1 - self.b + self.b * passage.body_length / self.avg_body_length if self.avg_body_length else 1.0
+        total = 0.0
+        for term, query_count in query.items():
+            tf = passage.terms.get(term, 0) / key_norm + self.body_weight * passage.body_terms.get(term, 0) / body_norm
+            if tf:
+                total += query_count * self.idf[term] * tf * (self.k1 + 1) / (tf + self.k1)
+        return total
+
+
+class RetrievalIndex:
+    """
+    Answers chat questions of the form "<word> + <aspect>" straight from the word bank.
+    Every word contributes one passage per aspect (definition, etymology, synonyms,
+    memory tricks) with two BM25F fields: the word and the aspect's cue terms, and the
+    field text at body_weight, so content words in a question count without outweighing its aspect.
+    Only passages that share a headword with the query can produce a confident
+    answer, so scoring is limited to those postings and stays sub-millisecond.
+    The current word is added to the query unless the message names a word itself.
+    """
+
+    def __init__(self, word_bank: WordBank, min_confidence: float = 0.1, k1: float = 1.2, b: float = 0.75,
+                 body_weight: float = 0.3):
+        self.word_bank = word_bank
+        self.min_confidence = min_confidence
+        self.k1 = k1
+        self.b = b
+        self.body_weight = body_weight
+        self._lock = threading.Lock()
+        self._index = _Index(word_bank.snapshot, k1, b, body_weight)
+        word_bank.add_reload_listener(self.rebuild)
+
+    def rebuild(self, snapshot: WordBankSnapshot):
+        index = _Index(snapshot, self.k1, self.b, self.body_weight)
+        with self._lock:
+            self._index = index
+
+    @property
+    def version(self) -> str:
+        return self._index.version
+
+    def search(self, message: str, current_word: str = '', limit: int = 3) -> List[Tuple[float, Passage]]:
+        """Best passages about a headword in the query, highest BM25 score first"""
+        self.word_bank.snapshot  # picks up a changed corpus file (and rebuilds via the listener)
+        index = self._index
+
+        terms = tokenize(message)
+        if current_word and not any(term in index.headwords for term in terms):
+            terms += tokenize(current_word)
+        query = Counter(terms)
+
+        candidates = set()
+        for term in query:
+            if term in index.headwords:
+                candidates.update(index.postings.get(term, ()))
+        scored = [(index.score(index.passages[doc_id], query), index.passages[doc_id]) for doc_id in candidates]
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored[:limit]
+
+    def answer(self, message: str, current_word: str = '') -> Optional[LocalAnswer]:
+        """
+        Local answer, or None when the match is not confident enough and the LLM should answer.
+        Confident means the best passage matched both its word and its aspect's cue terms,
+        and leads the runner-up by at least min_confidence of its score.
+        """
+        results = self.search(message, current_word, limit=2)
+        if not results:
+            return None
+
+        best_score, best = results[0]
+        runner_up = results[1][0] if len(results) > 1 else 0.0
+        confidence = (best_score - runner_up) / best_score if best_score > 0 else 0.0
+
+        query = set(tokenize(message)) | set(tokenize(current_word or ''))
+        if not (query & best.word_terms and query & best.cue_terms) or confidence < self.min_confidence:
+            return None
+        return LocalAnswer(best.answer, best.word, best.aspect, round(best_score, 3), round(confidence, 3))
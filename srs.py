@@ -0,0 +1,231 @@
+"""
+Spaced Repetition Module for AceGRE
+SM-2 style review scheduling with a per-user due queue
+"""
+
+import heapq
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from user_store import UserStore
+
+DAY_SECONDS = 86400.0
+
+# Retention the SM-2 intervals are calibrated for; other targets rescale them
+BASE_RETENTION = 0.9
+
+
+class SRSParams:
+    """Scheduler parameters (read from the environment by default)"""
+
+    def __init__(self, initial_ease: float = None, min_ease: float = None,
+                 interval_modifier: float = None, target_retention: float = None):
+        self.initial_ease = initial_ease or float(os.getenv('SRS_INITIAL_EASE', '2.5'))
+        self.min_ease = min_ease or float(os.getenv('SRS_MIN_EASE', '1.3'))
+        self.interval_modifier = interval_modifier or float(os.getenv('SRS_INTERVAL_MODIFIER', '1.0'))
+        self.target_retention = target_retention or float(os.getenv('SRS_TARGET_RETENTION', '0.9'))
+
+    @property
+    def interval_scale(self) -> float:
+        """Multiplier from stability (days until recall drops to 90%) to the scheduled interval"""
+        return self.interval_modifier * math.log(self.target_retention) / math.log(BASE_RETENTION)
+
+
+def grade_from_score(score: float) -> int:
+    """
+    Map an exercise score (fraction of correct answers) to an SM-2 grade.
+    Full marks -> 5, partial -> 3, nothing correct -> 1.
+    """
+    if score >= 1.0:
+        return 5
+    if score > 0:
+        return 3
+    return 1
+
+
+def review(state: Optional[Dict], grade: int, now: float, params: SRSParams) -> Dict:
+    """Apply one SM-2 review to a card state and return the new state"""
+    if state is None:
+        state = {'ease': params.initial_ease, 'stability': 0.0, 'reps': 0, 'lapses': 0}
+
+    ease = state['ease']
+    reps = state['reps']
+    lapses = state['lapses']
+
+    if grade < 3:
+        # Lapse: relearn from a one-day interval
+        reps = 0
+        lapses += 1
+        stability = 1.0
+    else:
+        reps += 1
+        if reps == 1:
+            stability = 1.0
+        elif reps == 2:
+            stability = 6.0
+        else:
+            stability = state['stability'] * ease
+
+    ease = max(params.min_ease, ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+
+    return {
+        'ease': ease,
+        'stability': stability,
+        'reps': reps,
+        'lapses': lapses,
+        'last_review': now,
+        'due': now + stability * params.interval_scale * DAY_SECONDS
+    }
+
+
+def reschedule_batch(states: List[Dict], params: SRSParams, now: float) -> List[Dict]:
+    """
+    Recompute due dates for a whole deck after a parameter change.
+    Vectorized with NumPy; also attaches each card's current recall probability.
+    """
+    import numpy as np
+
+    if not states:
+        return []
+
+    last_review = np.fromiter((s['last_review'] for s in states), dtype=np.float64, count=len(states))
+    stability = np.fromiter((s['stability'] for s in states), dtype=np.float64, count=len(states))
+
+    due = last_review + stability * params.interval_scale * DAY_SECONDS
+    elapsed_days = np.maximum(0.0, now - last_review) / DAY_SECONDS
+    recall = np.power(BASE_RETENTION, elapsed_days / stability)
+
+    return [dict(state, due=float(d), recall=float(r)) for state, d, r in zip(states, due, recall)]
+
+
+class DueQueue:
+    """One user's reviewed words in a min-heap ordered by due time"""
+
+    def __init__(self, reviews: Dict[str, Dict]):
+        self._due = {word: state['due'] for word, state in reviews.items()}
+        self._heap = [(due, word) for word, due in self._due.items()]
+        heapq.heapify(self._heap)
+
+    def push(self, word: str, due: float):
+        self._due[word] = due
+        heapq.heappush(self._heap, (due, word))
+
+    def pop_due(self, now: float) -> Optional[str]:
+        """Pop the most overdue word, skipping entries superseded by a later push"""
+        while self._heap and self._heap[0][0] <= now:
+            due, word = heapq.heappop(self._heap)
+            if self._due.get(word) == due:
+                del self._due[word]
+                return word
+        return None
+
+
+class ReviewScheduler:
+    """
+    Records review outcomes and serves the next due word from a per-user heap.
+    Heaps are cached per worker (LRU) and built from the user store on first use.
+    """
+
+    def __init__(self, user_store: UserStore, params: SRSParams = None,
+                 max_users: int = 1024, snooze_seconds: float = 600.0):
+        self.user_store = user_store
+        self.params = params or SRSParams()
+        self.max_users = max_users
+        self.snooze_seconds = snooze_seconds
+        self._queues = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, email: str, word: str, grade: int, now: float = None) -> Dict:
+        """Store the outcome of one exercise and reschedule the word"""
+        now = now or time.time()
+        state = review(self.user_store.get_review(email, word), grade, now, self.params)
+        self.user_store.save_reviews(email, {word: state})
+        with self._lock:
+            queue = self._queues.get(email)
+            if queue is not None:
+                queue.push(word, state['due'])
+        return state
+
+    def next_due(self, email: str, now: float = None) -> Optional[str]:
+        """
+        Next word whose review is due, or None.
+        A served word is snoozed in this worker so skipping it does not bring it straight back.
+        """
+        now = now or time.time()
+        with self._lock:
+            queue = self._queue(email)
+            while True:
+                word = queue.pop_due(now)
+                if word is None:
+                    return None
+                # Another worker may have reviewed the word since the heap was built
+                state = self.user_store.get_review(email, word)
+                if state is None:
+                    continue
+                if state['due'] > now:
+                    queue.push(word, state['due'])
+                    continue
+                queue.push(word, now + self.snooze_seconds)
+                return word
+
+    def _queue(self, email: str) -> DueQueue:
+        queue = self._queues.get(email)
+        if queue is None:
+            queue = DueQueue(self.user_store.get_reviews(email))
+            self._queues[email] = queue
+            if len(self._queues) > self.max_users:
+                self._queues.popitem(last=False)
+        self._queues.move_to_end(email)
+        return queue
+
+
+def reschedule_all(user_store: UserStore, params: SRSParams, now: float = None) -> Dict:
+    """
+    Recompute every user's due dates with new parameters; returns card count and mean recall.
+    The new states are written in one save_reviews_bulk call: per-user saves rewrite
+    the whole users.json each time on the JSON store.
+    """
+    now = now or time.time()
+    updated = 0
+    recall_total = 0.0
+    rescheduled = {}
+    for email in user_store.list_emails():
+        reviews = user_store.get_reviews(email)
+        if not reviews:
+            continue
+        words = list(reviews)
+        states = reschedule_batch([reviews[word] for word in words], params, now)
+        rescheduled[email] = {
+            word: {key: value for key, value in state.items() if key != 'recall'}
+            for word, state in zip(words, states)
+        }
+        updated += len(words)
+        recall_total += sum(state['recall'] for state in states)
+    if rescheduled:
+        user_store.save_reviews_bulk(rescheduled)
+    return {'cards': updated, 'mean_recall': recall_total / updated if updated else None}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from user_store import create_user_store
+
+    parser = argparse.ArgumentParser(description='Reschedule all reviews after an SRS parameter change')
+    parser.add_argument('command', choices=['reschedule'])
+    parser.add_argument('--store', default=os.getenv('USER_STORE', 'json'), choices=['json', 'sqlite'])
+    parser.add_argument('--interval-modifier', type=float)
+    parser.add_argument('--target-retention', type=float)
+    args = parser.parse_args()
+
+    store = create_user_store(args.store, os.getenv('USERS_FILE', 'users.json'),
+                              os.getenv('USERS_DB', 'users.db'))
+    params = SRSParams(interval_modifier=args.interval_modifier, target_retention=args.target_retention)
+    summary = reschedule_all(store, params)
+    print(f"✅ Rescheduled {summary['cards']} cards (interval scale {params.interval_scale:.2f})")
+    if summary['mean_recall'] is not None:
+        print(f"Mean predicted recall now: {summary['mean_recall']:.1%}")
@@ -20,6 +20,44 @@ function initializeDashboard() {
     
     // Initialize AI chat
     initializeAIChat();
+    
+    // Progress is rendered with the page; refresh it when the learner comes back to the tab
+    document.addEventListener('visibilitychange', function() {
+        if (document.visibilityState === 'visible') {
+            refreshStudyProgress();
+        }
+    });
+    window.addEventListener('pageshow', function(event) {
+        if (event.persisted) {
+            refreshStudyProgress();
+        }
+    });
+}
+
+// Re-fetch study progress, sending the last ETag so an unchanged result is a bodiless 304
+let progressETag = null;
+
+async function refreshStudyProgress() {
+    try {
+        const headers = progressETag ? { 'If-None-Match': progressETag } : {};
+        const response = await fetch('/api/progress', { headers: headers });
+        if (response.status === 304 || !response.ok) return;
+        
+        const data = await response.json();
+        if (!data.success) return;
+        progressETag = response.headers.get('ETag');
+        
+        document.querySelectorAll('.progress-info[data-subject]').forEach(info => {
+            const progress = data.study_progress[info.dataset.subject];
+            if (!progress) return;
+            const level = info.querySelector('.level');
+            const completed = info.querySelector('.completed');
+            level.textContent = level.textContent.replace(/\d+\s*$/, progress.level);
+            completed.textContent = completed.textContent.replace(/^\d+/, progress.completed);
+        });
+    } catch (error) {
+        console.error('Error refreshing study progress:', error);
+    }
 }
 
 // Navigation functions
@@ -3,38 +3,82 @@ let currentWord = null;
 let synonymAnswers = [];
 let selectedSynonyms = [];
 let selectedDefinition = null;
+let exerciseScores = {};
+let cardExercises = [];
+let reviewRecorded = false;
 let sessionProgress = 0;
 let totalWords = 20;
 let difficulty = 'medium';
 
+// Prefetched cards, so moving to the next word needs no round trip
+const PREFETCH_SIZE = 4;
+let wordQueue = [];
+let refillPromise = null;
+let refillDifficulty = null;
+let recentWords = [];
+
 // Initialize the page
 document.addEventListener('DOMContentLoaded', function() {
     loadNewWord();
     updateProgressDisplay();
 });
 
-// Load a new word from the API
+// Fetch the next few cards in one request and append them to the prefetch queue
+function refillQueue() {
+    if (refillPromise) {
+        // A batch for another difficulty is in flight; refill again once it lands
+        return refillDifficulty === difficulty ? refillPromise : refillPromise.then(refillQueue, refillQueue);
+    }
+    
+    const requestedDifficulty = difficulty;
+    refillDifficulty = requestedDifficulty;
+    const held = wordQueue.map(card => card.word).concat(recentWords);
+    if (currentWord) held.push(currentWord.word);
+    
+    refillPromise = fetch('/api/word/batch', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            difficulty: requestedDifficulty,
+            count: PREFETCH_SIZE - wordQueue.length + 1,
+            exclude: held
+        })
+    })
+        .then(response => {
+            if (!response.ok) throw new Error('Failed to load words');
+            return response.json();
+        })
+        .then(data => {
+            // Drop the batch if the difficulty changed while it was in flight
+            if (data.success && requestedDifficulty === difficulty) {
+                const queued = new Set(wordQueue.map(card => card.word));
+                wordQueue.push(...data.words.filter(card => !queued.has(card.word)));
+            }
+        })
+        .finally(() => {
+            refillPromise = null;
+        });
+    return refillPromise;
+}
+
+// Show the next card from the queue, fetching only when the queue is empty
 async function loadNewWord() {
-    showLoading(true);
+    recordCardReview();
+    const waiting = wordQueue.length === 0;
+    if (waiting) showLoading(true);
     
     try {
-        const response = await fetch('/api/word/random', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({
-                difficulty: difficulty,
-                learned_words: getLearnedWords()
-            })
-        });
-        
-        if (!response.ok) {
+        if (waiting) {
+            await refillQueue();
+        }
+        const data = wordQueue.shift();
+        if (!data) {
             throw new Error('Failed to load word');
         }
-        
-        const data = await response.json();
         currentWord = data;
+        recentWords = recentWords.concat(data.word).slice(-20);
         
         displayWord(data);
         generateSynonymQuestion(data);
@@ -46,12 +90,99 @@ async function loadNewWord() {
         selectedSynonyms = [];
         selectedDefinition = null;
         synonymAnswers = data.synonyms || [];
+        exerciseScores = {};
+        reviewRecorded = false;
+        cardExercises = (data.synonym_options || []).length ? ['synonym', 'definition'] : ['definition'];
+        
+        // AI content is generated in the background; patch the card when it arrives
+        if (data.enrichment === 'pending') {
+            pollEnrichment(data.word);
+        }
+        
+        // Top the queue back up while the learner works on this card
+        if (wordQueue.length < PREFETCH_SIZE) {
+            refillQueue().catch(error => console.error('Error prefetching words:', error));
+        }
         
     } catch (error) {
         console.error('Error loading word:', error);
         showNotification('Failed to load new word. Please try again.', 'error');
     } finally {
-        showLoading(false);
+        if (waiting) showLoading(false);
+    }
+}
+
+// Responses kept with their ETag; requests send If-None-Match and reuse the body on 304
+const validatorCache = new Map();
+
+async function fetchWithValidator(url, options = {}) {
+    const key = `${options.method || 'GET'} ${url} ${options.body || ''}`;
+    const cached = validatorCache.get(key);
+    const headers = Object.assign({}, options.headers);
+    if (cached) {
+        headers['If-None-Match'] = cached.etag;
+    }
+    
+    const response = await fetch(url, Object.assign({}, options, { headers: headers }));
+    if (response.status === 304 && cached) {
+        return cached.data;
+    }
+    if (!response.ok) {
+        throw new Error(`Request failed: ${response.status}`);
+    }
+    
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+        validatorCache.set(key, { etag: etag, data: data });
+    }
+    return data;
+}
+
+// Poll for the AI-enhanced card and patch the current card in place
+async function pollEnrichment(word, attempt = 0) {
+    const maxAttempts = 20;
+    if (!currentWord || currentWord.word !== word || attempt >= maxAttempts) return;
+    
+    await new Promise(resolve => setTimeout(resolve, 1500));
+    if (!currentWord || currentWord.word !== word) return;
+    
+    try {
+        const data = await fetchWithValidator(`/api/word/enrichment/${encodeURIComponent(word)}`);
+        if (!data.success || data.enrichment === 'failed' || data.enrichment === 'none') return;
+        
+        if (data.enrichment === 'pending') {
+            pollEnrichment(word, attempt + 1);
+        } else if (currentWord && currentWord.word === word) {
+            applyEnrichment(data);
+        }
+    } catch (error) {
+        console.error('Error polling enrichment:', error);
+    }
+}
+
+function applyEnrichment(data) {
+    const previous = currentWord;
+    currentWord = Object.assign({}, data);
+    // A toggle may still be in flight; the star on screen is the newest state
+    currentWord.is_favorite = previous.is_favorite;
+    
+    generateEtymology(data);
+    updateMemoryMethods(data);
+    
+    // Only swap the exercises if the learner has not started answering them
+    if (selectedSynonyms.length === 0 && !document.querySelector('.synonym-option.correct, .synonym-option.incorrect')) {
+        generateSynonymQuestion(data);
+        synonymAnswers = data.synonyms || [];
+    } else {
+        currentWord.synonym_options = previous.synonym_options;
+        currentWord.synonyms = previous.synonyms;
+    }
+    if (selectedDefinition === null) {
+        generateDefinitionPractice(data);
+    } else {
+        currentWord.definition_options = previous.definition_options;
+        currentWord.correct_definition = previous.correct_definition;
     }
 }
 
@@ -60,6 +191,7 @@ function displayWord(wordData) {
     document.getElementById('currentWord').textContent = wordData.word;
     document.getElementById('wordPronunciation').textContent = wordData.pronunciation || '';
     document.getElementById('wordLevel').textContent = `Level: ${wordData.level || difficulty}`;
+    showFavoriteState(!!wordData.is_favorite);
     
     const definitionContent = document.querySelector('.definition-content');
     definitionContent.innerHTML = `
@@ -73,7 +205,8 @@ function generateSynonymQuestion(wordData) {
     const questionContainer = document.getElementById('synonymOptions');
     const options = wordData.synonym_options || [];
     
-    questionContainer.innerHTML = '';
+    questionContainer.innerHTML = options.length ? '' :
+        '<div style="color: #a0a0a0;">Synonym exercise not available for this word.</div>';
     
     options.forEach((option, index) => {
         const optionElement = document.createElement('div');
@@ -102,6 +235,7 @@ function selectSynonym(index, element) {
 
 // Check synonym answers
 function checkSynonyms() {
+    if (!synonymAnswers.length) return;
     if (selectedSynonyms.length !== 2) {
         showNotification('Please select exactly 2 synonyms.', 'error');
         return;
@@ -135,6 +269,8 @@ function checkSynonyms() {
         resultDiv.innerHTML = '<div style="color: #EF4444; font-weight: 600;">✗ Incorrect. Try to remember the correct synonyms.</div>';
     }
     
+    recordExercise('synonym', correctCount / 2);
+    
     // Disable further selection
     options.forEach(option => {
         option.style.pointerEvents = 'none';
@@ -243,12 +379,47 @@ function checkDefinition() {
         resultDiv.innerHTML = `<div style="color: #EF4444; font-weight: 600;">✗ Incorrect. The correct answer is option ${correctAnswer + 1}.</div>`;
     }
     
+    recordExercise('definition', selectedDefinition === correctAnswer ? 1 : 0);
+    
     // Disable further selection
     document.querySelectorAll('.definition-option').forEach(option => {
         option.style.pointerEvents = 'none';
     });
 }
 
+// Keep the first score of each exercise; the card is reviewed once both are answered
+function recordExercise(exercise, score) {
+    if (exercise in exerciseScores) return;
+    exerciseScores[exercise] = score;
+    if (cardExercises.every(name => name in exerciseScores)) {
+        recordCardReview();
+    }
+}
+
+// Record one spaced-repetition review for the current card (score: mean fraction correct
+// over the exercises answered); called again when leaving the card, it is a no-op
+async function recordCardReview() {
+    const scores = Object.values(exerciseScores);
+    if (!currentWord || !scores.length || reviewRecorded) return;
+    reviewRecorded = true;
+    
+    try {
+        await fetch('/api/word/review', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                word: currentWord.word,
+                score: scores.reduce((sum, score) => sum + score, 0) / scores.length
+            }),
+            keepalive: true
+        });
+    } catch (error) {
+        console.error('Error recording review:', error);
+    }
+}
+
 // Pronounce word (Text-to-Speech)
 function pronounceWord() {
     if ('speechSynthesis' in window && currentWord) {
@@ -261,10 +432,14 @@ function pronounceWord() {
     }
 }
 
-// Toggle favorite
+// Toggle favorite: update the star right away; the notification waits for the server's answer
 async function toggleFavorite() {
     if (!currentWord) return;
     
+    const card = currentWord;
+    card.is_favorite = !card.is_favorite;
+    showFavoriteState(card.is_favorite);
+    
     try {
         const response = await fetch('/api/word/favorite', {
             method: 'POST',
@@ -272,29 +447,37 @@ async function toggleFavorite() {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({
-                word: currentWord.word,
+                word: card.word,
                 action: 'toggle'
-            })
+            }),
+            keepalive: true
         });
         
-        if (response.ok) {
-            const data = await response.json();
-            const favoriteBtn = document.querySelector('.favorite-btn');
-            
-            if (data.is_favorite) {
-                favoriteBtn.style.color = '#FFD95A';
-                favoriteBtn.style.textShadow = '0 0 10px rgba(255, 217, 90, 0.8)';
-                showNotification('Added to favorites!', 'success');
-            } else {
-                favoriteBtn.style.color = '#00FFFF';
-                favoriteBtn.style.textShadow = 'none';
-                showNotification('Removed from favorites.', 'success');
-            }
+        if (!response.ok) {
+            throw new Error('Failed to update favorite');
         }
+        const data = await response.json();
+        card.is_favorite = data.is_favorite;
+        showNotification(card.is_favorite ? 'Added to favorites!' : 'Removed from favorites.', 'success');
     } catch (error) {
         console.error('Error toggling favorite:', error);
+        card.is_favorite = !card.is_favorite;
         showNotification('Failed to update favorite status.', 'error');
     }
+    if (currentWord === card) {
+        showFavoriteState(card.is_favorite);
+    }
+}
+
+function showFavoriteState(isFavorite) {
+    const favoriteBtn = document.querySelector('.favorite-btn');
+    if (isFavorite) {
+        favoriteBtn.style.color = '#FFD95A';
+        favoriteBtn.style.textShadow = '0 0 10px rgba(255, 217, 90, 0.8)';
+    } else {
+        favoriteBtn.style.color = '#00FFFF';
+        favoriteBtn.style.textShadow = 'none';
+    }
 }
 
 // Skip current word
@@ -307,6 +490,7 @@ function skipWord() {
 
 // Go to next word
 function nextWord() {
+    recordCardReview();
     sessionProgress++;
     updateProgressDisplay();
     
@@ -317,10 +501,14 @@ function nextWord() {
     }
 }
 
-// Mark word as learned
+// Mark word as learned: move on immediately, the update is sent in the background
 async function markLearned() {
     if (!currentWord) return;
     
+    const word = currentWord.word;
+    showNotification('Word marked as learned!', 'success');
+    nextWord();
+    
     try {
         const response = await fetch('/api/word/learned', {
             method: 'POST',
@@ -328,18 +516,17 @@ async function markLearned() {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({
-                word: currentWord.word
-            })
+                word: word
+            }),
+            keepalive: true
         });
         
-        if (response.ok) {
-            showNotification('Word marked as learned!', 'success');
-            addToLearnedWords(currentWord.word);
-            nextWord();
+        if (!response.ok) {
+            throw new Error('Failed to mark word as learned');
         }
     } catch (error) {
         console.error('Error marking word as learned:', error);
-        showNotification('Failed to mark word as learned.', 'error');
+        showNotification(`Failed to mark "${word}" as learned.`, 'error');
     }
 }
 
@@ -350,7 +537,8 @@ function changeDifficulty() {
     
     showNotification(`Difficulty changed to ${difficulty}.`, 'success');
     
-    // Restart session with new difficulty
+    // Restart session with new difficulty; queued cards were picked for the old one
+    wordQueue = [];
     sessionProgress = 0;
     updateProgressDisplay();
     loadNewWord();
@@ -402,20 +590,6 @@ function showSessionComplete() {
     }, 2000);
 }
 
-// Local storage helpers
-function getLearnedWords() {
-    const learned = localStorage.getItem('learnedWords');
-    return learned ? JSON.parse(learned) : [];
-}
-
-function addToLearnedWords(word) {
-    const learned = getLearnedWords();
-    if (!learned.includes(word)) {
-        learned.push(word);
-        localStorage.setItem('learnedWords', JSON.stringify(learned));
-    }
-}
-
 // AI Enhancement Functions
 async function enhanceWithAI(contentType = 'all') {
     if (!currentWord) return;
@@ -423,7 +597,7 @@ async function enhanceWithAI(contentType = 'all') {
     showLoading(true);
     
     try {
-        const response = await fetch('/api/word/enhance', {
+        const data = await fetchWithValidator('/api/word/enhance', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -434,28 +608,25 @@ async function enhanceWithAI(contentType = 'all') {
             })
         });
         
-        if (response.ok) {
-            const data = await response.json();
-            
-            if (data.success) {
-                // 更新对应的内容
-                if (contentType === 'memory' || contentType === 'all') {
-                    updateMemoryMethods(data);
-                }
-                if (contentType === 'etymology' || contentType === 'all') {
-                    updateEtymology(data);
-                }
-                if (contentType === 'all' && data.enhanced_data) {
-                    currentWord = data.enhanced_data;
-                    displayWord(currentWord);
-                    generateSynonymQuestion(currentWord);
-                    generateDefinitionPractice(currentWord);
-                }
-                
-                showNotification('AI内容生成成功！', 'success');
-            } else {
-                showNotification('AI增强失败: ' + data.message, 'error');
+        if (data.success) {
+            // 更新对应的内容
+            if (contentType === 'memory' || contentType === 'all') {
+                updateMemoryMethods(data);
+            }
+            if (contentType === 'etymology' || contentType === 'all') {
+                updateEtymology(data);
             }
+            if (contentType === 'all' && data.enhanced_data) {
+                // 增强内容不含收藏状态，沿用当前卡片的
+                currentWord = Object.assign({}, data.enhanced_data, { is_favorite: currentWord.is_favorite });
+                displayWord(currentWord);
+                generateSynonymQuestion(currentWord);
+                generateDefinitionPractice(currentWord);
+            }
+            
+            showNotification('AI内容生成成功！', 'success');
+        } else {
+            showNotification('AI增强失败: ' + data.message, 'error');
         }
     } catch (error) {
         console.error('AI enhancement error:', error);
@@ -584,12 +755,79 @@ function addQuickAIQuestions() {
     }
 }
 
+// 流式AI问答：通过SSE逐段接收回复，onToken 收到每一段文本
+async function askAIStream(question, onToken) {
+    const response = await fetch('/api/ai/chat/stream', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            message: question,
+            context: {
+                current_word: currentWord ? currentWord.word : null
+            }
+        })
+    });
+    
+    if (!response.ok || !response.body || !(response.headers.get('Content-Type') || '').includes('text/event-stream')) {
+        throw new Error('Streaming not available');
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        
+        for (const rawEvent of events) {
+            let eventType = 'message';
+            let data = '';
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) eventType = line.slice(7);
+                else if (line.startsWith('data: ')) data += line.slice(6);
+            });
+            
+            if (eventType === 'done') return;
+            if (eventType === 'error') throw new Error('AI stream interrupted');
+            
+            const payload = JSON.parse(data);
+            if (payload.token) onToken(payload.token);
+        }
+    }
+}
+
 async function quickAI(question) {
     const responseDiv = document.getElementById('aiQuickResponse');
     responseDiv.innerHTML = '<div style="color: #667eea;">🤖 AI思考中...</div>';
     
-    const response = await askAI(question);
-    responseDiv.innerHTML = `<div style="color: #e0e0e0; line-height: 1.5; margin-top: 0.5rem;">${response}</div>`;
+    const output = document.createElement('div');
+    output.style.cssText = 'color: #e0e0e0; line-height: 1.5; margin-top: 0.5rem; white-space: pre-wrap;';
+    let received = false;
+    
+    try {
+        await askAIStream(question, token => {
+            if (!received) {
+                responseDiv.innerHTML = '';
+                responseDiv.appendChild(output);
+                received = true;
+            }
+            output.textContent += token;
+        });
+    } catch (error) {
+        console.error('AI stream error:', error);
+        if (!received) {
+            // 流式接口不可用时改用普通接口
+            const response = await askAI(question);
+            responseDiv.innerHTML = `<div style="color: #e0e0e0; line-height: 1.5; margin-top: 0.5rem;">${response}</div>`;
+        }
+    }
 }
 
 // 页面加载时添加AI功能
@@ -0,0 +1,27 @@
+"""Flask test client logged in as one user, with a mock AI provider and stores under tmp_path"""
+
+import pytest
+
+import app as app_module
+from ai_service import AIService
+from user_store import JSONUserStore, default_study_progress
+
+USER = 'reader@example.com'
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setenv('AI_PROVIDER', 'mock')
+    monkeypatch.delenv('AI_PROVIDERS', raising=False)
+    monkeypatch.setenv('AI_CACHE_FILE', str(tmp_path / 'ai_cache.db'))
+    monkeypatch.setenv('AI_LOCK_DIR', '')
+    monkeypatch.setenv('MOCK_AI_LATENCY', '0')
+    monkeypatch.setattr(app_module, 'ai_service', AIService())
+    store = JSONUserStore(str(tmp_path / 'users.json'))
+    store.create_user(USER, {'name': 'reader', 'study_progress': default_study_progress()})
+    monkeypatch.setattr(app_module, 'user_store', store)
+
+    client = app_module.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = USER
+    return client
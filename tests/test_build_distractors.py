@@ -0,0 +1,36 @@
+"""The offline distractor build runs on the shipped corpus"""
+
+import copy
+import json
+import subprocess
+import sys
+
+import build_distractors
+from build_distractors import DEFINITION_OPTIONS, MIN_CORPUS_WORDS, SYNONYM_OPTIONS, build, load_corpus
+from word_bank import DEFAULT_WORD_BANK_FILE
+
+
+def test_shipped_corpus_is_large_enough():
+    _, words = load_corpus(DEFAULT_WORD_BANK_FILE)
+    assert len(words) >= MIN_CORPUS_WORDS
+
+
+def test_force_rebuild_of_shipped_corpus():
+    _, words = load_corpus(DEFAULT_WORD_BANK_FILE)
+    words = copy.deepcopy(words)
+    stats = build(words, force=True)
+    assert stats['synonym'] == len(words)
+    assert not stats['needs_synonyms'] and not stats['too_few_distractors']
+    for entry in words:
+        assert len(entry['synonym_options']) == SYNONYM_OPTIONS
+        assert len(entry['definition_options']) == DEFINITION_OPTIONS
+
+
+def test_cli_rejects_too_small_corpus(tmp_path):
+    _, words = load_corpus(DEFAULT_WORD_BANK_FILE)
+    path = tmp_path / 'small.json'
+    path.write_text(json.dumps(words[:MIN_CORPUS_WORDS - 1]), encoding='utf-8')
+    result = subprocess.run([sys.executable, build_distractors.__file__, '--words', str(path)],
+                            capture_output=True, text=True)
+    assert result.returncode == 2
+    assert f'need at least {MIN_CORPUS_WORDS} words' in result.stderr
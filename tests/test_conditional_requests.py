@@ -0,0 +1,67 @@
+"""Revalidated enhance and progress requests get a 304 before any content is generated or read"""
+
+import pytest
+
+import app as app_module
+from conftest import USER
+from user_store import JSONUserStore, SQLiteUserStore, default_study_progress
+
+
+def count_calls(monkeypatch, obj, name):
+    calls = []
+    method = getattr(obj, name)
+
+    def counted(*args, **kwargs):
+        calls.append(args)
+        return method(*args, **kwargs)
+    monkeypatch.setattr(obj, name, counted)
+    return calls
+
+
+def test_enhance_revalidation_skips_generation(client, monkeypatch):
+    calls = count_calls(monkeypatch, app_module.ai_service, 'generate_word_content')
+    body = {'word': 'abstruse', 'content_type': 'memory'}
+
+    first = client.post('/api/word/enhance', json=body)
+    assert first.status_code == 200 and first.headers['ETag']
+
+    again = client.post('/api/word/enhance', json=body, headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == first.headers['ETag']
+    assert len(calls) == 1
+
+
+def test_enhance_is_not_tagged_until_cached(client, monkeypatch):
+    monkeypatch.setattr(app_module.ai_service, 'generate_word_content', lambda word, word_info, content_type: word_info)
+    response = client.post('/api/word/enhance', json={'word': 'abstruse', 'content_type': 'memory'})
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+
+
+def test_progress_revalidation_skips_progress_read(client, monkeypatch):
+    calls = count_calls(monkeypatch, app_module.user_store, 'get_study_progress')
+
+    first = client.get('/api/progress')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert client.get('/api/progress', headers={'If-None-Match': etag}).status_code == 304
+    assert len(calls) == 1
+
+    app_module.user_store.mark_learned(USER, 'abstruse')
+    changed = client.get('/api/progress', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.get_json()['study_progress']['word']['completed'] == 1
+
+
+@pytest.mark.parametrize('backend', ['json', 'sqlite'])
+def test_progress_version_follows_progress_changes(tmp_path, backend):
+    store = JSONUserStore(str(tmp_path / 'users.json')) if backend == 'json' else SQLiteUserStore(
+        str(tmp_path / 'users.db'))
+    store.create_user(USER, {'name': 'reader', 'study_progress': default_study_progress()})
+    assert store.get_progress_version(USER) == 0
+
+    store.mark_learned(USER, 'abstruse')
+    assert store.get_progress_version(USER) == 1
+    store.mark_learned(USER, 'abstruse')
+    store.toggle_favorite(USER, 'laconic')
+    assert store.get_progress_version(USER) == 1
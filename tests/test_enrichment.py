@@ -0,0 +1,83 @@
+"""Async enrichment jobs always release their slot"""
+
+import asyncio
+
+from enrichment import FAILED, PENDING, READY, EnrichmentQueue
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_async_job_finishes_ready():
+    async def main():
+        queue = EnrichmentQueue(ai_service=None, max_workers=1)
+
+        async def generate(word, word_info):
+            return dict(word_info, memory_story='story')
+
+        assert queue.submit_async('abstruse', {'word': 'abstruse'}, generate, asyncio.get_running_loop())
+        await settle()
+        return queue
+
+    queue = asyncio.run(main())
+    status, content = queue.status('abstruse')
+    assert status == READY and content['memory_story'] == 'story'
+    assert queue._pending == 0
+
+
+def test_failed_async_job_is_marked_failed():
+    async def main():
+        queue = EnrichmentQueue(ai_service=None, max_workers=1)
+
+        async def generate(word, word_info):
+            raise RuntimeError('provider down')
+
+        queue.submit_async('abstruse', {'word': 'abstruse'}, generate, asyncio.get_running_loop())
+        await settle()
+        return queue
+
+    queue = asyncio.run(main())
+    assert queue.status('abstruse')[0] == FAILED
+    assert queue._pending == 0
+
+
+def test_cancelled_async_job_releases_its_slot():
+    started = []
+
+    async def main():
+        queue = EnrichmentQueue(ai_service=None, max_workers=1)
+
+        async def generate(word, word_info):
+            started.append(word)
+            await asyncio.sleep(60)
+
+        queue.submit_async('abstruse', {'word': 'abstruse'}, generate, asyncio.get_running_loop())
+        await settle()
+        assert queue.status('abstruse')[0] == PENDING
+        for task in list(queue._tasks):
+            task.cancel()
+        await settle()
+        return queue
+
+    queue = asyncio.run(main())
+    assert started == ['abstruse']
+    assert queue.status('abstruse')[0] == FAILED
+    assert queue._pending == 0
+
+
+def test_job_cancelled_at_loop_shutdown_releases_its_slot():
+    queue = EnrichmentQueue(ai_service=None, max_workers=1)
+
+    async def generate(word, word_info):
+        await asyncio.sleep(60)
+
+    async def main():
+        queue.submit_async('abstruse', {'word': 'abstruse'}, generate, asyncio.get_running_loop())
+        await settle()
+
+    # asyncio.run cancels the still-running job when main returns
+    asyncio.run(main())
+    assert queue.status('abstruse')[0] == FAILED
+    assert queue._pending == 0
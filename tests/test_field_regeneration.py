@@ -0,0 +1,56 @@
+"""Field retries fill in missing fields; content still incomplete afterwards is not cached"""
+
+import json
+
+import pytest
+
+from ai_service import AIService
+from word_bank import WordBank
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv('AI_PROVIDER', 'mock')
+    monkeypatch.delenv('AI_PROVIDERS', raising=False)
+    monkeypatch.setenv('AI_CACHE_FILE', str(tmp_path / 'ai_cache.db'))
+    monkeypatch.setenv('AI_LOCK_DIR', '')
+    monkeypatch.setenv('MOCK_AI_LATENCY', '0')
+    return AIService()
+
+
+@pytest.fixture
+def word_info():
+    return WordBank(reload_interval=0).get('abstruse')
+
+
+def drop_field(service, field, always):
+    """Make the mock provider leave out field (on the first call only unless always)"""
+    content = service._mock_content
+    calls = []
+
+    def mock_content(word, word_info, fields=None):
+        calls.append(list(fields or []))
+        data = json.loads(content(word, word_info, fields))
+        if always or len(calls) == 1:
+            data.pop(field, None)
+        return json.dumps(data, ensure_ascii=False)
+
+    service._mock_content = mock_content
+    return calls
+
+
+def test_missing_field_is_regenerated_alone_and_cached(service, word_info):
+    calls = drop_field(service, 'memory_visual', always=False)
+    content = service.generate_ai_content('abstruse', dict(word_info))
+
+    assert calls[1] == ['memory_visual']
+    assert content['memory_visual']
+    assert service.get_cached_content('abstruse', word_info) is not None
+
+
+def test_incomplete_content_is_not_cached(service, word_info):
+    drop_field(service, 'memory_visual', always=True)
+    content = service.generate_ai_content('abstruse', dict(word_info))
+
+    assert content['memory_story']
+    assert service.get_cached_content('abstruse', word_info) is None
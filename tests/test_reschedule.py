@@ -0,0 +1,38 @@
+"""Rescheduling writes every user's new review states in one store call"""
+
+import pytest
+
+from srs import SRSParams, review, reschedule_all
+from user_store import JSONUserStore, SQLiteUserStore
+
+NOW = 1_700_000_000.0
+USERS = [f'user{i}@example.com' for i in range(3)]
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'json':
+        store = JSONUserStore(str(tmp_path / 'users.json'))
+    else:
+        store = SQLiteUserStore(str(tmp_path / 'users.db'))
+    for email in USERS:
+        store.create_user(email, {'name': email.split('@')[0]})
+        store.save_reviews(email, {word: review(None, 4, NOW, SRSParams()) for word in ('abstruse', 'laconic')})
+    return store
+
+
+def test_reschedule_saves_all_users_at_once(store, monkeypatch):
+    bulk_calls = []
+    save_bulk = store.save_reviews_bulk
+    monkeypatch.setattr(store, 'save_reviews', lambda *args: pytest.fail('per-user save'))
+    monkeypatch.setattr(store, 'save_reviews_bulk', lambda reviews: bulk_calls.append(reviews) or save_bulk(reviews))
+    before = {email: store.get_reviews(email) for email in USERS}
+
+    summary = reschedule_all(store, SRSParams(interval_modifier=2.0), now=NOW + 3600)
+
+    assert summary['cards'] == 2 * len(USERS)
+    assert len(bulk_calls) == 1
+    for email in USERS:
+        after = store.get_reviews(email)
+        assert set(after) == {'abstruse', 'laconic'}
+        assert all(after[word]['due'] > before[email][word]['due'] for word in after)
@@ -0,0 +1,56 @@
+"""Local answers for the common in-scope chat questions"""
+
+import pytest
+
+from retrieval import RetrievalIndex
+from word_bank import WordBank
+
+
+@pytest.fixture(scope='module')
+def index():
+    return RetrievalIndex(WordBank(reload_interval=0))
+
+
+@pytest.mark.parametrize('message, word, aspect', [
+    ('what does abstruse mean', 'abstruse', 'definition'),
+    ('meaning of ephemeral', 'ephemeral', 'definition'),
+    ('define castigate', 'castigate', 'definition'),
+    ('abstruse是什么意思', 'abstruse', 'definition'),
+    ('synonyms of laconic', 'laconic', 'synonyms'),
+    ('give me a synonym for gregarious', 'gregarious', 'synonyms'),
+    ('laconic的同义词', 'laconic', 'synonyms'),
+    ('what is the root of castigate', 'castigate', 'etymology'),
+    ('how to remember ameliorate', 'ameliorate', 'memory'),
+])
+def test_answers_word_and_aspect_questions(index, message, word, aspect):
+    answer = index.answer(message)
+    assert answer is not None
+    assert (answer.word, answer.aspect) == (word, aspect)
+    assert answer.confidence >= index.min_confidence
+
+
+def test_definition_answer_uses_word_bank_text(index):
+    answer = index.answer('what does abstruse mean')
+    assert 'Difficult to understand' in answer.text
+
+
+def test_current_word_fills_in_unnamed_word(index):
+    answer = index.answer('what does it mean', current_word='laconic')
+    assert (answer.word, answer.aspect) == ('laconic', 'definition')
+
+
+def test_no_answer_without_aspect_cue(index):
+    assert index.answer('tell me about abstruse') is None
+
+
+def test_no_answer_without_known_word(index):
+    assert index.answer('what does serendipity mean') is None
+
+
+@pytest.mark.parametrize('message, aspect', [
+    ('abstruse obscure', 'synonyms'),
+    ('castigate punish', 'definition'),
+])
+def test_field_text_ranks_passages(index, message, aspect):
+    best = index.search(message)[0][1]
+    assert (best.word, best.aspect) == (message.split()[0], aspect)
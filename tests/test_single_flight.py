@@ -0,0 +1,48 @@
+"""Concurrent requests for the same uncached word share one provider call"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ai_service import AIService
+from word_bank import WordBank
+
+REQUESTS = 50
+
+
+# Without a lock directory only the in-process single flight can merge the calls
+@pytest.mark.parametrize('lock_dir', ['', 'locks'])
+def test_concurrent_requests_make_one_provider_call(tmp_path, monkeypatch, lock_dir):
+    monkeypatch.setenv('AI_PROVIDER', 'mock')
+    monkeypatch.delenv('AI_PROVIDERS', raising=False)
+    monkeypatch.setenv('AI_CACHE_FILE', str(tmp_path / 'ai_cache.db'))
+    monkeypatch.setenv('AI_LOCK_DIR', str(tmp_path / lock_dir) if lock_dir else '')
+    service = AIService()
+
+    calls = []
+    generate = service._generate_with_mock
+
+    def counting_generate(*args, **kwargs):
+        calls.append(args[0])
+        # Slow enough that every request arrives while the first call is still in flight
+        time.sleep(0.2)
+        return generate(*args, **kwargs)
+
+    service._generate_with_mock = counting_generate
+
+    word_info = WordBank(reload_interval=0).get('abstruse')
+    start = threading.Barrier(REQUESTS)
+
+    def request(_):
+        start.wait()
+        return service.generate_ai_content('abstruse', dict(word_info))
+
+    with ThreadPoolExecutor(REQUESTS) as pool:
+        results = list(pool.map(request, range(REQUESTS)))
+
+    assert calls == ['abstruse']
+    assert len(results) == REQUESTS
+    assert all(result == results[0] for result in results)
+    assert results[0]['memory_story']
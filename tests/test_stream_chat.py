@@ -0,0 +1,38 @@
+"""A chat stream closed by a disconnecting client gives back the half-open breaker's trial slot"""
+
+import pytest
+
+from ai_service import AIService, CircuitBreaker
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv('AI_PROVIDER', 'mock')
+    monkeypatch.delenv('AI_PROVIDERS', raising=False)
+    monkeypatch.setenv('AI_CACHE_FILE', str(tmp_path / 'ai_cache.db'))
+    monkeypatch.setenv('MOCK_AI_LATENCY', '0')
+    return AIService()
+
+
+def half_open(service):
+    breaker = service.breakers['mock']
+    breaker.state = CircuitBreaker.OPEN
+    breaker._opened_at -= breaker.reset_timeout
+    return breaker
+
+
+def test_closed_stream_releases_trial(service):
+    breaker = half_open(service)
+    stream = service.stream_chat('system', 'hello')
+    assert next(stream)
+    assert not breaker.available()
+
+    stream.close()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.available()
+
+
+def test_finished_stream_closes_breaker(service):
+    breaker = half_open(service)
+    assert ''.join(service.stream_chat('system', 'hello'))
+    assert breaker.state == CircuitBreaker.CLOSED
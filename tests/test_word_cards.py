@@ -0,0 +1,17 @@
+"""Card payloads carry the requesting user's favorite star"""
+
+import app as app_module
+from conftest import USER
+
+
+def test_cards_carry_favorite_state(client):
+    app_module.user_store.toggle_favorite(USER, 'abstruse')
+
+    batch = client.post('/api/word/batch', json={'count': 6, 'difficulty': 'all'}).get_json()
+    stars = {card['word']: card['is_favorite'] for card in batch['words']}
+    assert stars.pop('abstruse') is True
+    assert not any(stars.values())
+
+    app_module.ai_service.generate_word_content('abstruse', app_module.word_bank.get('abstruse'))
+    poll = client.get('/api/word/enrichment/abstruse').get_json()
+    assert (poll['enrichment'], poll['is_favorite']) == ('ready', True)
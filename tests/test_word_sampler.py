@@ -0,0 +1,39 @@
+"""Word picking on empty banks and learned-word membership"""
+
+import json
+
+from user_store import JSONUserStore
+from word_bank import WordBank
+from word_sampler import WordSampler
+
+
+def make_bank(tmp_path, words):
+    path = tmp_path / 'words.json'
+    path.write_text(json.dumps({'version': '1', 'words': words}), encoding='utf-8')
+    return WordBank(str(path), reload_interval=0)
+
+
+def test_pick_returns_none_for_empty_bank(tmp_path):
+    sampler = WordSampler(make_bank(tmp_path, []), JSONUserStore(str(tmp_path / 'users.json')))
+    assert sampler.pick('a@example.com', 'medium') is None
+
+
+def test_pick_skips_learned_words(tmp_path):
+    bank = WordBank(reload_interval=0)
+    store = JSONUserStore(str(tmp_path / 'users.json'))
+    store.create_user('a@example.com', {'name': 'a'})
+    sampler = WordSampler(bank, store)
+
+    words = [entry['word'] for entry in bank.all_words()]
+    for word in words[:-1]:
+        store.mark_learned('a@example.com', word)
+    assert sampler.pick('a@example.com', 'medium')['word'] == words[-1]
+
+
+def test_is_learned_follows_writes(tmp_path):
+    store = JSONUserStore(str(tmp_path / 'users.json'))
+    store.create_user('a@example.com', {'name': 'a'})
+    assert not store.is_learned('a@example.com', 'abstruse')
+    store.mark_learned('a@example.com', 'abstruse')
+    assert store.is_learned('a@example.com', 'abstruse')
+    assert not store.is_learned('b@example.com', 'abstruse')
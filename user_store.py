@@ -0,0 +1,628 @@
+"""
+User Store Module for AceGRE
+Pluggable storage backends for user accounts and learning progress
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from metrics import FAST_BUCKETS, registry
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+DEFAULT_STUDY_PROGRESS = {
+    'word': {'level': 1, 'completed': 0},
+    'math': {'level': 1, 'completed': 0},
+    'reading': {'level': 1, 'completed': 0},
+    'writing': {'level': 1, 'completed': 0}
+}
+
+
+STORE_OPERATION_SECONDS = registry.histogram(
+    'acegre_user_store_operation_duration_seconds', 'User store call latency by backend and operation',
+    ('backend', 'operation'), FAST_BUCKETS)
+STORE_FILE_SECONDS = registry.histogram(
+    'acegre_user_store_file_duration_seconds', 'Full reloads and rewrites of users.json', ('direction',))
+STORE_FILE_BYTES = registry.counter(
+    'acegre_user_store_file_bytes_total', 'Bytes read from and written to users.json', ('direction',))
+
+
+def default_study_progress() -> Dict:
+    """Fresh study progress for a new account"""
+    return {subject: dict(progress) for subject, progress in DEFAULT_STUDY_PROGRESS.items()}
+
+
+class UserStore:
+    """
+    User storage interface used by app.py.
+    Single-user operations let backends update one user (or one row)
+    instead of rewriting every account on each click.
+    """
+
+    def get_user(self, email: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def create_user(self, email: str, user_data: Dict) -> bool:
+        """Create a user; returns False if the email is already registered"""
+        raise NotImplementedError
+
+    def toggle_favorite(self, email: str, word: str) -> bool:
+        """Toggle a favorite word; returns the new favorite state"""
+        raise NotImplementedError
+
+    def mark_learned(self, email: str, word: str) -> bool:
+        """Mark a word as learned; returns False if it was already learned"""
+        raise NotImplementedError
+
+    def get_study_progress(self, email: str) -> Dict:
+        raise NotImplementedError
+
+    def get_progress_version(self, email: str) -> int:
+        """Counter bumped by every study progress change; a cheap validator for /api/progress"""
+        raise NotImplementedError
+
+    def get_learned_words(self, email: str) -> List[str]:
+        raise NotImplementedError
+
+    def is_learned(self, email: str, word: str) -> bool:
+        raise NotImplementedError
+
+    def is_favorite(self, email: str, word: str) -> bool:
+        raise NotImplementedError
+
+    def get_reviews(self, email: str) -> Dict[str, Dict]:
+        """Spaced-repetition state of every reviewed word, {word: review_state}"""
+        raise NotImplementedError
+
+    def get_review(self, email: str, word: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def save_reviews(self, email: str, reviews: Dict[str, Dict]):
+        """Insert or replace the review state of the given words"""
+        raise NotImplementedError
+
+    def save_reviews_bulk(self, reviews_by_user: Dict[str, Dict[str, Dict]]):
+        """save_reviews for many users in one write, {email: {word: review_state}}"""
+        raise NotImplementedError
+
+    def list_emails(self) -> List[str]:
+        raise NotImplementedError
+
+    def load_all(self) -> Dict:
+        """Load every user as {email: user_data} (legacy users.json shape)"""
+        raise NotImplementedError
+
+    def save_all(self, users: Dict):
+        """Replace the stored users with {email: user_data}"""
+        raise NotImplementedError
+
+
+class JSONUserStore(UserStore):
+    """
+    users.json storage shared by all workers.
+    Reads come from an in-process cache that is reloaded only when the file's
+    inode, mtime or size changes. Writes hold a cross-process lock and replace
+    the file atomically, so readers never see half-written JSON.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self._thread_lock = threading.RLock()
+        self._cache = None
+        self._cache_signature = None
+        # (users dict the sets were built from, (list name, email) -> frozenset of its words)
+        self._word_sets = (None, {})
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _read(self) -> Dict:
+        """Return the cached users dict, reloading it if the file changed on disk"""
+        signature = self._signature()
+        if self._cache is not None and signature == self._cache_signature:
+            return self._cache
+
+        if signature is None:
+            users = {}
+        else:
+            with STORE_FILE_SECONDS.time(direction='read'):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    users = json.load(f)
+            STORE_FILE_BYTES.inc(signature[2], direction='read')
+
+        self._cache = users
+        self._cache_signature = signature
+        return users
+
+    def _write(self, users: Dict):
+        """Write to a temp file in the same directory, then rename over users.json"""
+        started = time.perf_counter()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(self.path) + '.')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(users, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        self._cache = users
+        self._cache_signature = self._signature()
+        STORE_FILE_SECONDS.observe(time.perf_counter() - started, direction='write')
+        if self._cache_signature is not None:
+            STORE_FILE_BYTES.inc(self._cache_signature[2], direction='write')
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock across threads and worker processes"""
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _update(self, email: str, mutate: Callable[[Dict], tuple]):
+        """
+        Read-modify-write of one user under the lock.
+        mutate works on a private copy of the user and returns (result, changed);
+        the cached dict is never modified in place, so concurrent readers stay consistent.
+        """
+        with self._locked():
+            users = self._read()
+            user_data = copy.deepcopy(users.get(email, {}))
+            result, changed = mutate(user_data)
+            if changed:
+                users = dict(users)
+                users[email] = user_data
+                self._write(users)
+            return result
+
+    def load_all(self) -> Dict:
+        return copy.deepcopy(self._read())
+
+    def save_all(self, users: Dict):
+        with self._locked():
+            self._write(copy.deepcopy(users))
+
+    def get_user(self, email: str) -> Optional[Dict]:
+        user_data = self._read().get(email)
+        return copy.deepcopy(user_data) if user_data is not None else None
+
+    def create_user(self, email: str, user_data: Dict) -> bool:
+        def mutate(existing):
+            if existing:
+                return False, False
+            existing.update(copy.deepcopy(user_data))
+            return True, True
+        return self._update(email, mutate)
+
+    def toggle_favorite(self, email: str, word: str) -> bool:
+        def mutate(user_data):
+            favorites = user_data.setdefault('favorite_words', [])
+
+            is_favorite = word in favorites
+            if is_favorite:
+                favorites.remove(word)
+            else:
+                favorites.append(word)
+            return not is_favorite, True
+        return self._update(email, mutate)
+
+    def mark_learned(self, email: str, word: str) -> bool:
+        def mutate(user_data):
+            learned_words = user_data.setdefault('learned_words', [])
+
+            if word in learned_words:
+                return False, False
+
+            learned_words.append(word)
+
+            # Update study progress
+            study_progress = user_data.setdefault('study_progress', {})
+            study_progress.setdefault('word', {'level': 1, 'completed': 0})
+            study_progress['word']['completed'] += 1
+            user_data['progress_version'] = user_data.get('progress_version', 0) + 1
+            return True, True
+        return self._update(email, mutate)
+
+    def get_study_progress(self, email: str) -> Dict:
+        return copy.deepcopy(self._read().get(email, {}).get('study_progress', {}))
+
+    def get_progress_version(self, email: str) -> int:
+        return self._read().get(email, {}).get('progress_version', 0)
+
+    def get_learned_words(self, email: str) -> List[str]:
+        return list(self._read().get(email, {}).get('learned_words', []))
+
+    def is_learned(self, email: str, word: str) -> bool:
+        return word in self._word_set(email, 'learned_words')
+
+    def is_favorite(self, email: str, word: str) -> bool:
+        return word in self._word_set(email, 'favorite_words')
+
+    def _word_set(self, email: str, name: str) -> frozenset:
+        """A user's word list as a set; the sets are rebuilt lazily whenever the cached users dict is replaced"""
+        users = self._read()
+        cached_users, word_sets = self._word_sets
+        if cached_users is not users:
+            word_sets = {}
+            self._word_sets = (users, word_sets)
+        words = word_sets.get((name, email))
+        if words is None:
+            words = word_sets[(name, email)] = frozenset(users.get(email, {}).get(name, ()))
+        return words
+
+    def get_reviews(self, email: str) -> Dict[str, Dict]:
+        return copy.deepcopy(self._read().get(email, {}).get('reviews', {}))
+
+    def get_review(self, email: str, word: str) -> Optional[Dict]:
+        review = self._read().get(email, {}).get('reviews', {}).get(word)
+        return dict(review) if review is not None else None
+
+    def save_reviews(self, email: str, reviews: Dict[str, Dict]):
+        def mutate(user_data):
+            user_data.setdefault('reviews', {}).update(copy.deepcopy(reviews))
+            return None, True
+        self._update(email, mutate)
+
+    def save_reviews_bulk(self, reviews_by_user: Dict[str, Dict[str, Dict]]):
+        """One lock and one rewrite of users.json; untouched users are shared with the cached dict"""
+        with self._locked():
+            users = dict(self._read())
+            for email, reviews in reviews_by_user.items():
+                user_data = dict(users.get(email, {}))
+                user_data['reviews'] = {**user_data.get('reviews', {}), **copy.deepcopy(reviews)}
+                users[email] = user_data
+            self._write(users)
+
+    def list_emails(self) -> List[str]:
+        return list(self._read())
+
+
+class SQLiteUserStore(UserStore):
+    """
+    SQLite storage in WAL mode.
+    Users live in one row each; learned words, favorites and study progress
+    are separate keyed tables, so an update touches a single row.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        email TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        password TEXT NOT NULL,
+        created_at TEXT,
+        extra TEXT NOT NULL DEFAULT '{}'
+    );
+    CREATE TABLE IF NOT EXISTS learned_words (
+        email TEXT NOT NULL,
+        word TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (email, word)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_learned_words_order ON learned_words (email, position);
+    CREATE TABLE IF NOT EXISTS favorite_words (
+        email TEXT NOT NULL,
+        word TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        PRIMARY KEY (email, word)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_favorite_words_order ON favorite_words (email, position);
+    CREATE TABLE IF NOT EXISTS study_progress (
+        email TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        level INTEGER NOT NULL DEFAULT 1,
+        completed INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (email, subject)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS progress_versions (
+        email TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS word_reviews (
+        email TEXT NOT NULL,
+        word TEXT NOT NULL,
+        ease REAL NOT NULL,
+        stability REAL NOT NULL,
+        reps INTEGER NOT NULL,
+        lapses INTEGER NOT NULL,
+        last_review REAL NOT NULL,
+        due REAL NOT NULL,
+        PRIMARY KEY (email, word)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_word_reviews_due ON word_reviews (email, due);
+    """
+
+    REVIEW_FIELDS = ('ease', 'stability', 'reps', 'lapses', 'last_review', 'due')
+
+    # Columns with a dedicated table; everything else goes to users.extra
+    CORE_FIELDS = ('name', 'email', 'password', 'created_at',
+                   'learned_words', 'favorite_words', 'study_progress', 'progress_version', 'reviews')
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; Flask serves requests on several threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    def get_user(self, email: str) -> Optional[Dict]:
+        conn = self._connect()
+        row = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
+        if row is None:
+            return None
+
+        user_data = json.loads(row['extra'])
+        user_data.update({
+            'name': row['name'],
+            'email': row['email'],
+            'password': row['password'],
+            'created_at': row['created_at'],
+            'study_progress': self._read_progress(conn, email)
+        })
+
+        learned = self._read_words(conn, 'learned_words', email)
+        if learned:
+            user_data['learned_words'] = learned
+        favorites = self._read_words(conn, 'favorite_words', email)
+        if favorites:
+            user_data['favorite_words'] = favorites
+        progress_version = self._read_progress_version(conn, email)
+        if progress_version:
+            user_data['progress_version'] = progress_version
+        reviews = self.get_reviews(email)
+        if reviews:
+            user_data['reviews'] = reviews
+        return user_data
+
+    def create_user(self, email: str, user_data: Dict) -> bool:
+        conn = self._connect()
+        try:
+            with conn:
+                self._insert_user(conn, email, user_data)
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def toggle_favorite(self, email: str, word: str) -> bool:
+        conn = self._connect()
+        with conn:
+            deleted = conn.execute('DELETE FROM favorite_words WHERE email = ? AND word = ?',
+                                   (email, word)).rowcount
+            if deleted:
+                return False
+            self._append_word(conn, 'favorite_words', email, word)
+        return True
+
+    def mark_learned(self, email: str, word: str) -> bool:
+        conn = self._connect()
+        with conn:
+            if not self._append_word(conn, 'learned_words', email, word):
+                return False
+            conn.execute(
+                """INSERT INTO study_progress (email, subject, level, completed) VALUES (?, 'word', 1, 1)
+                   ON CONFLICT (email, subject) DO UPDATE SET completed = completed + 1""",
+                (email,))
+            conn.execute(
+                """INSERT INTO progress_versions (email, version) VALUES (?, 1)
+                   ON CONFLICT (email) DO UPDATE SET version = version + 1""",
+                (email,))
+        return True
+
+    def get_study_progress(self, email: str) -> Dict:
+        return self._read_progress(self._connect(), email)
+
+    def get_progress_version(self, email: str) -> int:
+        return self._read_progress_version(self._connect(), email)
+
+    def get_learned_words(self, email: str) -> List[str]:
+        return self._read_words(self._connect(), 'learned_words', email)
+
+    def is_learned(self, email: str, word: str) -> bool:
+        row = self._connect().execute('SELECT 1 FROM learned_words WHERE email = ? AND word = ?',
+                                      (email, word)).fetchone()
+        return row is not None
+
+    def is_favorite(self, email: str, word: str) -> bool:
+        row = self._connect().execute('SELECT 1 FROM favorite_words WHERE email = ? AND word = ?',
+                                      (email, word)).fetchone()
+        return row is not None
+
+    def get_reviews(self, email: str) -> Dict[str, Dict]:
+        rows = self._connect().execute('SELECT * FROM word_reviews WHERE email = ?', (email,))
+        return {row['word']: {field: row[field] for field in self.REVIEW_FIELDS} for row in rows}
+
+    def get_review(self, email: str, word: str) -> Optional[Dict]:
+        row = self._connect().execute('SELECT * FROM word_reviews WHERE email = ? AND word = ?',
+                                      (email, word)).fetchone()
+        if row is None:
+            return None
+        return {field: row[field] for field in self.REVIEW_FIELDS}
+
+    def save_reviews(self, email: str, reviews: Dict[str, Dict]):
+        conn = self._connect()
+        with conn:
+            self._write_reviews(conn, email, reviews)
+
+    def save_reviews_bulk(self, reviews_by_user: Dict[str, Dict[str, Dict]]):
+        """One transaction and one executemany over every user's rows"""
+        conn = self._connect()
+        with conn:
+            self._write_review_rows(conn, ((email, word, review) for email, reviews in reviews_by_user.items()
+                                           for word, review in reviews.items()))
+
+    def list_emails(self) -> List[str]:
+        return [row['email'] for row in self._connect().execute('SELECT email FROM users ORDER BY rowid')]
+
+    def load_all(self) -> Dict:
+        return {email: self.get_user(email) for email in self.list_emails()}
+
+    def save_all(self, users: Dict):
+        conn = self._connect()
+        with conn:
+            for table in ('learned_words', 'favorite_words', 'study_progress', 'progress_versions', 'word_reviews',
+                          'users'):
+                conn.execute(f'DELETE FROM {table}')
+            for email, user_data in users.items():
+                self._insert_user(conn, email, user_data)
+
+    def _insert_user(self, conn: sqlite3.Connection, email: str, user_data: Dict):
+        extra = {k: v for k, v in user_data.items() if k not in self.CORE_FIELDS}
+        conn.execute(
+            'INSERT INTO users (email, name, password, created_at, extra) VALUES (?, ?, ?, ?, ?)',
+            (email, user_data.get('name', email.split('@')[0]), user_data.get('password', ''),
+             user_data.get('created_at'), json.dumps(extra, ensure_ascii=False)))
+
+        for subject, progress in user_data.get('study_progress', {}).items():
+            conn.execute(
+                'INSERT INTO study_progress (email, subject, level, completed) VALUES (?, ?, ?, ?)',
+                (email, subject, progress.get('level', 1), progress.get('completed', 0)))
+        if user_data.get('progress_version'):
+            conn.execute('INSERT INTO progress_versions (email, version) VALUES (?, ?)',
+                         (email, user_data['progress_version']))
+        for word in user_data.get('learned_words', []):
+            self._append_word(conn, 'learned_words', email, word)
+        for word in user_data.get('favorite_words', []):
+            self._append_word(conn, 'favorite_words', email, word)
+        self._write_reviews(conn, email, user_data.get('reviews', {}))
+
+    def _write_reviews(self, conn: sqlite3.Connection, email: str, reviews: Dict[str, Dict]):
+        self._write_review_rows(conn, ((email, word, review) for word, review in reviews.items()))
+
+    def _write_review_rows(self, conn: sqlite3.Connection, rows):
+        """rows: (email, word, review_state) triples"""
+        conn.executemany(
+            """INSERT OR REPLACE INTO word_reviews
+               (email, word, ease, stability, reps, lapses, last_review, due)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            ((email, word) + tuple(review[field] for field in self.REVIEW_FIELDS) for email, word, review in rows))
+
+    @staticmethod
+    def _append_word(conn: sqlite3.Connection, table: str, email: str, word: str) -> bool:
+        """Insert a word at the end of a user's list; returns False if already present"""
+        cursor = conn.execute(
+            f"""INSERT OR IGNORE INTO {table} (email, word, position)
+                SELECT ?, ?, COALESCE(MAX(position), -1) + 1 FROM {table} WHERE email = ?""",
+            (email, word, email))
+        return cursor.rowcount > 0
+
+    @staticmethod
+    def _read_words(conn: sqlite3.Connection, table: str, email: str) -> List[str]:
+        rows = conn.execute(f'SELECT word FROM {table} WHERE email = ? ORDER BY position', (email,))
+        return [row['word'] for row in rows]
+
+    @staticmethod
+    def _read_progress(conn: sqlite3.Connection, email: str) -> Dict:
+        rows = conn.execute('SELECT subject, level, completed FROM study_progress WHERE email = ?',
+                            (email,))
+        return {row['subject']: {'level': row['level'], 'completed': row['completed']} for row in rows}
+
+    @staticmethod
+    def _read_progress_version(conn: sqlite3.Connection, email: str) -> int:
+        row = conn.execute('SELECT version FROM progress_versions WHERE email = ?', (email,)).fetchone()
+        return row['version'] if row is not None else 0
+
+
+def migrate_json_to_sqlite(json_path: str, db_path: str) -> int:
+    """One-shot migration of users.json into a SQLite store; returns the number of users copied"""
+    users = JSONUserStore(json_path).load_all()
+    store = SQLiteUserStore(db_path)
+
+    migrated = 0
+    conn = store._connect()
+    with conn:
+        for email, user_data in users.items():
+            exists = conn.execute('SELECT 1 FROM users WHERE email = ?', (email,)).fetchone()
+            if exists:
+                continue
+            store._insert_user(conn, email, user_data)
+            migrated += 1
+    return migrated
+
+
+class InstrumentedUserStore(UserStore):
+    """Wraps a backend and records the latency of every UserStore call"""
+
+    OPERATIONS = tuple(name for name, value in vars(UserStore).items()
+                       if callable(value) and not name.startswith('_'))
+
+    def __init__(self, store: UserStore, backend: str):
+        self.store = store
+        self.backend = backend
+        # Instance attributes shadow the interface methods, so calls skip a __getattr__ hop
+        for operation in self.OPERATIONS:
+            setattr(self, operation, self._timed(operation, getattr(store, operation)))
+
+    def _timed(self, operation: str, method: Callable) -> Callable:
+        backend = self.backend
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                STORE_OPERATION_SECONDS.observe(time.perf_counter() - started,
+                                                backend=backend, operation=operation)
+        timed.__name__ = operation
+        timed.__doc__ = method.__doc__
+        return timed
+
+
+def create_user_store(backend: str = 'json', users_file: str = 'users.json',
+                      users_db: str = 'users.db') -> UserStore:
+    """
+    Build the user store for the given backend ('json' or 'sqlite').
+    The JSON file stays the default so existing deployments keep working.
+    """
+    if backend == 'sqlite':
+        return InstrumentedUserStore(SQLiteUserStore(users_db), 'sqlite')
+    return InstrumentedUserStore(JSONUserStore(users_file), 'json')
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'migrate':
+        print("Usage: python user_store.py migrate [users.json] [users.db]")
+        sys.exit(1)
+
+    source = sys.argv[2] if len(sys.argv) > 2 else 'users.json'
+    target = sys.argv[3] if len(sys.argv) > 3 else 'users.db'
+    count = migrate_json_to_sqlite(source, target)
+    print(f"✅ Migrated {count} users from {source} to {target}")
+    print("Set USER_STORE=sqlite to use the new store")
@@ -0,0 +1,137 @@
+"""
+Word Bank Module for AceGRE
+Loads the GRE word corpus from a data file and indexes it for constant-time lookups
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_WORD_BANK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gre_words.json')
+
+
+class WordBankSnapshot:
+    """
+    One immutable version of the corpus.
+    Requests keep using the snapshot they started with while a reload swaps in a new one.
+    """
+
+    __slots__ = ('version', 'words', 'index', 'levels')
+
+    def __init__(self, version: str, words: Tuple[Dict, ...]):
+        self.version = version
+        self.words = words
+        self.index = {entry['word']: entry for entry in words}
+
+        levels = {}
+        for entry in words:
+            levels.setdefault(entry['level'], []).append(entry)
+        self.levels = {level: tuple(entries) for level, entries in levels.items()}
+
+
+class WordBank:
+    """
+    GRE word corpus with a hash index by word and precomputed per-level buckets.
+    The data file is checked for changes at most every reload_interval seconds
+    and reloaded in place, so a new corpus version goes live without a restart.
+    """
+
+    def __init__(self, path: str = DEFAULT_WORD_BANK_FILE, reload_interval: float = 5.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._signature = None
+        self._next_check = 0.0
+        self._listeners: List[Callable[[WordBankSnapshot], None]] = []
+        self._snapshot = self._load()
+
+    @property
+    def snapshot(self) -> WordBankSnapshot:
+        """The current corpus version, reloading it first if the file changed"""
+        if self.reload_interval and time.monotonic() >= self._next_check:
+            self.reload_if_changed()
+        return self._snapshot
+
+    @property
+    def version(self) -> str:
+        return self.snapshot.version
+
+    def get(self, word: str) -> Optional[Dict]:
+        """O(1) lookup of a word entry; callers must copy before modifying it"""
+        return self.snapshot.index.get(word)
+
+    def by_level(self, level: str) -> Tuple[Dict, ...]:
+        """Precomputed bucket of words at a difficulty level"""
+        return self.snapshot.levels.get(level, ())
+
+    def all_words(self) -> Tuple[Dict, ...]:
+        return self.snapshot.words
+
+    def __len__(self) -> int:
+        return len(self.snapshot.words)
+
+    def add_reload_listener(self, listener: Callable[[WordBankSnapshot], None]):
+        """Call listener(snapshot) after each successful reload (derived indexes rebuild here)"""
+        self._listeners.append(listener)
+
+    def reload_if_changed(self) -> bool:
+        """Reload the corpus if the data file changed on disk; returns True if reloaded"""
+        with self._lock:
+            self._next_check = time.monotonic() + self.reload_interval
+            if self._file_signature() == self._signature:
+                return False
+            try:
+                self._snapshot = self._load()
+            except (OSError, ValueError, KeyError) as e:
+                # Keep serving the previous version if the new file is incomplete or invalid
+                self._signature = self._file_signature()
+                print(f"Word bank reload error: {e}")
+                return False
+        snapshot = self._snapshot
+        print(f"Word bank reloaded: version {snapshot.version}, {len(snapshot.words)} words")
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"Word bank reload listener error: {e}")
+        return True
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _load(self) -> WordBankSnapshot:
+        """
+        Parse the corpus file.
+        Supports {"version": ..., "words": [...]}, a bare JSON list, or JSON Lines (.jsonl).
+        """
+        signature = self._file_signature()
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+
+        declared_version = None
+        if self.path.endswith('.jsonl'):
+            words = [json.loads(line) for line in raw.decode('utf-8').splitlines() if line.strip()]
+        else:
+            data = json.loads(raw.decode('utf-8'))
+            if isinstance(data, dict):
+                declared_version = data.get('version')
+                words = data['words']
+            else:
+                words = data
+
+        for entry in words:
+            if 'word' not in entry or 'level' not in entry:
+                raise ValueError(f"Word bank entry missing 'word' or 'level': {entry!r:.80}")
+
+        digest = hashlib.sha1(raw).hexdigest()[:12]
+        version = f"{declared_version}-{digest}" if declared_version else digest
+
+        self._signature = signature
+        return WordBankSnapshot(version, tuple(words))
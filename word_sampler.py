@@ -0,0 +1,135 @@
+"""
+Word Sampler Module for AceGRE
+Picks unlearned words for a user in expected O(1) time
+"""
+
+import random
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from user_store import UserStore
+from word_bank import WordBank, WordBankSnapshot
+
+
+class UnlearnedPool:
+    """
+    One user's unlearned words, bucketed by level.
+    Each bucket is a list with a word -> position map, so sampling is a random
+    index and removing a learned word is a swap with the last element.
+    """
+
+    def __init__(self, snapshot: WordBankSnapshot, learned_words):
+        self.version = snapshot.version
+        self._buckets = {}
+        self._positions = {}
+
+        learned = set(learned_words)
+        for level, entries in snapshot.levels.items():
+            bucket = [entry for entry in entries if entry['word'] not in learned]
+            self._buckets[level] = bucket
+            for index, entry in enumerate(bucket):
+                self._positions[entry['word']] = (level, index)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def sample(self, level: str, rng: random.Random) -> Optional[Dict]:
+        bucket = self._buckets.get(level)
+        if not bucket:
+            return None
+        return bucket[rng.randrange(len(bucket))]
+
+    def sample_any(self, rng: random.Random) -> Optional[Dict]:
+        """Uniform pick across all levels (walks the handful of level buckets)"""
+        total = len(self._positions)
+        if not total:
+            return None
+        target = rng.randrange(total)
+        for bucket in self._buckets.values():
+            if target < len(bucket):
+                return bucket[target]
+            target -= len(bucket)
+        return None
+
+    def remove(self, word: str):
+        position = self._positions.pop(word, None)
+        if position is None:
+            return
+        level, index = position
+        bucket = self._buckets[level]
+        last = bucket.pop()
+        if index < len(bucket):
+            bucket[index] = last
+            self._positions[last['word']] = (level, index)
+
+
+class WordSampler:
+    """
+    Per-user unlearned-word pools built from the learned set in the user store.
+    Pools are cached per worker (LRU) and rebuilt when the word bank version changes.
+    """
+
+    def __init__(self, word_bank: WordBank, user_store: UserStore, max_users: int = 1024):
+        self.word_bank = word_bank
+        self.user_store = user_store
+        self.max_users = max_users
+        self._pools = OrderedDict()
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+
+    def pick(self, email: str, difficulty: str) -> Optional[Dict]:
+        """
+        Pick an unlearned word at the given difficulty, falling back to any level,
+        and to the whole bank once everything has been learned; None if the bank is empty.
+        """
+        picked = self.pick_many(email, difficulty, 1)
+        return picked[0] if picked else None
+
+    def pick_many(self, email: str, difficulty: str, count: int, exclude=()) -> List[Dict]:
+        """
+        Pick up to count distinct unlearned words not in exclude, with the same
+        fallbacks as pick(). Repeated draws of an already chosen word widen the
+        search to all levels before giving up.
+        """
+        snapshot = self.word_bank.snapshot
+        seen = set(exclude)
+        picked = []
+        with self._lock:
+            pool = self._pool(email, snapshot)
+            collisions = 0
+            while len(picked) < count and collisions < count * 8:
+                entry = (pool.sample(difficulty, self._rng) if collisions < 3 else None) or pool.sample_any(self._rng)
+                if entry is None:
+                    break
+                if entry['word'] in seen:
+                    collisions += 1
+                    continue
+                # Another worker may have marked this word learned since the pool was built
+                if self.user_store.is_learned(email, entry['word']):
+                    pool.remove(entry['word'])
+                    continue
+                seen.add(entry['word'])
+                picked.append(entry)
+
+        if not picked and len(pool) == 0:
+            # Everything has been learned: review from the whole bank
+            candidates = [entry for entry in snapshot.words if entry['word'] not in seen] or list(snapshot.words)
+            picked = self._rng.sample(candidates, min(count, len(candidates)))
+        return picked
+
+    def mark_learned(self, email: str, word: str):
+        with self._lock:
+            pool = self._pools.get(email)
+            if pool is not None:
+                pool.remove(word)
+
+    def _pool(self, email: str, snapshot: WordBankSnapshot) -> UnlearnedPool:
+        pool = self._pools.get(email)
+        if pool is None or pool.version != snapshot.version:
+            pool = UnlearnedPool(snapshot, self.user_store.get_learned_words(email))
+            self._pools[email] = pool
+            if len(self._pools) > self.max_users:
+                self._pools.popitem(last=False)
+        self._pools.move_to_end(email)
+        return pool